@@ -0,0 +1,223 @@
+"""Headless benchmarks for limmer's rendering hot paths
+
+Run from the repository root with ``python -m benchmarks.bench_render`` (``--quick`` for a short run,
+``--filter name`` to only run matching cases). Everything writes into an in-memory sink, no console needed.
+"""
+from typing import Callable, List, Optional
+import argparse
+import threading
+import socket
+import time
+import sys
+import io
+import os
+
+from limmer.basics import Window
+from limmer.sink import FdSink
+from limmer.events import SpinningEvent, PointingsEvent
+from limmer import animation
+from limmer.styles import Color, Background, Formatting, InlineStyle, DEFAULT, sgr_transition
+from limmer._ipc import FrameWriter, MSG_TEXT, MSG_SHUTDOWN
+from limmer._server import RendererServer
+
+
+class CountingSink(io.TextIOBase):
+    """Stands in for stdout, only counts what would have been written"""
+    def __init__(self):
+        self.writes = 0
+        self.chars = 0
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        self.chars += len(text)
+        self.bytes += len(text.encode("utf-8"))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def reset(self):
+        self.writes = self.chars = self.bytes = 0
+
+
+class Result:
+    def __init__(self, name: str, ops: int, seconds: float, sink: Optional[CountingSink] = None):
+        self.name = name
+        self.ops = ops
+        self.seconds = seconds
+        self.bytes_per_op = sink.bytes / ops if sink is not None and ops else None
+        self.writes_per_op = sink.writes / ops if sink is not None and ops else None
+
+    def __str__(self):
+        line = f"{self.name:<40} {self.ops / self.seconds:>14,.0f} ops/s"
+        if self.bytes_per_op is not None:
+            line += f" {self.bytes_per_op:>10,.1f} B/op {self.writes_per_op:>6.2f} writes/op"
+        return line
+
+
+def measure(name: str, func: Callable[[], None], min_time: float, sink: Optional[CountingSink] = None) -> Result:
+    func()  # Warm up caches (styles, widths, ...)
+    if sink is not None:
+        sink.reset()
+    ops, start = 0, time.perf_counter()
+    while True:
+        func()
+        ops += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return Result(name, ops, elapsed, sink)
+
+
+def make_window(sink: CountingSink, width: int = 200, height: int = 60) -> Window:
+    return Window(output=sink, size=(width, height), position=[1, 1])
+
+
+def bench_send_text(min_time: float) -> List[Result]:
+    sink = CountingSink()
+    window = make_window(sink)
+    items = [f"item {i} " for i in range(20)]
+    return [
+        measure("sendText 20 items", lambda: window.sendText(*items), min_time, sink),
+        measure("sendText 1 line", lambda: window.sendText("a log line of typical length\n"), min_time, sink),
+        measure("sendText wide chars", lambda: window.sendText("日本語のテキスト 👍\n"), min_time, sink),
+    ]
+
+
+def bench_styles(min_time: float) -> List[Result]:
+    sink = CountingSink()
+    window = make_window(sink)
+    styles = [Color.RED, Background.BLUE, Formatting.BOLD, Color.GREEN, InlineStyle.CLEAR, Color.RGB(10, 20, 30)]
+    red, blue = Color.RED.apply(DEFAULT), Color.BLUE.apply(DEFAULT)
+
+    def styled_line():
+        window.sendText(Color.RED, "error ", Color.WHITE, "something happened", InlineStyle.CLEAR, "\n")
+
+    return [
+        measure("InLineStyleAttr repr x6", lambda: [repr(style) for style in styles], min_time),
+        measure("sgr_transition", lambda: sgr_transition(red, blue), min_time),
+        measure("sendText styled line", styled_line, min_time, sink),
+    ]
+
+
+def bench_window_tick(min_time: float, counts=(10, 100, 1000)) -> List[Result]:
+    results = []
+    for count in counts:
+        sink = CountingSink()
+        window = make_window(sink)
+        events = [SpinningEvent() if i % 2 else PointingsEvent() for i in range(count)]
+        for event in events:
+            window.sendText(event, " ")
+
+        ticks = [0]
+        interval = SpinningEvent.animation.interval
+
+        def tick():
+            # Every tick is one animation interval later, so every event shows a new frame
+            ticks[0] += 1
+            window.windowTick()
+
+        # Counted in whole ticks, summing up the interval drifts and now and then shows a frame twice.
+        # Half an interval in, so the frame index never lands right on a boundary
+        animation.set_clock(lambda: (ticks[0] + 0.5) * interval)
+        try:
+            results.append(measure(f"windowTick {count} events", tick, min_time, sink))
+        finally:
+            animation.set_clock(time.monotonic)
+    return results
+
+
+def bench_resize(min_time: float, count: int = 1000) -> List[Result]:
+    sink = CountingSink()
+    window = make_window(sink)
+    for i in range(count):
+        window.sendText(SpinningEvent(), " ")
+    widths = [window.max_position[0], window.max_position[0] - 37]
+    state = {"i": 0}
+
+    def resize():
+        new_size = [widths[state["i"] % 2], window.max_position[1]]
+        state["i"] += 1
+        _, move = window.back_buffer.resize(*new_size)
+        window.recalculate_positions(move)
+        window.max_position = new_size
+
+    return [measure(f"resize {count} events", resize, min_time)]
+
+
+def bench_ipc(min_time: float, lines: int = 10000) -> List[Result]:
+    sink = CountingSink()
+    server = RendererServer("127.0.0.1", 0, stop_when_idle=False, output=sink)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    connection = socket.create_connection(server.listener.getsockname())
+    writer = FrameWriter(connection)
+    payload = "a log line streamed into the secondary console\n".encode("utf-8")
+    expected = {"bytes": 0}
+
+    def stream():
+        for _ in range(lines):
+            writer.write(MSG_TEXT, payload)
+        writer.flush()
+        expected["bytes"] += lines * len(payload)
+        while sink.bytes < expected["bytes"]:  # Wait until the server wrote all of it
+            time.sleep(0.0005)
+
+    try:
+        result = measure(f"_CmdWindow IPC {lines} lines", stream, min_time)
+        result.ops *= lines  # Report lines per second
+        return [result]
+    finally:
+        writer.write(MSG_SHUTDOWN)
+        writer.close()
+        connection.close()
+        server.shutdown()
+        thread.join()
+
+
+def bench_output(min_time: float) -> List[Result]:
+    # The real write path, into /dev/null instead of a terminal
+    frame = "\x1b[12;40H\x1b[31m|\x1b[39m\x1b[13;40H..." * 20 + "ünïcödé"
+    text_stream = open(os.devnull, "w", encoding="utf-8")
+    sink = FdSink(os.open(os.devnull, os.O_WRONLY))
+
+    def wrapper():
+        text_stream.write(frame)
+        text_stream.flush()
+
+    try:
+        return [
+            measure("TextIOWrapper write+flush", wrapper, min_time),
+            measure("FdSink send", lambda: sink.send(frame), min_time),
+        ]
+    finally:
+        text_stream.close()
+        os.close(sink.fd)
+
+
+BENCHMARKS = {
+    "send_text": bench_send_text,
+    "styles": bench_styles,
+    "window_tick": bench_window_tick,
+    "resize": bench_resize,
+    "ipc": bench_ipc,
+    "output": bench_output,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Shorter runs, numbers get noisier")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    min_time = 0.1 if args.quick else 1.0
+    for name, bench in BENCHMARKS.items():
+        if args.filter in name:
+            for result in bench(min_time):
+                print(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,41 @@
-import ctypes
+from typing import Dict, Optional, Tuple
+import threading
+import time
 import sys
-import msvcrt
+import os
+import re
 
+if os.name == "nt":
+    import msvcrt  # ctypes only gets loaded once something actually sets the console up
+else:
+    import termios
+    import select
+
+
+_ansi_enabled = False
+_ansi_lock = threading.Lock()
+
+
+def enable_ansi() -> bool:
+    """Makes the console interpret escape sequences, safe to call as often as you like"""
+    global _ansi_enabled
+    with _ansi_lock:
+        if _ansi_enabled:
+            return True
+        if os.name == "nt":
+            _enable_virtual_terminal()
+        _ansi_enabled = True  # Every POSIX terminal we care about understands ANSI out of the box
+        return True
+
+
+def setup_terminal() -> bool:
+    # What limmer used to do on import, Window calls it when it writes to the real console
+    return enable_ansi()
+
+
+def _enable_virtual_terminal():
+    import ctypes
 
-def enable_ansi():
     # Constants from the Windows API
     STD_OUTPUT_HANDLE = -11
     ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
@@ -23,21 +55,133 @@ def enable_ansi():
     kernel32.SetConsoleMode(hstdout, mode)
 
 
+# Queries we know how to ask and how their answers look
+QUERIES = {
+    "cursor": ("\033[6n", re.compile(r"\033\[(\d+);(\d+)R")),  # Cursor position -> ESC[row;colR
+    "size": ("\033[18t", re.compile(r"\033\[8;(\d+);(\d+)t")),  # Text area size -> ESC[8;rows;colst
+    "attributes": ("\033[c", re.compile(r"\033\[\?([\d;]*)c")),  # Primary device attributes -> ESC[?...c
+}
+
+
+class _WindowsBackend:
+    def query(self, request: str, done: re.Pattern, timeout: float) -> str:
+        # Whatever arrived before the timeout, query_terminal decides if that's enough
+        while msvcrt.kbhit():  # Late answers to queries that timed out before, they'd be taken for ours
+            msvcrt.getwch()
+        sys.stdout.write(request)
+        sys.stdout.flush()
+
+        response = ""
+        deadline = time.monotonic() + timeout
+        while not done.search(response):
+            if not msvcrt.kbhit():
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.001)
+                continue
+            while msvcrt.kbhit():  # Take everything that's already there in one go
+                response += msvcrt.getwch()  # Get a character from the console without echo
+        return response
+
+
+class _PosixBackend:
+    def __init__(self):
+        self.fd: Optional[int] = None
+
+    def _terminal(self) -> int:
+        # Talk to the controlling terminal directly, stdin/stdout may well be redirected
+        if self.fd is None:
+            self.fd = os.open("/dev/tty", os.O_RDWR | os.O_NOCTTY)
+        return self.fd
+
+    def query(self, request: str, done: re.Pattern, timeout: float) -> str:
+        fd = self._terminal()
+        old_attributes = termios.tcgetattr(fd)
+        new_attributes = termios.tcgetattr(fd)
+        new_attributes[3] &= ~(termios.ICANON | termios.ECHO)  # Answers shouldn't wait for enter or be echoed
+        new_attributes[6][termios.VMIN] = 0
+        new_attributes[6][termios.VTIME] = 0
+        try:
+            termios.tcsetattr(fd, termios.TCSANOW, new_attributes)
+            while select.select([fd], [], [], 0)[0]:  # Late answers to queries that timed out before
+                if not os.read(fd, 1024):
+                    break
+            os.write(fd, request.encode())
+
+            response = b""
+            deadline = time.monotonic() + timeout
+            while not done.search(response.decode(errors="replace")):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    break
+                response += os.read(fd, 1024)
+            return response.decode(errors="replace")
+        finally:
+            termios.tcsetattr(fd, termios.TCSANOW, old_attributes)
+
+
+_backend = _WindowsBackend() if os.name == "nt" else _PosixBackend()
+_backend_lock = threading.Lock()
+_cache: Dict[str, tuple] = {}
+
+
+def query_terminal(*names: str, timeout: float = 0.5, use_cache: bool = False) -> Dict[str, tuple]:
+    """Asks the terminal everything in names (see QUERIES) in one round trip
+
+    The device attributes query goes last, virtually every terminal answers it, so once its answer is
+    there we know nothing else is coming and don't have to wait for the timeout on unsupported queries.
+    Missing answers are left out, answers that came before the timeout still count even without the
+    device attributes. Only if nothing at all comes back a TimeoutError is raised.
+    """
+    results = {name: _cache[name] for name in names if use_cache and name in _cache}
+    missing = [name for name in names if name not in results and name != "attributes"]
+    if not missing and ("attributes" not in names or "attributes" in results):
+        return results
+    missing.append("attributes")
+
+    request = "".join(QUERIES[name][0] for name in missing)
+    with _backend_lock:
+        response = _backend.query(request, QUERIES["attributes"][1], timeout)
+
+    answered = False
+    for name in missing:
+        match = None
+        for match in QUERIES[name][1].finditer(response):
+            pass  # The last one, an answer to an earlier query could still have been on its way
+        if match is None:
+            continue
+        if name == "attributes":
+            value = tuple(int(part) for part in match.group(1).split(";") if part)
+        else:
+            value = tuple(int(part) for part in match.groups())
+        _cache[name] = value
+        if name in names:
+            results[name] = value
+        answered = True
+    if not answered:
+        raise TimeoutError("The terminal didn't answer")
+    return results
+
+
+def invalidate_cache(*names: str):
+    for name in names or list(_cache):
+        _cache.pop(name, None)
+
+
 # Function to query the cursor position
-def query_cursor_position():
-    # Send the DSR request
-    sys.stdout.write("\033[6n")
-    sys.stdout.flush()
-
-    # Read the response (expecting format ESC[n;mR)
-    response = ""
-    while True:
-        ch = msvcrt.getwch()  # Get a character from the console without echo
-        response += ch
-        if ch == 'R':
-            break
-
-    # Parse the response to get the cursor position
-    response = response.replace("\033[", "").rstrip('R')
-    rows, cols = map(int, response.split(';'))
+def query_cursor_position(timeout: float = 0.5) -> Tuple[int, int]:
+    # Send the DSR request and parse the response (ESC[n;mR) to get the cursor position
+    result = query_terminal("cursor", timeout=timeout)
+    if "cursor" not in result:
+        raise TimeoutError("The terminal didn't report the cursor position")
+    rows, cols = result["cursor"]
     return rows, cols
+
+
+def query_terminal_size(timeout: float = 0.5) -> Optional[Tuple[int, int]]:
+    # (rows, columns), never from the cache, nothing would tell it about a resize where SIGWINCH doesn't exist
+    return query_terminal("size", timeout=timeout).get("size")
+
+
+def query_device_attributes(timeout: float = 0.5) -> Tuple[int, ...]:
+    return query_terminal("attributes", timeout=timeout, use_cache=True)["attributes"]
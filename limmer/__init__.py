@@ -1,20 +1,55 @@
-from .ANSIUtils import enable_ansi, query_cursor_position
 from .styles import *
-from .events import *
-from .basics import *
+from . import styles as _styles
+import importlib
 
+# Only the styles get imported right away, everything else (and what it pulls in, sockets, asyncio, ...)
+# is loaded the first time it is used. Importing limmer doesn't write anything or touch the console,
+# call setup_terminal() (or create a Window) for that.
+_LAZY = {
+    "enable_ansi": "ANSIUtils",
+    "setup_terminal": "ANSIUtils",
+    "query_cursor_position": "ANSIUtils",
+    "Cursor": "basics",
+    "Window": "basics",
+    "Event": "events",
+    "SpinningEvent": "events",
+    "PointingsEvent": "events",
+    "BetterPointingsEvent": "events",
+    "AnimatedEvent": "events",
+    "spinning_cursor": "events",
+    "pointings_cursor": "events",
+    "AsyncEvent": "aio",
+    "AsyncWindow": "aio",
+    "VirtualTerminal": "vterm",
+    "FrameStats": "metrics",
+    "RenderMetrics": "metrics",
+    "TextStream": "stream",
+    "Animation": "animation",
+    "get_animation": "animation",
+    "Scrollback": "scrollback",
+    "LogPane": "panes",
+    "FdSink": "sink",
+    "SharedCounters": "progress",
+    "ProgressEvent": "progress",
+    "ProgressBar": "progress",
+    "CounterEvent": "progress",
+}
+_SUBMODULES = {"ANSIUtils", "animation", "basics", "buffer", "events", "aio", "vterm", "metrics", "panes", "positions", "progress", "scheduler",
+               "resize", "scrollback", "sink", "stream", "styles", "width"}
+# from limmer import * still gets everything, it just loads all of it
+__all__ = _styles.__all__ + list(_LAZY)
 
-enable_ansi()
-print(f"{Color.CLEAR}Cmd Win [{Color.RED}SECURE{Color.CLEAR}] for {Color.RGB(0, 0, 0)}Windows{Color.CLEAR} [Version 1.0.0]")
-print("(c) Limmer LLC. All rights reserved.")
-print("Welcome to limmer, the version you're currently working with has 'some' problems, the biggest is positioning.")
-print("\nC:\\Users\\user_> ")
 
-#print(f"\033[100B",
-#      f"\033[100C")
-# print("1" * 200)
-# print("\033[1C")
-#input(query_cursor_position())
-# print("\033[1A\b\b\b\b")
-#input()
-#input(query_cursor_position())
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # Next time it's a normal lookup
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | _SUBMODULES)
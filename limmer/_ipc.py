@@ -0,0 +1,145 @@
+from typing import Iterator, Optional, Tuple, Union
+import threading
+import socket
+import struct
+import time
+
+
+# Every message is [payload length: u32][type: u8][payload], no delimiters to scan for
+HEADER = struct.Struct("!IB")
+
+MSG_TEXT = 1  # UTF-8 text for the output pane
+MSG_INPUT = 2  # Client -> server: prompt, server -> client: what was entered
+MSG_SHUTDOWN = 3
+MSG_ATTACH = 4  # Client -> server: name and size of a shared memory framebuffer (see _shm), server -> client: attached
+MSG_STYLE = 5  # Style id -> SGR sequence for cells in the framebuffer
+MSG_DIRTY = 6  # Region of the framebuffer to repaint
+
+ATTACH = struct.Struct("!HH")  # width, height, followed by the shared memory name
+STYLE = struct.Struct("!I")  # style id, followed by its SGR sequence
+DIRTY = struct.Struct("!HHHH")  # x, y, width, height
+
+
+def encode_frame(kind: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(len(payload), kind) + payload
+
+
+class FrameWriter:
+    """Collects frames and sends them in batches, once max_batch bytes are waiting or flush_delay ran out"""
+    def __init__(self, connection: socket.socket, max_batch: int = 64 * 1024, flush_delay: float = 0.005):
+        self.connection = connection
+        self.max_batch = max_batch
+        self.flush_delay = flush_delay
+        self.buffer = bytearray()
+        self.deadline: Optional[float] = None
+        self.closed = False
+        self._condition = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        try:  # We do our own batching, the kernel doesn't need to hold anything back as well
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (OSError, AttributeError):
+            pass
+
+    def write(self, kind: int, payload: Union[bytes, bytearray, memoryview] = b""):
+        with self._condition:
+            if self.closed:
+                raise ConnectionError("Writer is closed")
+            self.buffer += HEADER.pack(len(payload), kind)
+            self.buffer += payload
+            if len(self.buffer) >= self.max_batch:
+                self._send()
+            elif self.deadline is None:
+                self.deadline = time.monotonic() + self.flush_delay
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                    self._flusher.start()
+                self._condition.notify()
+
+    def flush(self):
+        with self._condition:
+            self._send()
+
+    def _send(self):
+        if self.buffer:
+            self.connection.sendall(self.buffer)
+            self.buffer.clear()
+        self.deadline = None
+
+    def _flush_loop(self):
+        with self._condition:
+            while not self.closed:
+                if self.deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                try:
+                    self._send()
+                except OSError:
+                    self.closed = True
+
+    def close(self):
+        with self._condition:
+            if self.closed:
+                return
+            try:
+                self._send()
+            finally:
+                self.closed = True
+                self._condition.notify()
+
+
+class FrameReader:
+    """Receives straight into one preallocated buffer and hands out complete frames as memoryviews
+
+    The views are only valid until the next recv, copy them (bytes(payload)) if you have to keep them.
+    """
+    def __init__(self, connection: socket.socket, size: int = 64 * 1024):
+        self.connection = connection
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First byte that hasn't been handed out yet
+        self.end = 0  # One past the last received byte
+
+    def _make_room(self):
+        pending = self.end - self.start
+        if self.start:
+            self.view[:pending] = self.view[self.start:self.end]
+            self.start, self.end = 0, pending
+        if pending >= HEADER.size:
+            needed = HEADER.size + HEADER.unpack_from(self.buffer, 0)[0]
+            if needed > len(self.buffer):  # A frame bigger than the whole buffer, switch to a big enough one
+                buffer = bytearray(needed)
+                buffer[:pending] = self.view[:pending]
+                self.buffer, self.view = buffer, memoryview(buffer)
+
+    def receive(self) -> bool:
+        """Waits for more data, False once the other side is gone"""
+        if self.end == len(self.buffer) or self.start:
+            self._make_room()
+        received = self.connection.recv_into(self.view[self.end:])
+        self.end += received
+        return received > 0
+
+    def frames(self) -> Iterator[Tuple[int, memoryview]]:
+        """Every complete frame that is already in the buffer"""
+        while self.end - self.start >= HEADER.size:
+            length, kind = HEADER.unpack_from(self.buffer, self.start)
+            if self.end - self.start - HEADER.size < length:
+                break
+            payload_start = self.start + HEADER.size
+            self.start = payload_start + length
+            yield kind, self.view[payload_start:self.start]
+        if self.start == self.end:
+            self.start = self.end = 0
+
+    def __iter__(self) -> Iterator[Tuple[int, memoryview]]:
+        while True:
+            yield from self.frames()
+            try:
+                if not self.receive():
+                    return
+            except (ConnectionError, OSError):
+                return
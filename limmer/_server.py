@@ -1,63 +1,236 @@
-from queue import Queue
+from collections import deque
+from typing import Deque, Dict, Optional, TextIO, Tuple
+import selectors
 import threading
 import socket
 import sys
 import signal
-import time
 
-from aplustools.security.protocols import ControlCodeProtocol, UndefinedSocket, SecureSocketServer
-from aplustools.io import enable_windows_ansi
-enable_windows_ansi()
+from .ANSIUtils import enable_ansi
+from ._ipc import (FrameReader, HEADER, MSG_TEXT, MSG_INPUT, MSG_SHUTDOWN, MSG_ATTACH, MSG_STYLE, MSG_DIRTY, ATTACH,
+                   STYLE, DIRTY)
 
 
-shutdown_signal = Queue()  # Used to signal the server to shutdown between threads
+class _Client:
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.reader = FrameReader(connection)
+        self.outgoing: Deque[bytes] = deque()  # Encoded frames waiting until the socket takes them
+        self.output: list = []  # Text from this client, written out once per loop iteration
+        self.framebuffer = None  # Shared memory cells, only with the shm transport
+        self.styles: Dict[int, str] = {}
 
 
-def handle_shutdown(signum, frame):
-    """Handle the shutdown signal by putting a shutdown request in the queue."""
-    shutdown_signal.put(True)
+class RendererServer:
+    """Hosts any number of _CmdWindow clients on a single selector loop
 
+    All clients share this console, there is no layout between them. Each client's text from one loop iteration
+    goes out in one piece, so escape sequences and lines of different clients never end up mixed.
+    """
+    def __init__(self, host: str, port: int, stop_when_idle: bool = True, output: Optional[TextIO] = None):
+        self.output = output or sys.stdout
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, self._accept)
 
-def client_handler(server: SecureSocketServer):
-    try:
-        server.rate_limit = 1000
-        server.startup()
+        # Writing into the other end wakes the loop up, so shutting down never has to wait for a timeout
+        self._wake_receive, self._wake_send = socket.socketpair()
+        self._wake_receive.setblocking(False)
+        self._wake_send.setblocking(False)
+        self.selector.register(self._wake_receive, selectors.EVENT_READ, self._wake)
 
-        while shutdown_signal.empty() and not server.is_shutdown():
-            time.sleep(0.1)
-        server.shutdown_client()
-    finally:
-        shutdown_signal.put(True)
-        server.cleanup()
+        self.clients: Dict[socket.socket, _Client] = {}
+        self.stop_when_idle = stop_when_idle
+        self.running = False
 
+        self._inputs: Deque[Tuple[_Client, str]] = deque()
+        self._answers: Deque[Tuple[_Client, str]] = deque()
+        self._input_ready = threading.Condition()
+        self._input_thread: Optional[threading.Thread] = None
 
-def run_server(host, port, protocol):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-        server_socket.bind((host, port))
-        server_socket.listen()
+    def shutdown(self):
+        """Can be called from any thread or a signal handler"""
+        self.running = False
+        self._poke()
 
+    def _poke(self):
+        try:
+            self._wake_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Already full of wake ups or closed, either way the loop will notice
+
+    def _wake(self, _, mask: int = selectors.EVENT_READ):
+        try:
+            while self._wake_receive.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self._answers:
+            client, answer = self._answers.popleft()
+            if client.connection in self.clients:
+                self._send(client, MSG_INPUT, answer.encode("utf-8"))
+
+    def _accept(self, _, mask: int = selectors.EVENT_READ):
+        try:
+            connection, address = self.listener.accept()
+        except BlockingIOError:
+            return
+        connection.setblocking(False)
+        client = _Client(connection)
+        self.clients[connection] = client
+        self.selector.register(connection, selectors.EVENT_READ, self._ready)
+
+    def _readable(self, client: _Client):
+        try:
+            alive = client.reader.receive()
+        except BlockingIOError:
+            return
+        except (ConnectionError, OSError):
+            alive = False
+        for kind, payload in client.reader.frames():
+            if kind == MSG_TEXT:
+                client.output.append(str(payload, "utf-8"))
+            elif kind == MSG_INPUT:
+                self._ask(client, str(payload, "utf-8"))
+            elif kind == MSG_DIRTY and client.framebuffer is not None:
+                client.output.append(client.framebuffer.render(*DIRTY.unpack(payload), client.styles))
+            elif kind == MSG_STYLE:
+                client.styles[STYLE.unpack_from(payload)[0]] = str(payload[STYLE.size:], "utf-8")
+            elif kind == MSG_ATTACH:
+                from ._shm import SharedFrameBuffer
+                try:
+                    client.framebuffer = SharedFrameBuffer(name=str(payload[ATTACH.size:], "utf-8"))
+                except (OSError, ValueError):
+                    alive = False  # The owner already unlinked it, only this client loses its connection
+                    break
+                self._send(client, MSG_ATTACH)  # Now the owner may unlink the segment whenever it wants
+            elif kind == MSG_SHUTDOWN:
+                alive = False
+        if not alive:
+            self._drop(client)
+
+    def _ask(self, client: _Client, prompt: str):
+        # input() blocks, so it gets its own thread and hands the answer back through the wake up socket
+        self._flush_output()
+        with self._input_ready:
+            self._inputs.append((client, prompt))
+            if self._input_thread is None:
+                self._input_thread = threading.Thread(target=self._input_loop, daemon=True)
+                self._input_thread.start()
+            self._input_ready.notify()
+
+    def _input_loop(self):
         while True:
+            with self._input_ready:
+                while not self._inputs:
+                    self._input_ready.wait()
+                client, prompt = self._inputs.popleft()
             try:
-                if not shutdown_signal.empty():
-                    print("Shutting down server...")
+                answer = input(prompt)
+            except EOFError:
+                answer = ""
+            self._answers.append((client, answer))
+            self._poke()
+
+    def _send(self, client: _Client, kind: int, payload: bytes = b""):
+        client.outgoing.append(HEADER.pack(len(payload), kind) + payload)
+        self._writable(client.connection)
+
+    def _writable(self, connection: socket.socket):
+        client = self.clients.get(connection)
+        if client is None:
+            return
+        try:
+            while client.outgoing:
+                sent = connection.send(client.outgoing[0])
+                if sent < len(client.outgoing[0]):
+                    client.outgoing[0] = client.outgoing[0][sent:]
                     break
-                server_socket.settimeout(1)  # Set timeout to check for shutdown signal
-                try:
-                    connection, address = server_socket.accept()
-                    handler = SecureSocketServer(UndefinedSocket(connection), protocol)
-                except socket.timeout:
-                    continue  # Continue checking for shutdown signal
+                client.outgoing.popleft()
+        except BlockingIOError:
+            pass
+        except (ConnectionError, OSError):
+            self._drop(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outgoing else 0)
+        self.selector.modify(connection, events, self._ready)
 
-                thread = threading.Thread(target=client_handler, args=(handler,))
-                thread.start()
-                thread.join()
-            except Exception as e:
-                print(f"An error occurred: {e}")
+    def _ready(self, connection: socket.socket, mask: int = selectors.EVENT_READ):
+        client = self.clients.get(connection)
+        if client is None:
+            return  # Dropped by an earlier key of the same select() batch
+        try:
+            if mask & selectors.EVENT_READ:
+                self._readable(client)
+            if mask & selectors.EVENT_WRITE and connection in self.clients:
+                self._writable(connection)
+        except Exception as e:
+            # A bad frame or a failing handler only costs this client its connection, the others keep going
+            print(f"Dropping a client after an error: {e!r}", file=sys.stderr)
+            self._drop(client)
 
+    def _drop(self, client: _Client):
+        if self.clients.get(client.connection) is not client:
+            return  # Already gone
+        self._flush_output()
+        self.clients.pop(client.connection)
+        self.selector.unregister(client.connection)
+        client.connection.close()
+        if client.framebuffer is not None:
+            client.framebuffer.close()
+        if self.stop_when_idle and not self.clients:
+            self.running = False
+
+    def _flush_output(self):
+        # Everything the clients sent during one loop iteration goes out with one write
+        chunks = []
+        for client in self.clients.values():
+            if client.output:
+                chunks.extend(client.output)
+                client.output.clear()
+        if chunks:
+            self.output.write("".join(chunks))
+            self.output.flush()
+
+    def serve_forever(self):
+        self.running = True
+        try:
+            while self.running:
+                for key, mask in self.selector.select():  # No timeout, shutdown wakes us up instead
+                    key.data(key.fileobj, mask)
+                self._flush_output()
+        finally:
+            self.close()
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.clients.pop(client.connection)
+            self.selector.unregister(client.connection)
+            client.connection.close()
+            if client.framebuffer is not None:
+                client.framebuffer.close()
+        self.selector.close()
+        self.listener.close()
+        self._wake_receive.close()
+        self._wake_send.close()
+
+
+def run_server(host, port):
+    server = RendererServer(host, port)
+
+    def handle_shutdown(signum, frame):
+        """Handle the shutdown signal by waking the server loop up."""
+        server.shutdown()
 
-if __name__ == "__main__":
     # Register the signal handler for SIGINT and SIGTERM
     signal.signal(signal.SIGINT, handle_shutdown)
     signal.signal(signal.SIGTERM, handle_shutdown)
-    HOST, PORT, PROTOCOL = sys.argv[1:]
-    run_server(HOST, int(PORT), ControlCodeProtocol.deserialize(PROTOCOL))
+    server.serve_forever()
+    print("Shutting down server...")
+
+
+if __name__ == "__main__":
+    enable_ansi()
+    HOST, PORT = sys.argv[1:]
+    run_server(HOST, int(PORT))
@@ -0,0 +1,117 @@
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from .styles import StyleState, RESET
+from .width import char_width
+from ._ipc import DIRTY
+from array import array
+import struct
+import os
+
+
+# [width: u32][height: u32] followed by width * height code points and then as many style ids, all u32
+LAYOUT = struct.Struct("=II")
+BLANK = ord(" ")
+WIDE_TAIL = 0  # Right half of a wide character, nothing gets printed for it
+_created = set()  # Names made by this process, attaching to those in-process mustn't unregister them
+
+
+class SharedFrameBuffer:
+    """A cell grid in shared memory, the parent writes cells and the renderer reads them where it's told to"""
+    def __init__(self, width: int = 0, height: int = 0, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=LAYOUT.size + width * height * 8)
+            LAYOUT.pack_into(self.memory.buf, 0, width, height)
+            _created.add(self.memory.name)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            if os.name != "nt" and name not in _created:  # Attaching registers it with our resource tracker, which would unlink it on exit
+                try:
+                    from multiprocessing import resource_tracker
+                    resource_tracker.unregister(self.memory._name, "shared_memory")
+                except (ImportError, AttributeError, KeyError):
+                    pass
+        self.width, self.height = LAYOUT.unpack_from(self.memory.buf, 0)
+        count = self.width * self.height
+        self.chars = self.memory.buf[LAYOUT.size:LAYOUT.size + count * 4].cast("I")
+        self.styles = self.memory.buf[LAYOUT.size + count * 4:LAYOUT.size + count * 8].cast("I")
+        if self.owner:
+            self.chars[:] = array("I", [BLANK]) * count
+
+        self.style_ids: Dict[StyleState, int] = {RESET: 0}  # Only the writer fills this
+        self.dirty: Optional[List[int]] = None  # [x1, y1, x2, y2] bounding box of everything written since take_dirty
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def style_id(self, style: Optional[StyleState]) -> Tuple[int, bool]:
+        """The id for style and whether it is new (then the renderer has to be told about it)"""
+        style = style or RESET
+        style_id = self.style_ids.get(style)
+        if style_id is None:
+            style_id = self.style_ids[style] = len(self.style_ids)
+            return style_id, True
+        return style_id, False
+
+    def put_line(self, x: int, y: int, text: str, style_id: int = 0):
+        if not 1 <= y <= self.height:
+            return
+        start = x
+        row = (y - 1) * self.width
+        for char in text:
+            columns = char_width(char)
+            if not columns:
+                continue  # Combining marks don't survive the code point per cell layout
+            if x < 1 or x + columns - 1 > self.width:
+                break
+            self.chars[row + x - 1] = ord(char)
+            self.styles[row + x - 1] = style_id
+            if columns == 2:
+                self.chars[row + x] = WIDE_TAIL
+                self.styles[row + x] = style_id
+            x += columns
+        if x > start:
+            self._mark(start, y, x - 1, y)
+
+    def _mark(self, x1: int, y1: int, x2: int, y2: int):
+        if self.dirty is None:
+            self.dirty = [x1, y1, x2, y2]
+        else:
+            dirty = self.dirty
+            dirty[0], dirty[1] = min(dirty[0], x1), min(dirty[1], y1)
+            dirty[2], dirty[3] = max(dirty[2], x2), max(dirty[3], y2)
+
+    def take_dirty(self) -> Optional[bytes]:
+        """The DIRTY payload for everything written since the last call, None if nothing was"""
+        if self.dirty is None:
+            return None
+        x1, y1, x2, y2 = self.dirty
+        self.dirty = None
+        return DIRTY.pack(x1, y1, x2 - x1 + 1, y2 - y1 + 1)
+
+    def render(self, x: int, y: int, width: int, height: int, style_sequences: Dict[int, str]) -> str:
+        """The escape sequences that paint the region on the renderer's console"""
+        parts = []
+        current_style = None
+        for row_y in range(y, min(y + height, self.height + 1)):
+            row = (row_y - 1) * self.width
+            parts.append(f"\x1b[{row_y};{x}H")
+            for i in range(row + x - 1, row + min(x + width - 1, self.width)):
+                style_id = self.styles[i]
+                if style_id != current_style:
+                    parts.append(style_sequences.get(style_id, "\x1b[0m"))
+                    current_style = style_id
+                code = self.chars[i]
+                if code != WIDE_TAIL:
+                    parts.append(chr(code))
+        parts.append("\x1b[0m")
+        return "".join(parts)
+
+    def close(self):
+        self.chars.release()
+        self.styles.release()
+        self.memory.close()
+        if self.owner:
+            _created.discard(self.memory.name)
+            self.memory.unlink()
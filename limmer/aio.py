@@ -0,0 +1,102 @@
+from .basics import Window
+from .events import Event
+from .width import fit
+from typing import AsyncIterable, Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+import asyncio
+
+
+class AsyncEvent(Event):
+    """An event whose frames come from an async generator or a coroutine function instead of step()
+
+    The source is either an async iterable of frames or a coroutine function that gets the event
+    and sets event.frame itself. Frames are padded/cut to self.length columns.
+    """
+    def __init__(self, source: Union[AsyncIterable[str], Callable[["AsyncEvent"], Awaitable[None]]],
+                 length: int = 1, position: Optional[Tuple[int]] = (1, 1)):
+        self.length = length
+        super().__init__(position)
+        self.source = source
+
+    def set_frame(self, frame: str):
+        self.frame = fit(frame, self.length)
+
+    async def run(self):
+        if callable(self.source):
+            await self.source(self)
+            return
+        async for frame in self.source:
+            self.set_frame(frame)
+
+
+class AsyncWindow(Window):
+    """A Window that renders from the running asyncio loop, no threads or time.sleep polling involved"""
+    def __init__(self, interval: Union[int, float] = 0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.interval = interval
+        self.render_task: Optional[asyncio.Task] = None
+        self.event_tasks: Set[asyncio.Task] = set()
+        self.step_handles: Dict[Event, asyncio.TimerHandle] = {}
+
+    async def send_text(self, *content, no_send: bool = False):
+        self.sendText(*content, no_send=no_send)
+        for item in content:
+            if isinstance(item, Event) and self.render_task is not None:
+                self._start_event(item)
+
+    def _start_event(self, event: Event):
+        if isinstance(event, AsyncEvent):
+            task = asyncio.get_running_loop().create_task(event.run())
+            self.event_tasks.add(task)
+            task.add_done_callback(self.event_tasks.discard)
+        elif event.live:
+            return  # It works out its frame when the window draws, nothing to step
+        elif event not in self.step_handles:
+            self._step_later(event)
+
+    def _step_later(self, event: Event):
+        # A loop timer per event is just a heap entry, there is no task or thread behind it
+        loop = asyncio.get_running_loop()
+        self.step_handles[event] = loop.call_later(event.interval, self._step, event)
+
+    def _step(self, event: Event):
+        if event.store is not self.positions:  # Removed from the window
+            del self.step_handles[event]
+            return
+        event.step()
+        self._step_later(event)
+
+    async def start(self):
+        if self.render_task is not None:
+            return
+        self.stop_event.clear()
+        self.render_task = asyncio.get_running_loop().create_task(self._render())
+        for event in self.events:
+            self._start_event(event)
+
+    async def _render(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            self.windowTick()
+            deadline = max(deadline + self.interval, loop.time())  # Don't try to catch up on missed frames
+            await asyncio.sleep(deadline - loop.time())
+
+    async def stop(self):
+        self.stop_event.set()
+        for handle in self.step_handles.values():
+            handle.cancel()
+        self.step_handles.clear()
+        tasks = [*self.event_tasks, *([self.render_task] if self.render_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.event_tasks.clear()
+        self.render_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+        self.windowTick()  # Last frame, so the screen shows the final state
@@ -0,0 +1,70 @@
+from .width import fit, str_width
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import threading
+import time
+
+
+clock: Callable[[], float] = time.monotonic  # Every animation reads the same clock, so equal ones run in lockstep
+
+
+def set_clock(new_clock: Callable[[], float]):
+    """Swaps the clock all animations are driven by, e.g. for replays or tests"""
+    global clock
+    clock = new_clock
+
+
+class Animation:
+    """A loop of frames that is compiled once and shared by every event showing it
+
+    Frames are padded/cut to length columns up front, sequences[i] is frames[i] followed by the move back over it.
+    The move is always there, a frame ending in the last column leaves a pending wrap though, so the cursor ends up
+    one column left of where it started (Cursor.advance keeps track of that). Which frame is current only depends
+    on the clock, so there is no per-event state and a tick is one table lookup.
+    """
+    __slots__ = ("frames", "sequences", "interval", "length")
+
+    def __init__(self, frames: Iterable[str], interval: float = 0.1, length: Optional[int] = None):
+        frames = tuple(frames)
+        if not frames:
+            raise ValueError("an animation needs at least one frame")
+        if interval <= 0:
+            raise ValueError(f"interval has to be positive, not {interval!r}")
+        if length is None:
+            length = max(map(str_width, frames))
+        self.length = length
+        self.interval = interval
+        self.frames: Tuple[str, ...] = tuple(fit(frame, length) for frame in frames)
+        back = min("\b" * length, f"\x1b[{length}D", key=len) if length else ""
+        self.sequences: Tuple[str, ...] = tuple(frame + back for frame in self.frames)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def index_at(self, now: Optional[float] = None) -> int:
+        return int((clock() if now is None else now) / self.interval) % len(self.frames)
+
+    def frame_at(self, now: Optional[float] = None) -> str:
+        return self.frames[self.index_at(now)]
+
+    def __repr__(self):
+        return f"Animation({list(self.frames)!r}, interval={self.interval!r})"
+
+
+_animations: Dict[Tuple[Tuple[str, ...], float, Optional[int]], Animation] = {}
+_animations_lock = threading.Lock()
+
+
+def get_animation(frames: Iterable[str], interval: float = 0.1, length: Optional[int] = None) -> Animation:
+    """The shared Animation for these frames, compiled the first time it's asked for"""
+    key = (tuple(frames), interval, length)
+    animation = _animations.get(key)
+    if animation is None:
+        with _animations_lock:
+            animation = _animations.get(key)
+            if animation is None:
+                animation = _animations[key] = Animation(*key)
+    return animation
+
+
+SPINNER = get_animation("\\|/-")
+POINTINGS = get_animation(["   ", ".  ", ".. ", "..."])
@@ -1,35 +1,72 @@
-from .ANSIUtils import query_cursor_position
-from .styles import InLineStyleAttr
-from typing import List, Optional, Union
-from . import events
+from .ANSIUtils import query_cursor_position, setup_terminal
+from .styles import InLineStyleAttr, StyleState, DEFAULT, RESET, apply_sgr, sgr_transition
+from .buffer import CellBuffer, INVALID
+from .width import char_width, str_width
+from .scheduler import Scheduler, get_scheduler
+from .positions import PositionStore
+from .metrics import RenderMetrics
+from .resize import get_resize_monitor
+from .stream import TextStream
+from .scrollback import Scrollback
+from .sink import FdSink
+from .panes import LogPane
+from ._ipc import FrameReader, FrameWriter, MSG_TEXT, MSG_INPUT, MSG_SHUTDOWN, MSG_ATTACH, MSG_STYLE, MSG_DIRTY, ATTACH, STYLE
+from typing import Callable, List, Optional, TextIO, Tuple, Union
+from contextlib import contextmanager
+from . import events, animation
 import time
 import sys
+import re
 import os
 import socket
 import errno
 import threading
 import subprocess
-from aplustools.security.protocols import ControlCodeProtocol
 
 
-# {comm_code::NEWLINE}  # Seperator for messages
 class _CmdWindow:
-    def __init__(self, forced_host: str = None, forced_port: int = None):
-        self.protocol = ControlCodeProtocol()
+    def __init__(self, forced_host: str = None, forced_port: int = None, transport: str = "socket",
+                 size: Tuple[int, int] = (80, 24)):
         self.host = forced_host or "127.0.0.1"
-
+        # Set before anything can raise, __del__ still calls shutdown() on a half built window
+        self.connection = None
+        self.writer: Optional[FrameWriter] = None
+        self.reader: Optional[FrameReader] = None
+        self.connection_established = threading.Event()
+        self.process = None
+        # With "shm" cells go into a shared memory framebuffer and only the dirty regions are sent
+        self.framebuffer = None
+        self.attached = False  # The renderer confirmed it opened the framebuffer, until then we mustn't unlink it
+        if transport == "shm":
+            from ._shm import SharedFrameBuffer
+            self.framebuffer = SharedFrameBuffer(*size)
+        elif transport != "socket":
+            raise ValueError(f"Unknown transport {transport!r}")
+
+        # A renderer that already listens on the forced port gets another client instead of a second console
+        if forced_port and self.attach(forced_port):
+            return
         self.port = None
         port = forced_port or self.find_available_port()
         while not self.port:
             self.port = self.test_port(port)
             port = self.find_available_port()
 
-        self.process = subprocess.Popen(['py', './_server.py', str(self.host), str(self.port),
-                                         self.protocol.serialize()], creationflags=subprocess.CREATE_NEW_CONSOLE)
-        self.connection = None
-        self.connection_established = False
+        self.process = subprocess.Popen([sys.executable, '-m', 'limmer._server', str(self.host), str(self.port)],
+                                        creationflags=getattr(subprocess, "CREATE_NEW_CONSOLE", 0))
         threading.Thread(target=self.connect_to_server).start()
 
+    def attach(self, port: int) -> bool:
+        """Connects to a renderer that is already running on port, False if nothing listens there"""
+        try:
+            self.connection = socket.create_connection((self.host, port), timeout=1)
+        except OSError:
+            return False
+        self.connection.settimeout(None)
+        self.port = port
+        self._connected()
+        return True
+
     @staticmethod
     def find_available_port():
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -64,46 +101,103 @@ class _CmdWindow:
                     raise
         raise RuntimeError("Port is still in use after several retries")
 
-    def connect_to_server(self):
-        try:
-            self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.connection.connect((self.host, self.port))
-            print(f"Connected to server at {self.host}:{self.port}")
-
-            # Receive initial message from the server
-            buffer_size = 1024
-            initial_message = self.connection.recv(buffer_size).decode('utf-8')
-            print(f"Received from server: {initial_message}")
-
-        except ConnectionError as e:
-            print(f"Connection error: {e}")
-            return  # Add a return statement to prevent setting connection_established in case of error
-
-        self.connection_established = True
-
-    def write(self, command):
-        if not command:
+    def connect_to_server(self, retries: int = 50, delay: float = 0.1):
+        # The server process needs a moment before it listens
+        while True:
+            try:
+                self.connection = socket.create_connection((self.host, self.port))
+                break
+            except ConnectionError as e:
+                retries -= 1
+                if retries <= 0:
+                    print(f"Connection error: {e}")
+                    return  # connection_established stays unset, writes will fail instead of hanging forever
+                time.sleep(delay)
+        self._connected()
+
+    def _connected(self):
+        self.writer = FrameWriter(self.connection)
+        self.reader = FrameReader(self.connection)
+        if self.framebuffer is not None:
+            size = ATTACH.pack(self.framebuffer.width, self.framebuffer.height)
+            self.writer.write(MSG_ATTACH, size + self.framebuffer.name.encode("utf-8"))
+        self.connection_established.set()
+
+    def _wait_for_connection(self, timeout: Optional[float] = 10):
+        if not self.connection_established.wait(timeout):
+            raise ConnectionError(f"Couldn't connect to the server at {self.host}:{self.port}")
+
+    def write(self, *command):
+        # Messages are length prefixed frames and get sent in batches by the writer
+        payload = "".join(str(command_part) for command_part in command)
+        if not payload:
             return
-
-        # Adding a newline as a delimiter
-        rep = next(iter(self.protocol.get('REP')))
-        full_command = command + f"{{{self.comm_code}::{self.protocol.get('SEPERATOR').replace(self.protocol.get('REP')[rep], rep)}}}"
-
-        # Wait until the connection is established
-        while not self.connection_established:
-            time.sleep(0.1)  # Wait briefly and check again
-
-        if hasattr(self, 'connection'):
-            self.connection.send(full_command.encode('utf-8'))
+        self._wait_for_connection()
+        self.writer.write(MSG_TEXT, payload.encode("utf-8"))
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def _shared_framebuffer(self):
+        if self.framebuffer is None:
+            raise RuntimeError("put_line() and commit() need transport=\"shm\", use write() with the socket")
+        return self.framebuffer
+
+    def put_line(self, x: int, y: int, text: str, style: Optional[StyleState] = None):
+        # Only with the shm transport, nothing goes over the socket until commit()
+        framebuffer = self._shared_framebuffer()
+        style_id, new = framebuffer.style_id(style)
+        if new:
+            self._wait_for_connection()
+            sequence = sgr_transition(None, style) if style else "\x1b[0m"
+            self.writer.write(MSG_STYLE, STYLE.pack(style_id) + sequence.encode("utf-8"))
+        framebuffer.put_line(x, y, text, style_id)
+
+    def commit(self):
+        dirty = self._shared_framebuffer().take_dirty()
+        if dirty is not None:
+            self._wait_for_connection()
+            self.writer.write(MSG_DIRTY, dirty)
+            self.writer.flush()
+
+    def input(self, string: str = "") -> str:
+        self._wait_for_connection()
+        self.writer.write(MSG_INPUT, string.encode("utf-8"))
+        self.writer.flush()
+        for kind, payload in self.reader:
+            if kind == MSG_INPUT:
+                return bytes(payload).decode("utf-8")
+            if kind == MSG_ATTACH:
+                self.attached = True
+        return ""  # Server is gone
+
+    def _wait_for_attach(self, timeout: float = 5):
+        # The renderer opens the segment by name, unlinking it before that would leave it with nothing to open
+        self.connection.settimeout(timeout)
+        for kind, _ in self.reader:  # Ends once the server hung up (or after timeout)
+            if kind == MSG_ATTACH:
+                self.attached = True
+                break
 
     def shutdown(self):
-        if hasattr(self, 'connection') and self.connection:
-            # Send a shutdown signal to the server
-            self.connection.send("SHUTDOWN 0xC000013A".encode('utf-8'))
+        if getattr(self, "connection", None):
+            try:
+                # Send a shutdown signal to the server
+                self.writer.write(MSG_SHUTDOWN)
+                self.writer.close()
+                if self.framebuffer is not None and not self.attached:
+                    self._wait_for_attach()
+            except OSError:
+                pass
             # Close the connection
             self.connection.close()
             self.connection = None
-        self.connection_established = False
+        if getattr(self, "connection_established", None) is not None:
+            self.connection_established.clear()
+        if getattr(self, "framebuffer", None) is not None:
+            self.framebuffer.close()
+            self.framebuffer = None
 
     def __del__(self):
         self.shutdown()
@@ -115,10 +209,52 @@ if __name__ == "__main__":
 
 
 class Cursor:
-    def __init__(self, max_position, position: Optional[List[int]] = None):
-        self._position = list(position or query_cursor_position())
+    # Splits emitted text into printable runs, CSI sequences, other escapes and single control characters
+    _TOKENS = re.compile(r"\x1b\[([0-9;?]*)[ -/]*([@-~])|\x1b.?|[\x00-\x1f\x7f]|[^\x00-\x1f\x7f\x1b]+")
+    _CONTROL = re.compile(r"[\x00-\x1f\x7f]")
+
+    def __init__(self, max_position, position: Optional[List[int]] = None, output: Optional[TextIO] = None,
+                 query: Optional[Callable[[], Tuple[int, int]]] = None):
+        self.max_position = max_position  # [width, height] shared with the Window, falsy if unknown
+        self.output = output or self.default_output()
+        self.raw = isinstance(self.output, FdSink)  # Bytes straight to the fd, see _flush
+        self.query = query or query_cursor_position  # Answers (row, column), e.g. a VirtualTerminal's
+        self.frame_depth = 0  # While > 0 finishCMD keeps collecting and end_frame writes it all at once
+        self.wrap_pending = False  # The terminal waits to wrap until the next printable character
+        self.drifted = False  # Set when we emitted something we can't follow, resync() fixes it
+        self.unanswered = False  # The last query timed out, only an explicit resync() asks again
+        # Plain counters for RenderMetrics, cheap enough to always keep
+        self.writes = 0
+        self.bytes_written = 0
+        self.sequences = 0
+        self.dsr_queries = 0
+        self._position = [1, 1]
+        if position:
+            self._position = list(position)
+        elif output is not None and query is None:
+            # Some stream we were handed, the tty (if there even is one) isn't where the text goes, so asking it
+            # would only block. Start top left and leave asking to an explicit resync()
+            self.drifted = self.unanswered = True
+        else:
+            self.refresh_pos()
+        self.saved_position = None
+        self.screen: Optional[CellBuffer] = None  # What we know is on screen, lets go_to overprint instead of moving
+        self.style: Optional[StyleState] = None  # What the terminal currently uses, None if we don't know
         self.current_command = ""
 
+    @staticmethod
+    def default_output() -> TextIO:
+        # The console's fd directly where that works, Windows consoles want their text through sys.stdout
+        if os.name != "nt":
+            sink = FdSink.for_stream(sys.stdout)
+            if sink is not None:
+                return sink
+        return sys.stdout
+
+    def _query_position(self) -> List[int]:
+        row, column = self.query()
+        return [column, row]
+
     @property
     def position(self):
         return self._position
@@ -126,55 +262,307 @@ class Cursor:
     @position.setter
     def position(self, new):
         self._position = new
-        
+        self.wrap_pending = False
+
+    @property
+    def text_position(self) -> List[int]:
+        # Where the next printable character will land. One row past the bottom if the terminal scrolls first,
+        # the buffers scroll the same way and take whatever was put there along
+        if self.wrap_pending:
+            return [1, self.position[1] + 1]
+        return list(self.position)
+
+    def _bound(self, i: int) -> int:
+        return self.max_position[i] if self.max_position else sys.maxsize
+
+    def _clamp(self):
+        self._position[0] = min(max(self._position[0], 1), self._bound(0))
+        self._position[1] = min(max(self._position[1], 1), self._bound(1))
+
     def go_up(self, n: int = 1):
         self.position[1] -= n
+        self.wrap_pending = False
         self.current_command += f"\x1b[{n}A"
     
     def go_down(self, n: int = 1):
         self.position[1] += n
+        self.wrap_pending = False
         self.current_command += f"\x1b[{n}B"
     
     def go_left(self, n: int = 1):
         self.position[0] -= n
+        self.wrap_pending = False
         self.current_command += f"\x1b[{n}D"
     
     def go_right(self, n: int = 1):
         self.position[0] += n
+        self.wrap_pending = False
         self.current_command += f"\x1b[{n}C"
 
     def refresh_pos(self):
-        self.position = list(query_cursor_position())
+        self.dsr_queries += 1
+        try:
+            self.position = self._query_position()
+        except (TimeoutError, OSError):
+            # No answer (or no terminal), keep our own idea of where we are. Asking again on every write would
+            # block each of them for the whole timeout, so that waits for resync() or the next resize
+            self.drifted = self.unanswered = True
+            return False
+        self.unanswered = False
+        return True
+
+    def resync(self):
+        # The only place that still asks the terminal, anything pending has to be out first
+        if self.current_command:
+            self._flush()
+        self.drifted = False
+        self.refresh_pos()
 
-    def _go_to(self, x: int, y: int):
-        self.position[0] += x
-        self.position[1] += y
+    @staticmethod
+    def _cup(x: int, y: int) -> str:
+        if x == 1:
+            return "\x1b[H" if y == 1 else f"\x1b[{y}H"
+        return f"\x1b[{y};{x}H"
 
-        self.current_command += f"\xb1[{self.position[1]};{self.position[0]}H"
+    @staticmethod
+    def _csi_move(n: int, final: str) -> str:
+        return f"\x1b[{final}" if n == 1 else f"\x1b[{n}{final}"
+
+    def _overprint(self, y: int, start: int, end: int) -> Optional[str]:
+        # Re-printing cells we know are on screen in the current style is often shorter than a move
+        if self.screen is None or self.style is None or end - start > 8 or not 1 <= y <= self.screen.height:
+            return None
+        chars, styles = self.screen.chars[y - 1], self.screen.styles[y - 1]
+        if not chars[start - 1]:
+            return None  # Can't start printing in the middle of a wide character
+        if end <= self.screen.width and not chars[end - 1]:
+            return None  # Printing the last one would go one column too far
+        for x in range(start, end):
+            if chars[x - 1] == INVALID or styles[x - 1] != self.style:
+                return None
+        return self.screen.text(start, y, end - start)
+
+    def _horizontal(self, y: int, current_x: int, x: int, overprint: bool = True) -> str:
+        if x > current_x:
+            move = self._csi_move(x - current_x, "C")
+            text = self._overprint(y, current_x, x) if overprint else None
+            return text if text is not None and len(text.encode()) < len(move) else move
+        if x < current_x:
+            n = current_x - x
+            return min(self._csi_move(n, "D"), "\b" * n, "\r" + self._horizontal(y, 1, x), key=len)
+        return ""
+
+    def _go_to(self, x: int, y: int):
+        self.position = [x, y]
+        self.current_command += self._cup(x, y)
 
     def go_to(self, x: int, y: int):
+        """Moves to [x, y] with the cheapest sequence out of CUP, relative moves, \\r, \\n and overprinting"""
         #self.refresh_pos()
-        current_x = self.position[0]
-        current_y = self.position[1]
-        
-        if x > current_x:
-            self.go_right(x - current_x)
-        elif x < current_x:
-            self.go_left(current_x - x)
-            
+        current_x, current_y = self.position
+        if x == current_x and y == current_y and not self.wrap_pending:
+            return
+
+        options = [self._cup(x, y)]
         if y > current_y:
-            self.go_down(y - current_y)
+            vertical = self._csi_move(y - current_y, "B")
+            if y - current_y <= 2:  # \n also goes back to the first column
+                options.append("\n" * (y - current_y) + self._horizontal(y, 1, x))
         elif y < current_y:
-            self.go_up(current_y - y)
-            
+            vertical = self._csi_move(current_y - y, "A")
+        else:
+            vertical = ""
+        # With a pending wrap printing anything would wrap first, so no overprinting from here
+        options.append(vertical + self._horizontal(y, current_x, x, overprint=not self.wrap_pending))
+        options.append(vertical + "\r" + self._horizontal(y, 1, x))
+
+        if self.wrap_pending:  # Staying put would keep the pending wrap, only a real move clears it
+            options = [option for option in options if option]
+        self.current_command += min(options, key=len)
+        self.position = [x, y]
+
+    def return_to(self, position: List[int], wrap_pending: bool = False):
+        """go_to, and if a wrap was pending there, prints the cell before it again so it's pending again"""
+        x, y = position
+        screen = self.screen
+        if not wrap_pending or screen is None or not 1 <= y <= screen.height or x != screen.width:
+            self.go_to(x, y)
+            return
+        start = x - 1 if not screen.chars[y - 1][x - 1] and x > 1 else x  # Right half of a wide char
+        if screen.is_invalid(start, y):
+            self.go_to(x, y)
+            return
+        style = self.style
+        self.go_to(start, y)
+        self.set_style(screen.styles[y - 1][start - 1])
+        self.appendCMD(screen.text(start, y, x - start + 1))
+        if style is not None:
+            self.set_style(style)
+
+    def _advance_printable(self, text: str):
+        width = self._bound(0)
+        x, y = self._position
+        if text.isascii():
+            # Index of the last written character counted from the start of the current line
+            last = (width if self.wrap_pending else x - 1) + len(text) - 1
+            rows, column = divmod(last, width)
+            self._position[1] = min(y + rows, self._bound(1))  # Anything below the bottom scrolls
+            self.wrap_pending = column == width - 1
+            self._position[0] = column + 1 if self.wrap_pending else column + 2
+            return
+        for char in text:  # Wide characters that don't fit into the last column wrap early, so go one by one
+            columns = char_width(char)
+            if not columns:
+                continue
+            if self.wrap_pending or x + columns - 1 > width:
+                x, y = 1, min(y + 1, self._bound(1))
+                self.wrap_pending = False
+            x += columns
+            if x > width:
+                x, self.wrap_pending = width, True
+        self._position[0], self._position[1] = x, y
+
+    def _advance_csi(self, params: str, final: str):
+        if params.startswith("?"):
+            return  # Private modes like ?25l don't move the cursor
+        args = [int(p) if p else 0 for p in params.split(";")] if params else []
+        n = max(args[0], 1) if args else 1
+        pos = self._position
+        if final == "A":
+            pos[1] -= n
+        elif final == "B":
+            pos[1] += n
+        elif final == "C":
+            pos[0] += n
+        elif final == "D":
+            pos[0] -= n
+        elif final in "Hf":
+            pos[1] = n
+            pos[0] = max(args[1], 1) if len(args) > 1 else 1
+        elif final == "G":
+            pos[0] = n
+        elif final == "d":
+            pos[1] = n
+        elif final == "E":
+            pos[0], pos[1] = 1, pos[1] + n
+        elif final == "F":
+            pos[0], pos[1] = 1, pos[1] - n
+        elif final == "s":
+            self.saved_position = list(pos)
+            return
+        elif final == "u":
+            if self.saved_position is None:
+                self.drifted = True
+            else:
+                pos[:] = self.saved_position
+        elif final == "m":
+            # Followed like the buffers do for their cells, from an unknown style only a reset makes it known again
+            sgr = params.split(";") if params else ["0"]
+            self.style = apply_sgr(self.style or RESET, sgr) if self.style is not None or sgr[0] in ("", "0") else None
+            return
+        elif final in "KJnST":
+            return  # Erasing, reports and scrolling don't move the cursor
+        elif final in "LM":
+            pos[0] = 1  # Inserting/deleting lines goes back to the first column
+        elif final == "r":
+            pos[0], pos[1] = 1, 1  # Setting the scroll region homes the cursor
+        else:
+            self.drifted = True
+            return
+        self.wrap_pending = False
+        self._clamp()
+
+    def advance(self, string: str):
+        """Moves the position the same way the terminal will once it received string"""
+        if not self._CONTROL.search(string):
+            if string:
+                self._advance_printable(string)
+            return
+        for match in self._TOKENS.finditer(string):
+            token = match.group()
+            if match.group(2) is not None:
+                self._advance_csi(match.group(1), match.group(2))
+            elif token[0] == "\x1b":
+                self.drifted = True  # OSC, charset switches, ... we don't follow those
+            elif token == "\n":
+                self._position[1] = min(self._position[1] + 1, self._bound(1))
+                self._position[0] = 1  # We write through a cooked terminal, so \n is a \r\n
+                self.wrap_pending = False
+            elif token == "\r":
+                self._position[0] = 1
+                self.wrap_pending = False
+            elif token == "\b":
+                self._position[0] = max(self._position[0] - 1, 1)
+                self.wrap_pending = False
+            elif token == "\t":
+                self._position[0] = min((self._position[0] - 1) // 8 * 8 + 9, self._bound(0))
+                self.wrap_pending = False
+            elif not self._CONTROL.match(token):
+                self._advance_printable(token)
+
+    def set_style(self, style: StyleState):
+        # Bypasses appendCMD, we know exactly what this does to the terminal
+        self.current_command += sgr_transition(self.style, style)
+        self.style = style
+
+    def scroll_region(self, top: int, bottom: int, n: int = 1):
+        """Scrolls rows top..bottom up by n (down if n is negative) with the cheapest sequence for that region
+
+        The whole screen is a plain SU/SD, a region that reaches the bottom is a DL/IL at its top row,
+        anything else gets a DECSTBM region around the SU/SD that is reset right away.
+        """
+        if not n:
+            return
+        count = abs(n)
+        amount = str(count) if count > 1 else ""
+        if top <= 1 and bottom >= self._bound(1):
+            self.current_command += f"\x1b[{amount}{'S' if n > 0 else 'T'}"
+        elif bottom >= self._bound(1):
+            self.go_to(1, top)
+            self.current_command += f"\x1b[{amount}{'M' if n > 0 else 'L'}"
+        else:
+            self.current_command += f"\x1b[{top};{bottom}r\x1b[{amount}{'S' if n > 0 else 'T'}\x1b[r"
+            self.position = [1, 1]
+
     def appendCMD(self, string: str):
+        self.advance(string)
         self.current_command += string
     
-    def finishCMD(self):
-        # Finish and clear command
-        sys.stdout.write(self.current_command)
-        sys.stdout.flush()
+    def _flush(self):
+        command = self.current_command
+        self.writes += 1
+        self.sequences += command.count("\x1b")
+        if self.raw:  # Encoded once, and the sink knows how many bytes actually went out
+            self.bytes_written += self.output.send(command)
+        else:
+            self.bytes_written += len(command) if command.isascii() else len(command.encode("utf-8"))
+            self.output.write(command)
+            self.output.flush()
         self.clearCMD()
+
+    def finishCMD(self):
+        # Finish and clear command, inside a frame it goes out with everything else once the frame ends
+        if not self.frame_depth:
+            self._flush()
+
+    def begin_frame(self):
+        self.frame_depth += 1
+
+    def end_frame(self, synchronized: bool = False):
+        self.frame_depth -= 1
+        if self.frame_depth or not self.current_command:
+            return
+        if synchronized:  # DEC mode 2026, the terminal holds back drawing until the whole frame arrived
+            self.current_command = f"\x1b[?2026h{self.current_command}\x1b[?2026l"
+        self._flush()
+
+    @contextmanager
+    def frame(self, synchronized: bool = False):
+        self.begin_frame()
+        try:
+            yield self
+        finally:
+            self.end_frame(synchronized)
     
     def clearCMD(self):
         self.current_command = ""
@@ -184,19 +572,56 @@ class Cursor:
 
 
 class Window:
-    def __init__(self):
+    def __init__(self, cmd_window: bool = False, max_fps: Optional[Union[int, float]] = None,
+                 synchronized_output: bool = False, output: Optional[TextIO] = None,
+                 size: Optional[Tuple[int, int]] = None, position: Optional[List[int]] = None,
+                 terminal=None, frame_history: int = 120, resize_poll_interval: float = 0.5,
+                 scrollback: Optional[Scrollback] = None):
         #sys.stdout.write(" \b")
         #sys.stdout.flush()
-        self.cursor = Cursor(0)
+        # A fixed size (and start position) lets the window run without a real terminal, e.g. into a StringIO.
+        # A terminal (see vterm.VirtualTerminal) replaces all of it: output, size and cursor position queries
+        self.terminal = terminal
+        if terminal is None and output is None:
+            setup_terminal()  # Importing limmer doesn't touch the console anymore, so this is the first chance
+        self.fixed_size = list(size) if size else None
+        self.max_position = self.current_size()
+        if terminal is not None:
+            self.cursor = Cursor(self.max_position, position, output=terminal, query=terminal.query_cursor_position)
+        else:
+            self.cursor = Cursor(self.max_position, position, output=output)
         #print("CCCCCCCCCC", self.cursor.position)
-        self.events = []
-        self.loop_thread = None
+        self.positions = PositionStore()  # Event positions live here, the events only keep their handle
+        self.loop_job = None
+        self.scheduler = None
         self.stop_event = threading.Event()
-
-        self.max_position = self.get_terminal_size()
-        self.last_style = [0, 37, 40]
-
-        self.cmd_window, self.comm_code = _CmdWindow().start()
+        self.lock = threading.RLock()  # The scheduler thread and sendText share the cursor
+        self.max_fps = max_fps
+        self.synchronized_output = synchronized_output
+        self.last_frame: Optional[float] = None  # None until the first frame is drawn
+        self.metrics = RenderMetrics(frame_history)  # Always on, see metrics.py for what it costs
+
+        # Resizes are noticed through SIGWINCH, polling the size only where that doesn't exist
+        self.resize_monitor = get_resize_monitor()
+        if terminal is None and not self.fixed_size:
+            self.resize_monitor.install()
+        self.resize_generation = self.resize_monitor.generation
+        self.resize_poll_interval = resize_poll_interval
+        self.last_resize_poll = time.monotonic()
+
+        self.last_style: StyleState = DEFAULT
+
+        # What we want on screen (back) and what we know is on screen (front)
+        self.back_buffer = CellBuffer(*self.max_position)
+        self.front_buffer = CellBuffer(*self.max_position)
+        self.cursor.screen = self.front_buffer
+
+        # Rows that scroll or a resize pushes off the top end up here (with their styles), if there is one
+        self.scrollback = scrollback
+        self.back_buffer.on_scroll = self._scrolled  # Both buffers scroll the same, events only have to move once
+        self.panes: List[LogPane] = []  # They move along with their text on a resize
+
+        self.cmd_window = _CmdWindow() if cmd_window else None
 
     @staticmethod
     def get_terminal_size():
@@ -204,76 +629,142 @@ class Window:
         width, height = terminal_size_object.columns, terminal_size_object.lines
         return [width, height]
 
+    def current_size(self) -> List[int]:
+        if self.fixed_size:
+            width, height = self.fixed_size
+        elif self.terminal is not None:
+            width, height = self.terminal.get_terminal_size()
+        else:
+            width, height = self.get_terminal_size()
+        return [max(width, 1), max(height, 1)]  # Fresh ptys and some CI consoles say 0x0, the buffers need a cell
+
     @staticmethod
     def clamp_list(lst: list, smallest: list, biggest: list):
         for i, element in enumerate(lst):
             lst[i] = min(max(element, smallest[i]), biggest[i])
         return lst
 
+    def _maybe_resized(self) -> bool:
+        # Asking the real terminal costs an ioctl, so that only happens after a SIGWINCH (or now and then without)
+        if self.fixed_size or self.terminal is not None:
+            return True  # Nothing to ask, comparing is cheap
+        if self.resize_monitor.installed:
+            generation = self.resize_monitor.generation
+            if generation == self.resize_generation:
+                return False
+            self.resize_generation = generation
+            return True
+        now = time.monotonic()
+        if now - self.last_resize_poll < self.resize_poll_interval:
+            return False
+        self.last_resize_poll = now
+        return True
+
     def handle_resize(self):
-        new_size = self.get_terminal_size()
-        if new_size[0] != self.max_position[0]:
-            self.recalculate_positions(new_size)
-            self.max_position = new_size  # Needs to be adjusted here or recalculate position can't scale old positions
-            self.redraw_interface()
+        if not self._maybe_resized():
+            return
+        new_size = self.current_size()
         if new_size != self.max_position:
-            cursor_position = self.cursor.position
-            self.cursor.position = self.clamp_list(cursor_position, [1, 1], self.max_position)
-
-    def recalculate_positions(self, new_size: List[int]):
-        #print("\nRE", new_size, self.max_position)
-        for event in self.events:  # Dynamic event length is kinda easy with this now
-            # Logic to adjust the position of each event
-            last_event_position = event.position
-            old_width = self.max_position[0]
-
-            # x + (y * width)
-            event_pos_chars = last_event_position[0] + (last_event_position[1] * old_width)
-            new_event_pos = [*divmod(event_pos_chars, new_size[0])][::-1]
-            # [event_pos_chars // new_size[0], event_pos_chars % new_size[0]] = divmod
-            # Slicing is more readable,but can be a lot slower than the old with large lists as it creates entire copies
-            event.position = new_event_pos
+            self.max_position = new_size
+            self.cursor.max_position = new_size
+            # Where the next text goes, one past the last column while a wrap is pending
+            x, y = self.cursor.position
+            keep = (x + 1 if self.cursor.wrap_pending else x, y)
+            dropped = [] if self.scrollback is not None else None
+            _, move = self.back_buffer.resize(*new_size, keep, dropped)
+            if dropped:  # Rows the shrink pushed off the top, same as if the text had scrolled them
+                self.scrollback.extend(dropped)
+            self.recalculate_positions(move)
+            self.move_panes(move)
+            text_position = self.clamp_list(list(move(*keep)), [1, 1], self.max_position)
+            # The terminal cuts rows off or pads them, the ones that look the same either way can stay
+            for y in self.front_buffer.resize(*new_size, keep)[0]:
+                self.front_buffer.invalidate_row(y)
+            # Not every terminal re-wraps the same way, so this is one of the few times we have to ask
+            self.cursor.drifted = True
+            self.cursor.resync()
+            self.commit_frame(text_position)
+
+    def recalculate_positions(self, move: Callable[[int, int], Tuple[int, int]]):
+        # Events go wherever the cell they start on went, see CellBuffer.resize
+        for event in self.positions.remap(move):
+            self._removeEvent(event)
+
+    def move_panes(self, move: Callable[[int, int], Tuple[int, int]]):
+        # Panes go with their rows like events do, the ones that are off the screen now are detached
+        for pane in list(self.panes):
+            if not pane.move(move, self.max_position[1]):
+                self.panes.remove(pane)
 
     def redraw_interface(self):
-        # Clear the screen and redraw all elements
-        # Maybe call finishCMD or similar methods on each event or element
-        # But not needed for now as the terminal re-wraps everything for us
-        pass
+        # We can't trust anything the terminal re-wrapped for us, so forget the front buffer and repaint everything
+        self.front_buffer.invalidate()
+        self.commit_frame()
+
+    def commit_frame(self, return_to: Optional[List[int]] = None, wrap_pending: bool = False):
+        # Only emit the runs that changed between what we want and what is on screen
+        text_position = list(return_to or self.cursor.position)
+        if return_to is None:
+            wrap_pending = self.cursor.wrap_pending
+        text_style = self.cursor.style
+        changed = False
+
+        for x, y, text, style in self.back_buffer.diff(self.front_buffer):
+            # Known from now on, go_to may overprint it. Only the run itself, diff is still looking at the rest
+            self.front_buffer.copy_cells(self.back_buffer, x, y, str_width(text))
+            self.cursor.go_to(x, y)
+            self.cursor.set_style(style)
+            self.cursor.appendCMD(text)
+            changed = True
+
+        if changed or return_to is not None:
+            self.cursor.return_to(text_position, wrap_pending)
+            self.cursor.set_style(RESET if text_style is None else text_style)
+            self.cursor.finishCMD()
 
     def windowTick(self):
         #self.cursor.refresh_pos()
-        self.handle_resize()
-        for event in self.events:
-            #print(event)
-            #print(self.max_position)
-            print(self.cursor.position, event)
-            input()
-            event.update(self.cursor)
-        #sys.stdout.write(" \b")
-        #sys.stdout.flush()
-        #self.cursor.refresh_pos()#self.cursor.go_to(*self.max_position)
-            
-    def startEventLoop(self, interval: Union[int, float]=0.1):
-        self.loop_thread = threading.Thread(target=self.eventLoop, args=(interval,))
-        self.loop_thread.start()
-        
-    def eventLoop(self, interval: Union[int, float]):
-        while not self.stop_event.is_set():
-            try:
-                time.sleep(interval)
-                self.windowTick()
-            except Exception as e: # Check for ctr + c
-                print(f"An error has occurred: {e}")
-                break
+        with self.lock:
+            now = time.monotonic()
+            if self.max_fps and self.last_frame is not None and now - self.last_frame < 1 / self.max_fps:
+                self.metrics.skipped_frames += 1
+                return  # The damage stays in the back buffer until we are allowed to draw again
+            self.last_frame = now
+
+            job = self.loop_job
+            budget = job.interval if job is not None else (1 / self.max_fps if self.max_fps else None)
+            if job is not None:
+                self.metrics.dropped_frames = job.missed
+            with self.metrics.frame(self.cursor, job.lag if job is not None else 0.0, budget) as stats:
+                # Everything this tick does goes out in one write
+                with self.cursor.frame(self.synchronized_output):
+                    self.handle_resize()
+                    now = animation.clock()  # One clock read per frame, every animated event shows the same moment
+                    for _, event in self.positions.items():
+                        event.draw(self.back_buffer, now)
+                        stats.events += 1
+                    self.commit_frame()
+
+    def startEventLoop(self, interval: Union[int, float]=0.1, scheduler: Optional[Scheduler] = None):
+        # Runs on the same scheduler thread as the events, so there is no extra thread per window
+        self.stop_event.clear()
+        self.scheduler = scheduler or get_scheduler()
+        self.loop_job = self.scheduler.schedule(self.windowTick, interval)
 
     # : Union[events.Event, str, InLineStyleAttr]
     def sendText(self, *content, no_send: bool=False):
+        with self.lock:
+            self._sendText(content, no_send)
+
+    def _sendText(self, content: tuple, no_send: bool):
         for item in content:
             if issubclass(type(item), events.Event):
                 #self.max_position[1] += item.length
                 #self.cursor.position = self.max_position
-                item.position = self.cursor.position
+                item.position = self.cursor.text_position
+                item.style = self.cursor.style
                 self._appendEvent(item)
+                self._appendText(item.frame)  # Reserve the cells the event draws into
                 #print("HEEEELLLLPPPP", item.position)
             elif issubclass(type(item), InLineStyleAttr):
                 self._appendStyle(item)
@@ -284,44 +775,143 @@ class Window:
                 #else:
                 #    self.max_position[0] += 1
                 self._appendText(item)
-            self.cursor.refresh_pos()
         if not no_send:
             self.cursor.finishCMD()
+            # Only ask the terminal if we couldn't follow what we sent, and not again if it didn't answer last time
+            if self.cursor.drifted and not self.cursor.unanswered:
+                self.cursor.resync()
             
     def _appendText(self, text: str):
-        self.cursor.appendCMD(text)
+        # The text goes straight to the terminal, so both buffers have to know about it
+        x, y = self.cursor.position
+        if self.cursor.wrap_pending:
+            x += 1  # One past the last column, the buffers wrap (and scroll) before the next character like the terminal
+        style = self.cursor.style  # What it will actually look like, None is the terminal's default
+        self.front_buffer.put_text(x, y, text, style)
+        self.back_buffer.put_text(x, y, text, style)
+        self.cursor.appendCMD(text)  # Moves the cursor along with the text
         #self.cursor.finishCMD()
 
 
     def _appendStyle(self, new_style: InLineStyleAttr):
-        self.cursor.appendCMD("\x1b[0m")
-        for i, part in enumerate([x for x in new_style.value.split(";")]):
-            if part.isnumeric() or part.replace(":", "").isnumeric():
-                part = part.replace(":", ";")
-                if not part == 0:
-                    self.last_style[i] = part
-                else:
-                    self.last_style[i] = [0, 37, 40][i]
-        style_str = ';'.join([str(y) for y in self.last_style])
-        print(style_str)
-        self.cursor.appendCMD(f"\x1b[{style_str}m")
+        # Styles stack on top of each other, but only the difference to what the terminal has gets sent
+        self.last_style = new_style.apply(self.last_style)
+        self.cursor.set_style(self.last_style)
         #self.cursor.finishCMD()
             
+    def scroll_region(self, top: int, bottom: int, n: int = 1):
+        """Scrolls rows top..bottom up by n (down if n is negative), nothing outside of them moves
+
+        The terminal does the scrolling and both buffers follow it, so nothing gets repainted. If no row would stay
+        in the region it's cleared and painted blank instead, either way it shows right away.
+        Events inside the region move along, the ones that leave it are removed from the window. Rows scrolled
+        off the top of the screen go to the scrollback.
+        """
+        with self.lock:
+            position, wrap_pending = list(self.cursor.position), self.cursor.wrap_pending
+            self._keep_scrolled(top, bottom, n)
+            if self._scroll_region(top, bottom, n):
+                self.cursor.return_to(position, wrap_pending)
+                self.cursor.finishCMD()
+            else:
+                self.commit_frame(position, wrap_pending)
+
+    def _scroll_region(self, top: int, bottom: int, n: int) -> bool:
+        # Leaves the cursor wherever the scrolling put it, True if anything was sent
+        bottom = min(bottom, self.max_position[1])
+        if not n or top > bottom:
+            return False
+        sent = False
+        if top == bottom or abs(n) > bottom - top:
+            # Nothing that is on screen stays, the next frame just paints the blank rows
+            self.back_buffer.clear_rows(top, bottom)
+        else:
+            self.cursor.scroll_region(top, bottom, n)
+            self.front_buffer.scroll_region(top, bottom, n)
+            self.back_buffer.scroll_region(top, bottom, n)
+            sent = True
+        self._shift_events(top, bottom, n)
+        return sent
+
+    def _scrolled(self, top: int, bottom: int, n: int):
+        # The text we sent scrolled the terminal, the back buffer tells us before the rows move
+        self._keep_scrolled(top, bottom, n)
+        self._shift_events(top, bottom, n)
+
+    def _keep_scrolled(self, top: int, bottom: int, n: int):
+        # Rows leaving the top of the screen go to the scrollback, panes keep their own (see LogPane)
+        if self.scrollback is not None and top == 1 and n > 0:
+            bottom = min(bottom, self.max_position[1])
+            self.scrollback.extend(self.back_buffer.styled_row(y) for y in range(1, min(n, bottom) + 1))
+
+    def _shift_events(self, top: int, bottom: int, n: int):
+        # Events in rows top..bottom move up by n (down if negative), the ones that leave them are removed
+        # An event put down while a wrap was pending on the last row sits one row below it until the text scrolls
+        last = sys.maxsize if bottom >= self.max_position[1] else bottom
+        for event in self.positions.shift_rows(top, bottom, n, last):
+            self._removeEvent(event)
+
+    def add_pane(self, top: int, bottom: int, style: Optional[StyleState] = None,
+                 scrollback: Optional[Scrollback] = None) -> LogPane:
+        """A log pane on rows top..bottom that scrolls on its own, see LogPane"""
+        with self.lock:
+            pane = LogPane(self, top, bottom, style, scrollback)
+            self.panes.append(pane)
+            bottom = min(bottom, self.max_position[1])
+            self.back_buffer.clear_rows(top, bottom)
+            self._shift_events(top, bottom, bottom - top + 1)  # Moving them out of the rows removes them
+            self.commit_frame()
+            return pane
+
+    def stream(self, source=None, max_pending: int = 10000, policy: str = "block",
+               interval: Optional[float] = None) -> TextStream:
+        """Writes lines from an iterable or async iterable (or whatever gets fed to the returned stream) at frame rate
+
+        Iterables are read on their own thread, async iterables by a task on the running loop.
+        See TextStream for the policies, stream.join() or await stream waits until everything is written.
+        """
+        text_stream = TextStream(self, max_pending, policy, interval, self.scheduler)
+        text_stream.start()
+        if source is None:
+            return text_stream
+        if hasattr(source, "__aiter__"):
+            import asyncio
+            text_stream.pump = asyncio.get_running_loop().create_task(text_stream._pump_async(source))
+        else:
+            text_stream.pump = threading.Thread(target=text_stream._pump, args=(source,), name="limmer-stream",
+                                                daemon=True)
+            text_stream.pump.start()
+        return text_stream
+
     def stopEventLoop(self):
         self.stop_event.set()
-        self.loop_thread.join()  # Wait for the event loop thread to finish
+        if self.loop_job is not None:
+            self.scheduler.cancel(self.loop_job)
+            self.loop_job = None
+        for _, event in self.positions.items():  # Events with their own loop go with the window
+            event.stopEventLoop()
+
+    @property
+    def events(self) -> list:
+        return [event for _, event in self.positions.items()]
 
     # : events.Event
     def _appendEvent(self, event):
-        self.events.append(event)
+        event.attach(self.positions, self.positions.add(event, *event.position))
 
     # : events.Event
     def _removeEvent(self, event):
-        self.events.remove(event)
+        handle = event.handle
+        event.detach()
+        self.positions.remove(handle)
         
     def _clearEvents(self):
-        self.events = []
+        for _, event in self.positions.items():
+            event.detach()
+        self.positions.clear()
 
     # : List[events.Event]
     def _replaceEvents(self, events_lst):
-        self.events = events_lst
+        self._clearEvents()
+        for event in events_lst:
+            self._appendEvent(event)
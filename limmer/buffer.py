@@ -0,0 +1,556 @@
+from .width import char_width
+from .styles import StyleState, RESET, apply_sgr, sgr_transition
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from bisect import bisect_right
+from array import array
+import threading
+import sys
+import re
+
+try:
+    import numpy
+except ImportError:  # Optional, only Reflow.move_arrays needs it (see PositionStore.remap)
+    numpy = None
+
+
+BLANK = " "
+WIDE_TAIL = ""  # Right half of a wide character, the terminal fills it when printing the left half
+INVALID = -1  # Never equal to a real cell, used to force a full repaint
+
+# Cells are code points, 0 for WIDE_TAIL, INVALID, or for grapheme clusters (a char plus combining marks)
+# a negative id from this table. Clusters are interned, so equal cells still hold equal numbers
+_clusters: List[str] = []
+_cluster_ids: Dict[str, int] = {}
+_cluster_lock = threading.Lock()
+
+
+def _cluster_id(text: str) -> int:
+    cluster = _cluster_ids.get(text)
+    if cluster is None:
+        with _cluster_lock:
+            cluster = _cluster_ids.get(text)
+            if cluster is None:
+                _clusters.append(text)
+                cluster = _cluster_ids[text] = -1 - len(_clusters)
+    return cluster
+
+
+def _code(char: str) -> int:
+    return ord(char) if len(char) == 1 else 0 if not char else _cluster_id(char)
+
+
+def _char(code: int) -> str:
+    if code > 0:
+        return chr(code)
+    return WIDE_TAIL if not code else _clusters[-2 - code]
+
+
+_BLANK_CODE = ord(BLANK)
+_NATIVE_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"  # Encodes straight into "i" items
+_ASCII_RUNS = re.compile(r"[ -~]+|[\x00-\x1f\x7f]")
+# Same split as Cursor._TOKENS, but everything that isn't an escape sequence stays in one piece
+_ESCAPES = re.compile(r"\x1b\[([0-9;?]*)[ -/]*([@-~])|\x1b.?|[^\x1b]+")
+
+
+class Reflow:
+    """Takes a position from before CellBuffer.resize() to where that cell is now, y < 1 if it went off the top
+
+    Cells are numbered through all lines one after another (see resize), so the new row of a cell is one search
+    in row_starts, and move_arrays does that for any number of positions at once.
+    """
+    __slots__ = ("old_width", "width", "row_bases", "row_starts", "offset")
+
+    def __init__(self, old_width: int, width: int, row_bases: List[int], row_starts: List[int], offset: int = 0):
+        self.old_width = old_width
+        self.width = width
+        self.row_bases = row_bases  # Number of the first cell of every old row
+        self.row_starts = row_starts  # Number of the first cell of every new row
+        self.offset = offset  # New rows that went off the top
+
+    def __call__(self, x: int, y: int) -> Tuple[int, int]:
+        if y < 1:
+            return x, y - self.offset
+        if y > len(self.row_bases):  # Below everything, stays below
+            return x, y - len(self.row_bases) + len(self.row_starts) - self.offset
+        # One past the last column is where a pending wrap continues
+        i = self.row_bases[y - 1] + min(x, self.old_width + 1) - 1
+        row = bisect_right(self.row_starts, i) - 1
+        column = i - self.row_starts[row]
+        if column >= self.width:  # Past the text in the line's last row
+            row, column = row + column // self.width, column % self.width
+        return column + 1, row + 1 - self.offset
+
+    def move_arrays(self, xs, ys):
+        """Same as calling it for every position, xs and ys are numpy arrays. Returns the new ones"""
+        bases = numpy.asarray(self.row_bases, dtype=numpy.int64)
+        starts = numpy.asarray(self.row_starts, dtype=numpy.int64)
+        new_xs, new_ys = xs.astype(numpy.int64), ys.astype(numpy.int64)
+        inside = (new_ys >= 1) & (new_ys <= len(bases))
+        new_ys[new_ys > len(bases)] += len(starts) - len(bases)
+        i = bases[new_ys[inside] - 1] + numpy.minimum(new_xs[inside], self.old_width + 1) - 1
+        rows = numpy.searchsorted(starts, i, side="right") - 1
+        past, columns = numpy.divmod(i - starts[rows], self.width)  # past > 0 behind the text in the line's last row
+        new_xs[inside] = columns + 1
+        new_ys[inside] = rows + past + 1
+        new_ys -= self.offset
+        return new_xs, new_ys
+
+
+class CellBuffer:
+    """A grid of cells, positions are 1-based [x, y] like the Cursor's
+
+    Every row is two parallel arrays, chars (see _code) and packed styles, that's 12 bytes a cell, rows compare
+    with a memcmp and scrolling only moves the row lists around. wrapped[y - 1] is set when text ran past the
+    last column of row y and continued on the next one, resize() uses it to rewrap lines instead of rows.
+    """
+    __slots__ = ("width", "height", "chars", "styles", "wrapped", "on_scroll", "saved")
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        # Called with (top, bottom, n) before the text scrolls rows top..bottom by n, see scroll_region
+        self.on_scroll: Optional[Callable[[int, int, int], None]] = None
+        self.chars: List[array] = [self._blank_chars(width) for _ in range(height)]
+        self.styles: List[array] = [self._blank_styles(width) for _ in range(height)]
+        self.wrapped: List[bool] = [False] * height
+        self.saved: Optional[Tuple[int, int]] = None  # Position from \x1b[s / \x1b7 in the text
+
+    @staticmethod
+    def _blank_chars(count: int) -> array:
+        return array("i", [_BLANK_CODE]) * count
+
+    @staticmethod
+    def _blank_styles(count: int) -> array:
+        return array("Q", [RESET]) * count
+
+    def get(self, x: int, y: int) -> Tuple[str, StyleState]:
+        return _char(self.chars[y - 1][x - 1]), self.styles[y - 1][x - 1]
+
+    def put(self, x: int, y: int, char: str, style: Optional[StyleState] = None):
+        if 1 <= x <= self.width and 1 <= y <= self.height:
+            chars, code = self.chars[y - 1], _code(char)
+            if code:
+                self._split_wide(chars, x - 1, x)
+            elif x < self.width and not chars[x]:  # A WIDE_TAIL follows its left half, only its right side matters
+                chars[x] = _BLANK_CODE
+            chars[x - 1] = code
+            self.styles[y - 1][x - 1] = style or RESET
+
+    @staticmethod
+    def _split_wide(chars: array, start: int, end: int):
+        # Call before writing cells start..end (0-based, end excluded). A wide character that only loses one half
+        # to the write loses the other one as well, the terminal blanks it
+        if start > 0 and not chars[start]:
+            chars[start - 1] = _BLANK_CODE
+        if end < len(chars) and not chars[end]:
+            chars[end] = _BLANK_CODE
+
+    def is_invalid(self, x: int, y: int) -> bool:
+        return self.chars[y - 1][x - 1] == INVALID
+
+    def _combine(self, x: int, y: int, char: str):
+        # Zero width characters (combining marks, joiners) belong to the cell before them
+        if x > 1 and 1 <= y <= self.height:
+            row = self.chars[y - 1]
+            x -= 1
+            if not row[x - 1] and x > 1:
+                x -= 1
+            if row[x - 1] != INVALID:
+                row[x - 1] = _cluster_id(_char(row[x - 1]) + char)
+
+    def put_line(self, x: int, y: int, text: str, style: Optional[StyleState] = None):
+        """Writes text on one row without wrapping or scrolling, whatever doesn't fit is cut off"""
+        if not 1 <= y <= self.height:
+            return
+        style = style or RESET
+        chars, styles = self.chars[y - 1], self.styles[y - 1]
+        for char in text:
+            width = char_width(char)
+            if not width:
+                if char >= " ":
+                    self._combine(x, y, char)
+                continue
+            if x < 1 or x + width - 1 > self.width:
+                break
+            self._split_wide(chars, x - 1, x - 1 + width)
+            chars[x - 1] = ord(char)
+            styles[x - 1] = style
+            if width == 2:
+                chars[x] = 0
+                styles[x] = style
+            x += width
+
+    def put_text(self, x: int, y: int, text: str, style: Optional[StyleState] = None) -> Tuple[int, int]:
+        """Writes text like the terminal would (wrapping and scrolling) and returns the new position
+
+        x is one past the last column while a wrap is pending. Escape sequences in the text never end up in
+        cells: SGR changes the style of what follows, moves, erasing and scrolling are applied, the rest is skipped.
+        """
+        style = style or RESET
+        if "\x1b" not in text:
+            return self._put_plain(x, y, text, style)
+        for match in _ESCAPES.finditer(text):
+            token = match.group()
+            if match.group(2) is not None:
+                x, y, style = self._csi(x, y, match.group(1), match.group(2), style)
+            elif token[0] == "\x1b":
+                x, y = self._escape(x, y, token[1:])
+            else:
+                x, y = self._put_plain(x, y, token, style)
+        return x, y
+
+    def _put_plain(self, x: int, y: int, text: str, style: StyleState) -> Tuple[int, int]:
+        if text.isascii():
+            return self._put_ascii(x, y, text, style)
+        for char in text:
+            if char == "\n":
+                x, y = 1, y + 1
+            elif char == "\r":
+                x = 1
+            elif char == "\b":
+                x = max(min(x, self.width) - 1, 1)  # With a wrap pending x is one past the last column
+            elif char == "\t":
+                x = self._tab(x)
+            else:
+                width = char_width(char)
+                if not width:
+                    if char >= " ":  # Control characters don't end up in any cell
+                        self._combine(x, y, char)
+                    continue
+                if x + width - 1 > self.width:  # Wrap pending from the last write, or a wide char that doesn't fit
+                    self.wrapped[y - 1] = True
+                    x, y = 1, y + 1
+                if y > self.height:
+                    self.scroll(y - self.height)
+                    y = self.height
+                chars, styles = self.chars[y - 1], self.styles[y - 1]
+                self._split_wide(chars, x - 1, x - 1 + width)
+                chars[x - 1] = ord(char)
+                styles[x - 1] = style
+                if width == 2:
+                    chars[x] = 0
+                    styles[x] = style
+                x += width
+                continue
+            if y > self.height:
+                self.scroll(y - self.height)
+                y = self.height
+        return x, y
+
+    def _tab(self, x: int) -> int:
+        return min((min(x, self.width) - 1) // 8 * 8 + 9, self.width)
+
+    def _csi(self, x: int, y: int, params: str, final: str, style: StyleState) -> Tuple[int, int, StyleState]:
+        # Follows Cursor._advance_csi, plus what the sequences do to the cells
+        if params.startswith("?"):
+            return x, y, style  # Private modes don't touch the cells
+        if final == "m":
+            return x, y, apply_sgr(style, params.split(";") if params else ["0"])
+        args = [int(p) if p else 0 for p in params.split(";")] if params else []
+        n = max(args[0], 1) if args else 1
+        column = min(x, self.width)  # Moving clears a pending wrap
+        if final == "A":
+            return column, max(y - n, 1), style
+        if final == "B":
+            return column, min(y + n, self.height), style
+        if final == "C":
+            return min(column + n, self.width), y, style
+        if final == "D":
+            return max(column - n, 1), y, style
+        if final == "E":
+            return 1, min(y + n, self.height), style
+        if final == "F":
+            return 1, max(y - n, 1), style
+        if final == "G":
+            return min(n, self.width), y, style
+        if final == "d":
+            return column, min(n, self.height), style
+        if final in "Hf":
+            return min(max(args[1], 1) if len(args) > 1 else 1, self.width), min(n, self.height), style
+        if final == "K":
+            self._erase_line(column, y, args[0] if args else 0, style)
+        elif final == "J":
+            self._erase_display(column, y, args[0] if args else 0, style)
+        elif final == "S":
+            self.scroll(n)
+        elif final == "T":
+            self._shift(1, self.height, -n)
+        elif final in "LM" and 1 <= y <= self.height:
+            self._shift(y, self.height, n if final == "M" else -n)
+            return 1, y, style
+        elif final == "r":
+            return 1, 1, style
+        elif final == "s":
+            self.saved = (column, y)
+        elif final == "u" and self.saved is not None:
+            return self.saved[0], self.saved[1], style
+        return x, y, style
+
+    def _escape(self, x: int, y: int, rest: str) -> Tuple[int, int]:
+        if rest == "7":
+            self.saved = (min(x, self.width), y)
+        elif rest == "8" and self.saved is not None:
+            return self.saved
+        elif rest in ("D", "E"):  # Index / next line, scroll at the bottom
+            if y == self.height:
+                self.scroll(1)
+            return 1 if rest == "E" else min(x, self.width), min(y + 1, self.height)
+        elif rest == "M":  # Reverse index
+            if y == 1:
+                self._shift(1, self.height, -1)
+            return min(x, self.width), max(y - 1, 1)
+        return x, y
+
+    def _erase_line(self, x: int, y: int, mode: int, style: StyleState):
+        start, end = {0: (x, self.width), 1: (1, x)}.get(mode, (1, self.width))
+        self._split_wide(self.chars[y - 1], start - 1, end)
+        self.chars[y - 1][start - 1:end] = self._blank_chars(end - start + 1)
+        self.styles[y - 1][start - 1:end] = array("Q", [style]) * (end - start + 1)  # Erasing uses the current background
+        if end == self.width:
+            self.wrapped[y - 1] = False
+
+    def _erase_display(self, x: int, y: int, mode: int, style: StyleState):
+        self._erase_line(x, y, mode if mode < 2 else 2, style)
+        rows = range(y + 1, self.height + 1) if mode == 0 else range(1, y) if mode == 1 else range(1, self.height + 1)
+        for row in rows:
+            self._erase_line(1, row, 2, style)
+
+    def _put_ascii(self, x: int, y: int, text: str, style: StyleState) -> Tuple[int, int]:
+        # Same as put_text, but printable runs get copied into the row arrays in one go
+        for match in _ASCII_RUNS.finditer(text):
+            run = match.group()
+            if run == "\n":
+                x, y = 1, y + 1
+            elif run == "\r":
+                x = 1
+            elif run == "\b":
+                x = max(min(x, self.width) - 1, 1)
+            elif run == "\t":
+                x = self._tab(x)
+            elif run[0] < " " or run[0] == "\x7f":
+                continue  # Zero width, and there is nothing it could combine with
+            else:
+                while run:
+                    if x > self.width:
+                        self.wrapped[y - 1] = True
+                        x, y = 1, y + 1
+                    if y > self.height:
+                        self.scroll(y - self.height)
+                        y = self.height
+                    piece, run = run[:self.width - x + 1], run[self.width - x + 1:]
+                    self._split_wide(self.chars[y - 1], x - 1, x - 1 + len(piece))
+                    self.chars[y - 1][x - 1:x - 1 + len(piece)] = array("i", piece.encode(_NATIVE_UTF32))
+                    self.styles[y - 1][x - 1:x - 1 + len(piece)] = array("Q", [style]) * len(piece)
+                    x += len(piece)
+                continue
+            if y > self.height:
+                self.scroll(y - self.height)
+                y = self.height
+        return x, y
+
+    def scroll(self, n: int = 1):
+        self._shift(1, self.height, n)
+
+    def _shift(self, top: int, bottom: int, n: int):
+        # Scrolling that comes from the text itself, whoever watches on_scroll gets to see the rows before they move
+        if self.on_scroll is not None:
+            self.on_scroll(top, bottom, n)
+        self.scroll_region(top, bottom, n)
+
+    def scroll_region(self, top: int, bottom: int, n: int = 1):
+        """Moves rows top..bottom up by n (down if n is negative), like the terminal with a DECSTBM region"""
+        count = min(abs(n), bottom - top + 1)
+        if count <= 0:
+            return
+        remove_at, insert_at = (top, bottom - count + 1) if n > 0 else (bottom - count + 1, top)
+        for rows, blank in ((self.chars, self._blank_chars), (self.styles, self._blank_styles)):
+            del rows[remove_at - 1:remove_at - 1 + count]
+            rows[insert_at - 1:insert_at - 1] = [blank(self.width) for _ in range(count)]
+        del self.wrapped[remove_at - 1:remove_at - 1 + count]
+        self.wrapped[insert_at - 1:insert_at - 1] = [False] * count
+        if bottom < self.height:
+            self.wrapped[bottom - 1] = False  # Its next row isn't the one it wrapped into anymore
+
+    def clear_rows(self, top: int, bottom: int):
+        for y in range(top, bottom + 1):
+            self.chars[y - 1] = self._blank_chars(self.width)
+            self.styles[y - 1] = self._blank_styles(self.width)
+            self.wrapped[y - 1] = False
+
+    def clear(self):
+        self.chars = [self._blank_chars(self.width) for _ in range(self.height)]
+        self.styles = [self._blank_styles(self.width) for _ in range(self.height)]
+        self.wrapped = [False] * self.height
+
+    def invalidate(self):
+        invalid = array("i", [INVALID]) * self.width
+        self.chars = [array("i", invalid) for _ in range(self.height)]
+
+    def copy_from(self, other: "CellBuffer"):
+        self.width, self.height = other.width, other.height
+        self.chars = [array("i", row) for row in other.chars]
+        self.styles = [array("Q", row) for row in other.styles]
+        self.wrapped = list(other.wrapped)
+
+    def copy_cells(self, other: "CellBuffer", x: int, y: int, count: int):
+        self.chars[y - 1][x - 1:x - 1 + count] = other.chars[y - 1][x - 1:x - 1 + count]
+        self.styles[y - 1][x - 1:x - 1 + count] = other.styles[y - 1][x - 1:x - 1 + count]
+
+    def invalidate_row(self, y: int):
+        self.chars[y - 1] = array("i", [INVALID]) * self.width
+
+    def _same_row(self, chars: array, styles: array, other_chars: array, other_styles: array) -> bool:
+        # Rows of different widths are equal if the longer one only has blanks past the shorter one
+        n = min(len(chars), len(other_chars))
+        if chars[:n] != other_chars[:n] or styles[:n] != other_styles[:n]:
+            return False
+        for row_chars, row_styles in ((chars, styles), (other_chars, other_styles)):
+            rest = len(row_chars) - n
+            if rest and (row_chars[n:] != self._blank_chars(rest) or row_styles[n:] != self._blank_styles(rest)):
+                return False
+        return True
+
+    def resize(self, width: int, height: int, keep: Optional[Tuple[int, int]] = None,
+               dropped: Optional[List[str]] = None) -> Tuple[List[int], "Reflow"]:
+        """Rewraps every line (rows joined by wrapped) to the new width on its own, lines that fit stay as they are
+
+        Blank rows at the bottom are dropped unless position keep (the cursor's) is on or below them, if it's still
+        too many rows the top ones go, like the terminal scrolling them off (added to dropped as styled_row text
+        if given). Returns the rows that look different afterwards (only those have to be repainted) and a Reflow,
+        which takes an old position to where that cell is now.
+        """
+        old_chars, old_styles, old_width = self.chars, self.styles, self.width
+        char_rows, style_rows, wrapped = [], [], []
+        # Where every old row (row_bases) and every new row (row_starts) starts, counted in cells of all lines one
+        # after another. Each line gets old_width + 1 spare numbers, past its end is still inside of it
+        row_bases: List[int] = []
+        row_starts: List[int] = []
+        base = 0
+        y = 0
+        while y < len(old_chars):
+            first = y
+            while self.wrapped[y] and y + 1 < len(old_chars):
+                y += 1
+            if first == y and self._fits(old_chars[y], old_styles[y], width):  # Nothing to rewrap
+                chars, styles = old_chars[y], old_styles[y]
+                char_rows.append(chars[:width] + self._blank_chars(width - len(chars)))
+                style_rows.append(styles[:width] + self._blank_styles(width - len(styles)))
+                wrapped.append(False)
+                row_bases.append(base)
+                row_starts.append(base)
+                base += len(chars) + old_width + 1
+                y += 1
+                continue
+            chars, styles, offsets = array("i"), array("Q"), []
+            for row in range(first, y + 1):
+                offsets.append(len(chars))
+                row_chars, row_styles = old_chars[row], old_styles[row]
+                end = len(row_chars)
+                if (row < y and len(old_chars[row + 1]) > 1 and not old_chars[row + 1][1]
+                        and row_chars[end - 1] == _BLANK_CODE and row_styles[end - 1] == RESET):
+                    end -= 1  # Left blank because the wide character starting the next row didn't fit
+                chars.extend(row_chars[:end])
+                styles.extend(row_styles[:end])
+            end = len(chars)
+            while end and chars[end - 1] == _BLANK_CODE and styles[end - 1] == RESET:
+                end -= 1
+            i = 0
+            while True:
+                row_starts.append(base + i)
+                cut = i + width
+                if cut < end and not chars[cut] and cut - 1 > i:
+                    cut -= 1  # A wide character doesn't fit in the last column, it goes to the next row
+                row_chars, row_styles = chars[i:min(cut, end)], styles[i:min(cut, end)]
+                char_rows.append(row_chars + self._blank_chars(width - len(row_chars)))
+                style_rows.append(row_styles + self._blank_styles(width - len(row_styles)))
+                wrapped.append(cut < end)
+                if cut >= end:
+                    break
+                i = cut
+            row_bases.extend(base + offset for offset in offsets)
+            base += len(chars) + old_width + 1
+            y += 1
+
+        blank_chars, blank_styles = self._blank_chars(width), self._blank_styles(width)
+        rows = len(char_rows)
+        while rows and char_rows[rows - 1] == blank_chars and style_rows[rows - 1] == blank_styles:
+            rows -= 1
+
+        reflow = Reflow(old_width, width, row_bases, row_starts)
+        if keep:
+            rows = max(rows, reflow(*keep)[1])
+        offset = reflow.offset = max(rows - height, 0)
+        del char_rows[rows:], style_rows[rows:], wrapped[rows:]
+        if offset:  # Keep the bottom rows, like the terminal does
+            if dropped is not None:
+                dropped.extend(self._styled(char_rows[i], style_rows[i]) for i in range(offset))
+            del char_rows[:offset], style_rows[:offset], wrapped[:offset]
+        self.width, self.height = width, height
+        self.chars = char_rows + [self._blank_chars(width) for _ in range(height - len(char_rows))]
+        self.styles = style_rows + [self._blank_styles(width) for _ in range(height - len(style_rows))]
+        self.wrapped = wrapped + [False] * (height - len(wrapped))
+
+        empty_chars, empty_styles = self._blank_chars(0), self._blank_styles(0)
+        changed = []
+        for y in range(1, height + 1):
+            if y <= len(old_chars):
+                before = old_chars[y - 1], old_styles[y - 1]
+            else:
+                before = empty_chars, empty_styles
+            if not self._same_row(self.chars[y - 1], self.styles[y - 1], *before):
+                changed.append(y)
+        return changed, reflow
+
+    def _fits(self, chars: array, styles: array, width: int) -> bool:
+        # Only blanks from width on
+        rest = len(chars) - width
+        return rest <= 0 or chars[width:] == self._blank_chars(rest) and styles[width:] == self._blank_styles(rest)
+
+    def text(self, x: int, y: int, count: int) -> str:
+        return "".join(map(_char, self.chars[y - 1][x - 1:x - 1 + count]))
+
+    def styled_row(self, y: int) -> str:
+        """The row as text with its SGR sequences, without trailing blanks. Starts and ends on a reset terminal"""
+        return self._styled(self.chars[y - 1], self.styles[y - 1])
+
+    @staticmethod
+    def _styled(chars: array, styles: array) -> str:
+        end = len(chars)
+        while end and chars[end - 1] == _BLANK_CODE and styles[end - 1] == RESET:
+            end -= 1
+        parts, current = [], RESET
+        for i in range(end):
+            if styles[i] != current:
+                parts.append(sgr_transition(current, styles[i]))
+                current = styles[i]
+            if chars[i] != INVALID:
+                parts.append(_char(chars[i]))
+        if current != RESET:
+            parts.append("\x1b[0m")
+        return "".join(parts)
+
+    def row_text(self, y: int) -> str:
+        return "".join(_char(code) if code != INVALID else BLANK for code in self.chars[y - 1])
+
+    def diff(self, other: "CellBuffer") -> Iterator[Tuple[int, int, str, StyleState]]:
+        """Yields (x, y, text, style) runs of cells that differ from other, same-style cells are joined"""
+        rows = zip(self.chars, self.styles, other.chars, other.styles)
+        for y, (chars, styles, other_chars, other_styles) in enumerate(rows, start=1):
+            if chars == other_chars and styles == other_styles:
+                continue
+            run_start, run_chars, run_style = 0, [], RESET
+            for x, (code, style, other_code, other_style) in enumerate(
+                    zip(chars, styles, other_chars, other_styles), start=1):
+                if code == other_code and style == other_style:
+                    continue
+                if run_chars and style == run_style and run_start + len(run_chars) == x:
+                    run_chars.append(_char(code))
+                    continue
+                if run_chars:
+                    yield run_start, y, "".join(run_chars), run_style
+                if not code and x > 1:  # A WIDE_TAIL can only be drawn by printing its left half again
+                    run_start, run_chars, run_style = x - 1, [_char(chars[x - 2]), WIDE_TAIL], style
+                    continue
+                run_start, run_chars, run_style = x, [_char(code)], style
+            if run_chars:
+                yield run_start, y, "".join(run_chars), run_style
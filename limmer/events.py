@@ -1,81 +1,139 @@
-from .basics import Cursor
-import threading
-import time
-from typing import Tuple, Optional
+from .buffer import CellBuffer
+from .scheduler import Scheduler, get_scheduler
+from .positions import PositionStore
+from .animation import Animation, SPINNER, POINTINGS, get_animation
+from typing import TYPE_CHECKING, Tuple, Optional
+
+if TYPE_CHECKING:  # basics imports us, only needed for the annotations
+    from .basics import Cursor
 
 
 class Event:
     length = 0
+    interval = 0.1
+    live = False  # True if draw() works out the frame by itself, then nothing has to call step()
 
     def __init__(self, position: Optional[Tuple[int]]=(1, 1)):
+        self.store: Optional[PositionStore] = None  # Set while a Window holds the event
+        self.handle: Optional[int] = None
         self.position = position
+        self.style = None
+        self.frame = " " * self.length  # What the event currently shows, always self.length columns wide
         self.current_cursor = None
         self.loop_running = False
-        self.loop_thread = None
-
-    def update(self, cursor: Cursor):
+        self.loop_job = None
+        self.scheduler = None
+
+    @property
+    def position(self):
+        # A copy while stored, change it by assigning a new position
+        if self.store is not None:
+            return self.store.get(self.handle)
+        return self._position
+
+    @position.setter
+    def position(self, new):
+        if self.store is not None:
+            self.store.set(self.handle, *new)
+        else:
+            self._position = new
+
+    def attach(self, store: PositionStore, handle: int):
+        self.store, self.handle = store, handle
+
+    def detach(self):
+        if self.store is not None:
+            self._position = self.store.get(self.handle)
+        self.store, self.handle = None, None
+
+    def update(self, cursor: "Cursor"):
         #print(self.position, cursor.position)
         self.current_cursor = cursor
 
-    def doUpdate(self, cursor: Cursor):
+    def step(self):
+        # Advance self.frame, nothing to animate here
+        pass
+
+    def draw(self, buffer: CellBuffer, now: Optional[float] = None):
+        # Put the current frame into a window buffer, the window decides what actually needs to be sent
+        store = self.store
+        if store is None:
+            x, y = self.position
+        else:
+            slot = store.slots[self.handle]
+            x, y = store.xs[slot], store.ys[slot]
+        buffer.put_line(x, y, self.frame, self.style)
+
+    def doUpdate(self, cursor: "Cursor"):
         cursor.go_to(*self.position)
-        # ...
+        cursor.appendCMD(self.frame)
         cursor.finishCMD()
 
-    def startEventLoop(self):
+    def startEventLoop(self, scheduler: Optional[Scheduler] = None):
+        # Every event shares one scheduler thread, it calls eventTick each self.interval
         self.loop_running = True
-        self.loop_thread = threading.Thread(target=self.eventLoop)
-        self.loop_thread.start()
+        self.scheduler = scheduler or get_scheduler()
+        self.loop_job = self.scheduler.schedule(self.eventTick, self.interval)
 
-    def eventLoop(self):
-        for i in range(100):
-            time.sleep(0.1)  # Do stuff
+    def eventTick(self):
+        self.step()
 
-            # Update
-            if self.current_cursor:
-                self.doUpdate(self.current_cursor)
-                self.current_cursor = None
+        # Update
+        if self.current_cursor:
+            self.doUpdate(self.current_cursor)
+            self.current_cursor = None
 
     def stopEventLoop(self):
         self.loop_running = False
-        self.loop_thread.join()  # Wait for the event loop thread to finish
+        if self.loop_job is not None:
+            self.scheduler.cancel(self.loop_job)
+            self.loop_job = None
 
 
-class SpinningEvent(Event):
-    length = 1
+class AnimatedEvent(Event):
+    """Shows a shared Animation, the frame comes from the animation clock instead of the event's own state
 
-    def __init__(self, position: Optional[Tuple[int]]=(0, 0)):
+    A Window picks the frame when it draws, so these don't need their own event loop at all.
+    """
+    animation: Animation = SPINNER
+    live = True
+
+    def __init__(self, position: Optional[Tuple[int]]=(0, 0), animation: Optional[Animation] = None):
+        if animation is not None:
+            self.animation = animation
+        self.length = self.animation.length
+        self.interval = self.animation.interval
         super().__init__(position)
-        self.spinner = spinning_cursor()
-        
-    def doUpdate(self, cursor: Cursor):
-        update_pos = self.position
-        update_pos[0] += 1
-        cursor.go_to(*update_pos)
-        cursor.appendCMD("\b")
-        #cursor.go_left()
-        cursor.appendCMD(next(self.spinner))
+        self.index = 0
+        self.frame = self.animation.frames[0]
+
+    def step(self, now: Optional[float] = None):
+        self.index = self.animation.index_at(now)
+        self.frame = self.animation.frames[self.index]
+
+    def draw(self, buffer: CellBuffer, now: Optional[float] = None):
+        self.step(now)
+        super().draw(buffer)
+
+    def doUpdate(self, cursor: "Cursor"):
+        # The precompiled sequence also moves back, the cursor simulation follows it either way
+        cursor.go_to(*self.position)
+        cursor.appendCMD(self.animation.sequences[self.index])
         cursor.finishCMD()
 
 
+class SpinningEvent(AnimatedEvent):
+    animation = SPINNER
+
+
 def spinning_cursor():
     while True:
         for cursor in '\\|/-':
             yield cursor
 
 
-class PointingsEvent(Event):
-    length = 3
-
-    def __init__(self, position: Optional[Tuple[int]]=(0, 0)):
-        super().__init__(position)
-        self.spinner = pointings_cursor()
-        
-    def doUpdate(self, cursor: Cursor):
-        cursor.go_to(*self.position)
-        cursor.go_left(3)
-        cursor.appendCMD(next(self.spinner))
-        cursor.finishCMD()
+class PointingsEvent(AnimatedEvent):
+    animation = POINTINGS
 
 
 def pointings_cursor():
@@ -85,14 +143,4 @@ def pointings_cursor():
 
 
 class BetterPointingsEvent(PointingsEvent):
-    def doUpdate(self, cursor: Cursor):
-        cursor.go_to(*self.position)
-        cursor.go_left(3)
-        
-        pointing = next(self.spinner).strip()
-        
-        difference = self.length - len(pointing)
-        
-        cursor.appendCMD(pointing + (" " * difference))
-        cursor.go_left(difference)
-        cursor.finishCMD()
+    animation = get_animation(["", ".", "..", "..."], length=3)
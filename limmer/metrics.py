@@ -0,0 +1,132 @@
+from typing import Callable, ContextManager, Dict, List, Optional
+from contextlib import ExitStack, contextmanager
+from array import array
+import time
+
+
+class FrameStats:
+    """What one windowTick did, handed to every hook"""
+    __slots__ = ("started", "duration", "bytes_written", "writes", "sequences", "events", "dsr_queries",
+                 "lag", "late")
+
+    def __init__(self):
+        self.started = 0.0
+        self.duration = 0.0
+        self.bytes_written = 0
+        self.writes = 0
+        self.sequences = 0  # Escape sequences
+        self.events = 0  # Events drawn
+        self.dsr_queries = 0
+        self.lag = 0.0  # How late the scheduler started the tick
+        self.late = False  # Took longer than its frame budget
+
+    def __repr__(self):
+        return (f"FrameStats(duration={self.duration * 1000:.3f}ms, bytes={self.bytes_written}, writes={self.writes}, "
+                f"sequences={self.sequences}, events={self.events}, dsr={self.dsr_queries}, "
+                f"lag={self.lag * 1000:.3f}ms, late={self.late})")
+
+
+class RenderMetrics:
+    """Running totals for a Window plus the last few frame timings
+
+    Everything is plain counters and one preallocated array, so it stays on.
+    Hooks get the FrameStats after every frame, context hooks (e.g. a profiler) are entered around every frame.
+    """
+    def __init__(self, history: int = 120):
+        self.history = history
+        self.durations = array("d", bytes(8 * history))  # Ring buffer, the newest at (frames - 1) % history
+        self.lags = array("d", bytes(8 * history))
+        self.hooks: List[Callable[[FrameStats], None]] = []
+        self.context_hooks: List[Callable[[], ContextManager]] = []
+        self.current = FrameStats()
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.skipped_frames = 0  # Held back by max_fps
+        self.dropped_frames = 0  # Ticks the scheduler had to skip
+        self.late_frames = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.sequences = 0
+        self.events = 0
+        self.dsr_queries = 0
+        self.total_time = 0.0
+        self.max_duration = 0.0
+        self.max_lag = 0.0
+
+    def add_hook(self, hook: Callable[[FrameStats], None]):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[FrameStats], None]):
+        self.hooks.remove(hook)
+
+    def add_context_hook(self, factory: Callable[[], ContextManager]):
+        self.context_hooks.append(factory)
+
+    def remove_context_hook(self, factory: Callable[[], ContextManager]):
+        self.context_hooks.remove(factory)
+
+    @contextmanager
+    def frame(self, cursor, lag: float = 0.0, budget: Optional[float] = None):
+        """Measures everything the cursor sends while inside, budget is how long a frame may take"""
+        stats = self.current = FrameStats()
+        before = (cursor.bytes_written, cursor.writes, cursor.sequences, cursor.dsr_queries)
+        stats.lag = lag
+        stats.started = time.perf_counter()
+        if self.context_hooks:
+            with ExitStack() as stack:
+                for factory in self.context_hooks:
+                    stack.enter_context(factory())
+                yield stats
+        else:
+            yield stats
+        stats.duration = time.perf_counter() - stats.started
+        stats.bytes_written = cursor.bytes_written - before[0]
+        stats.writes = cursor.writes - before[1]
+        stats.sequences = cursor.sequences - before[2]
+        stats.dsr_queries = cursor.dsr_queries - before[3]
+        stats.late = budget is not None and stats.duration + lag > budget
+        self._record(stats)
+
+    def _record(self, stats: FrameStats):
+        if self.history:
+            i = self.frames % self.history
+            self.durations[i] = stats.duration
+            self.lags[i] = stats.lag
+        self.frames += 1
+        self.late_frames += stats.late
+        self.bytes_written += stats.bytes_written
+        self.writes += stats.writes
+        self.sequences += stats.sequences
+        self.events += stats.events
+        self.dsr_queries += stats.dsr_queries
+        self.total_time += stats.duration
+        self.max_duration = max(self.max_duration, stats.duration)
+        self.max_lag = max(self.max_lag, stats.lag)
+        for hook in self.hooks:
+            hook(stats)
+
+    def recent(self) -> List[float]:
+        """Durations of the last frames, oldest first"""
+        count = min(self.frames, self.history)
+        start = (self.frames - count) % self.history if self.history else 0
+        return [self.durations[(start + i) % self.history] for i in range(count)]
+
+    def summary(self) -> Dict[str, float]:
+        recent = sorted(self.recent())
+        return {
+            "frames": self.frames,
+            "skipped_frames": self.skipped_frames,
+            "dropped_frames": self.dropped_frames,
+            "late_frames": self.late_frames,
+            "bytes_written": self.bytes_written,
+            "writes": self.writes,
+            "sequences": self.sequences,
+            "events": self.events,
+            "dsr_queries": self.dsr_queries,
+            "mean_duration": self.total_time / self.frames if self.frames else 0.0,
+            "max_duration": self.max_duration,
+            "p95_duration": recent[int(len(recent) * 0.95)] if recent else 0.0,
+            "max_lag": self.max_lag,
+        }
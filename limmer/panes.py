@@ -0,0 +1,109 @@
+from .styles import StyleState, RESET, sgr_transition
+from .scrollback import Scrollback
+from .width import char_width
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:  # basics imports us
+    from .basics import Window
+
+
+def wrap_rows(text: str, width: int) -> List[str]:
+    """Splits text into rows of at most width columns, a wide character that doesn't fit starts the next row"""
+    rows = []
+    for line in text.splitlines() or [""]:
+        if line.isascii():
+            rows.extend([line[i:i + width] for i in range(0, len(line), width)] or [""])
+            continue
+        row, columns = [], 0
+        for char in line:
+            char_columns = char_width(char)
+            if columns + char_columns > width:
+                rows.append("".join(row))
+                row, columns = [], 0
+            row.append(char)
+            columns += char_columns
+        rows.append("".join(row))
+    return rows
+
+
+class LogPane:
+    """Rows top..bottom of a Window that scroll on their own, for logs next to pinned widgets
+
+    New lines fill the pane from the top, once it's full the terminal scrolls just the pane (see
+    Window.scroll_region) and only the new rows get drawn. Rows scrolling off its top go to scrollback if given.
+    A resize moves the pane along with its rows, once none of them are on the screen anymore it's detached.
+    """
+    def __init__(self, window: "Window", top: int, bottom: int, style: Optional[StyleState] = None,
+                 scrollback: Optional[Scrollback] = None):
+        if not 1 <= top <= bottom:
+            raise ValueError(f"a pane needs 1 <= top <= bottom, not {top}..{bottom}")
+        self.window = window
+        self.top = top
+        self.bottom = bottom
+        self.style = style
+        self.scrollback = scrollback
+        self.next_row = top  # Where the next line goes, one past the bottom once the pane is full
+        self.detached = False
+
+    @property
+    def height(self) -> int:
+        return min(self.bottom, self.window.max_position[1]) - self.top + 1
+
+    def move(self, move: Callable[[int, int], Tuple[int, int]], height: int) -> bool:
+        """Follows the pane's rows to where a resize of the window put them (see Reflow), False if they are all gone
+
+        Rows that went off the top are lost, the pane starts at the first one that is left.
+        """
+        top, bottom = move(1, self.top)[1], move(1, self.bottom + 1)[1] - 1  # Rows rewrapped into two stay in it
+        if bottom < 1 or top > height:
+            self.detached = True
+            return False
+        next_row = move(1, self.next_row)[1]
+        self.top, self.bottom = max(top, 1), bottom
+        # Rows of the pane that are below the screen now were blank, the next line goes right below the text
+        self.next_row = min(max(next_row, self.top), min(bottom, height) + 1)
+        return True
+
+    def _check_attached(self):
+        if self.detached:
+            raise RuntimeError("the pane went off the screen when the window was resized")
+
+    def write(self, text: str, style: Optional[StyleState] = None):
+        """Adds text as new rows at the bottom of the pane, wrapped to the window width"""
+        self._check_attached()
+        window = self.window
+        style = self.style if style is None else style
+        with window.lock, window.cursor.frame(window.synchronized_output):
+            bottom = self.top + self.height - 1
+            # Scrolling may move the cursor, this is where it goes back
+            position, wrap_pending = list(window.cursor.position), window.cursor.wrap_pending
+            rows = wrap_rows(text, window.max_position[0])
+            overflow = self.next_row + len(rows) - 1 - bottom
+            if overflow > 0:
+                scrolled = min(overflow, bottom - self.top + 1, self.next_row - self.top)
+                if self.scrollback is not None:
+                    self.scrollback.extend(window.back_buffer.styled_row(y)
+                                           for y in range(self.top, self.top + scrolled))
+                    # Rows that wouldn't even be on screen for one frame go straight to the scrollback
+                    unseen = rows[:max(len(rows) - self.height, 0)]
+                    if style:
+                        unseen = [f"{sgr_transition(RESET, style)}{row}\x1b[0m" for row in unseen]
+                    self.scrollback.extend(unseen)
+                window._scroll_region(self.top, bottom, scrolled)
+                self.next_row = max(self.next_row - overflow, self.top)
+                rows = rows[-self.height:]
+            buffer = window.back_buffer
+            for row in rows:
+                buffer.clear_rows(self.next_row, self.next_row)
+                buffer.put_line(1, self.next_row, row, style)
+                self.next_row += 1
+            window.commit_frame(position, wrap_pending)
+
+    def clear(self):
+        self._check_attached()
+        with self.window.lock:
+            bottom = self.top + self.height - 1
+            self.window.back_buffer.clear_rows(self.top, bottom)
+            self.window._shift_events(self.top, bottom, self.height)  # Events in the pane go with its text
+            self.window.commit_frame()
+            self.next_row = self.top
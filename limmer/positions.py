@@ -0,0 +1,121 @@
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Optional, only makes shifting and reflowing many events a single vectorized pass
+    numpy = None
+
+_VECTORIZE_FROM = 64  # Below that setting up the numpy views costs more than the plain loop
+
+
+class PositionStore:
+    """Event positions as parallel arrays, addressed through handles that stay valid until removed
+
+    The arrays only hold live positions: removing one moves the last position into its slot, so going over
+    all of them never costs more than there are events. slots[handle] is where a handle's position is right now.
+    """
+    def __init__(self):
+        self.xs = array("i")
+        self.ys = array("i")
+        self.owners: List[Any] = []
+        self.handles: List[int] = []  # Which handle every slot belongs to
+        self.slots: List[int] = []  # Where every handle's slot is, -1 once removed
+        self.free: List[int] = []  # Removed handles get reused
+
+    def add(self, owner: Any, x: int, y: int) -> int:
+        if self.free:
+            handle = self.free.pop()
+        else:
+            handle = len(self.slots)
+            self.slots.append(-1)
+        self.slots[handle] = len(self.owners)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.owners.append(owner)
+        self.handles.append(handle)
+        return handle
+
+    def remove(self, handle: int):
+        slot, last = self.slots[handle], len(self.owners) - 1
+        if slot != last:  # The last one takes its place
+            moved = self.handles[last]
+            self.xs[slot], self.ys[slot] = self.xs[last], self.ys[last]
+            self.owners[slot], self.handles[slot] = self.owners[last], moved
+            self.slots[moved] = slot
+        self.xs.pop()
+        self.ys.pop()
+        self.owners.pop()
+        self.handles.pop()
+        self.slots[handle] = -1
+        self.free.append(handle)
+
+    def clear(self):
+        self.xs = array("i")
+        self.ys = array("i")
+        self.owners = []
+        self.handles = []
+        self.slots = []
+        self.free = []
+
+    def get(self, handle: int) -> List[int]:
+        slot = self.slots[handle]
+        return [self.xs[slot], self.ys[slot]]
+
+    def set(self, handle: int, x: int, y: int):
+        slot = self.slots[handle]
+        self.xs[slot], self.ys[slot] = x, y
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        return zip(self.handles, self.owners)
+
+    def remap(self, move: Callable[[int, int], Tuple[int, int]]) -> List[Any]:
+        """Moves every position to move(x, y), returns the owners that ended up above the first row
+
+        If move also has move_arrays (like buffer.Reflow) and numpy is there, all positions move in one pass.
+        """
+        if len(self.owners) >= _VECTORIZE_FROM and numpy is not None and hasattr(move, "move_arrays"):
+            xs = numpy.frombuffer(self.xs, dtype=numpy.intc)
+            ys = numpy.frombuffer(self.ys, dtype=numpy.intc)
+            new_xs, new_ys = move.move_arrays(xs, ys)
+            staying = new_ys >= 1
+            xs[staying], ys[staying] = new_xs[staying], new_ys[staying]
+            gone = [self.owners[slot] for slot in numpy.flatnonzero(~staying).tolist()]
+            del xs, ys  # Views keep the arrays from growing
+            return gone
+        xs, ys = self.xs, self.ys
+        gone = []
+        for slot, owner in enumerate(self.owners):
+            x, y = move(xs[slot], ys[slot])
+            if y < 1:
+                gone.append(owner)
+            else:
+                xs[slot], ys[slot] = x, y
+        return gone
+
+    def shift_rows(self, top: int, bottom: int, n: int, last: Optional[int] = None) -> List[Any]:
+        """Moves positions on rows top..last (default bottom) up by n (down if negative)
+
+        The ones that would leave top..bottom stay where they are and are returned, so their owner can remove them.
+        """
+        last = bottom if last is None else last
+        if len(self.owners) >= _VECTORIZE_FROM and numpy is not None:
+            ys = numpy.frombuffer(self.ys, dtype=numpy.intc)
+            inside = (ys >= top) & (ys <= last)
+            moved = ys - n
+            leaving = inside & ((moved < top) | (moved > bottom))
+            ys[inside & ~leaving] -= n
+            gone = [self.owners[slot] for slot in numpy.flatnonzero(leaving).tolist()]
+            del ys, inside, moved, leaving  # Views keep the array from growing
+            return gone
+        ys, gone = self.ys, []
+        for slot, y in enumerate(ys):
+            if top <= y <= last:
+                if top <= y - n <= bottom:
+                    ys[slot] = y - n
+                else:
+                    gone.append(self.owners[slot])
+        return gone
@@ -0,0 +1,220 @@
+from .events import Event
+from . import animation
+from .width import fit
+from collections import deque
+from multiprocessing.util import Finalize
+from typing import Deque, List, Optional, Tuple
+import multiprocessing
+import threading
+import warnings
+import os
+
+
+class _Claim:
+    """Lives in a writer's thread-local, once it's collected (the thread ended) the slot goes back"""
+    __slots__ = ("__weakref__",)
+
+
+class SharedCounters:
+    """Counters in shared memory that any thread or process can bump without a lock or a message
+
+    Every writer (thread, or process it was passed to) claims its own slot once and from then on only ever
+    adds to that slot, so nobody else writes there. Readers sum all slots. A slot goes back once its thread or
+    process ends (or on release()) and the next writer reuses it, what was added to it still counts.
+    Slot 0 is shared by the writers that find all the others taken, those do take the lock and a
+    RuntimeWarning tells you to pass more slots.
+    Like any multiprocessing object this only gets into other processes while they are started, e.g. through
+    Process(args=...) or ProcessPoolExecutor(initializer=counters.install), not as an argument to submit().
+    """
+    def __init__(self, slots: int = 64, fields: int = 1, context=None):
+        context = context or multiprocessing
+        self.slots = max(slots, 2)
+        self.fields = fields
+        self.values = context.RawArray("q", self.slots * fields)
+        self.claimed = context.RawValue("i", 1)  # Slot 0 is the shared one, the ones below this were handed out
+        self.free = context.RawArray("i", self.slots)  # Stack of slots given back, they go out before new ones
+        self.free_count = context.RawValue("i", 0)
+        self.lock = context.Lock()
+        self._local = threading.local()
+        self._warned = False
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]  # Every process starts without a slot
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _slot(self) -> int:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():  # threading.local survives a fork, the slot doesn't
+            slot = self._claim()
+            local.slot, local.pid, local.release = slot, os.getpid(), None
+            if slot:
+                # Runs when the thread ends and takes its thread-local along, or when the process exits
+                local.claim = _Claim()
+                local.release = Finalize(local.claim, self._release, (slot, os.getpid()), exitpriority=0)
+        return local.slot
+
+    def _claim(self) -> int:
+        with self.lock:
+            if self.free_count.value:
+                self.free_count.value -= 1
+                return self.free[self.free_count.value]
+            slot = self.claimed.value
+            if slot < self.slots:
+                self.claimed.value = slot + 1
+                return slot
+        if not self._warned:
+            self._warned = True
+            warnings.warn(f"All {self.slots - 1} slots of these SharedCounters are taken, more writers share slot 0 "
+                          f"and its lock. Pass more slots", RuntimeWarning, stacklevel=4)
+        return 0
+
+    def _release(self, slot: int, pid: int):
+        if os.getpid() != pid:
+            return  # A copy of the thread-local that came along with a fork, the slot is still the parent's
+        with self.lock:
+            self.free[self.free_count.value] = slot
+            self.free_count.value += 1
+
+    def release(self):
+        """Gives the calling thread's slot back now instead of when it ends, it claims a new one if it adds again"""
+        local = self._local
+        if getattr(local, "pid", None) == os.getpid():
+            if local.release is not None:
+                local.release()
+            local.pid = local.release = local.claim = None
+
+    def add(self, n: int = 1, field: int = 0):
+        slot = self._slot()
+        index = slot * self.fields + field
+        if slot:
+            self.values[index] += n  # Only we write here
+        else:
+            with self.lock:
+                self.values[index] += n
+
+    def value(self, field: int = 0) -> int:
+        return sum(self.values[field::self.fields])
+
+    def totals(self) -> List[int]:
+        return [self.value(field) for field in range(self.fields)]
+
+    def reset(self):
+        # Only while nobody is adding, a writer in the middle of += would write its old value back
+        for i in range(len(self.values)):
+            self.values[i] = 0
+
+    def install(self):
+        """Makes these the counters advance() bumps in this process, meant as a pool initializer"""
+        global _installed
+        _installed = self
+
+
+_installed: Optional[SharedCounters] = None
+
+
+def advance(n: int = 1, field: int = 0):
+    """Adds n to the counters install() was called with in this process"""
+    if _installed is None:
+        raise RuntimeError("no SharedCounters installed in this process, pass counters.install as the initializer")
+    _installed.add(n, field)
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+
+def format_count(value: float) -> str:
+    for unit in ("", "k", "M", "G"):
+        if abs(value) < 1000:
+            return f"{value:.0f}{unit}" if not unit or value >= 100 else f"{value:.1f}{unit}"
+        value /= 1000
+    return f"{value:.0f}T"
+
+
+class ProgressEvent(Event):
+    """Shows one field of SharedCounters, sampled whenever the window draws
+
+    The rate is taken over the last rate_window seconds, the ETA (with a total) follows from it.
+    """
+    length = 20
+    live = True
+
+    def __init__(self, counters: SharedCounters, total: Optional[int] = None, field: int = 0,
+                 length: Optional[int] = None, rate_window: float = 5.0, position: Optional[Tuple[int]] = (0, 0)):
+        if length is not None:
+            self.length = length
+        super().__init__(position)
+        self.counters = counters
+        self.total = total
+        self.field = field
+        self.rate_window = rate_window
+        self.samples: Deque[Tuple[float, int]] = deque()
+        self.value = 0
+        self.rate = 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if self.total is None or not self.rate:
+            return None
+        return max(self.total - self.value, 0) / self.rate
+
+    @property
+    def finished(self) -> bool:
+        return self.total is not None and self.value >= self.total
+
+    def sample(self, now: Optional[float] = None):
+        now = animation.clock() if now is None else now
+        self.value = self.counters.value(self.field)
+        samples = self.samples
+        if samples and samples[-1][0] == now:
+            return  # Same frame, nothing new
+        samples.append((now, self.value))
+        while len(samples) > 2 and now - samples[1][0] >= self.rate_window:
+            samples.popleft()
+        start, first = samples[0]
+        self.rate = (self.value - first) / (now - start) if now > start else 0.0
+
+    def render(self) -> str:
+        text = format_count(self.value)
+        if self.total is not None:
+            text += f"/{format_count(self.total)}"
+        return f"{text} {format_count(self.rate)}/s"
+
+    def step(self, now: Optional[float] = None):
+        self.sample(now)
+        self.frame = fit(self.render(), self.length)
+
+    def draw(self, buffer, now: Optional[float] = None):
+        self.step(now)
+        super().draw(buffer)
+
+
+class CounterEvent(ProgressEvent):
+    """A count and its rate, for work without a known total"""
+    length = 16
+
+
+class ProgressBar(ProgressEvent):
+    """[=====>    ]  52% 1.2k/s 0:12 with a total, the bar takes whatever the text leaves of length"""
+    length = 40
+
+    def render(self) -> str:
+        if self.total is None:
+            return super().render()
+        done = min(self.value / self.total, 1.0) if self.total else 1.0
+        eta = self.eta
+        text = f" {done * 100:3.0f}% {format_count(self.rate)}/s"
+        if not self.finished:
+            text += f" {format_duration(eta)}" if eta is not None else " -:--"
+        text = text.ljust(20)  # Room for " 100% 999k/s 1:00:00", so the bar doesn't change size as the text does
+        inner = max(self.length - len(text) - 2, 0)
+        filled = int(done * inner)
+        bar = "=" * filled + (">" if filled < inner else "")
+        return f"[{bar.ljust(inner)}]{text}"
@@ -0,0 +1,50 @@
+from typing import Optional
+import threading
+import signal
+
+
+class ResizeMonitor:
+    """Counts SIGWINCHs, a Window only asks for the terminal size when the count changed
+
+    Where there is no SIGWINCH (Windows) or we aren't on the main thread, install() returns False and
+    the Window falls back to polling.
+    """
+    def __init__(self):
+        self.generation = 0
+        self.installed = False
+        self._previous = None
+        self._lock = threading.Lock()
+
+    def install(self) -> bool:
+        with self._lock:
+            if self.installed:
+                return True
+            if not hasattr(signal, "SIGWINCH") or threading.current_thread() is not threading.main_thread():
+                return False
+            self._previous = signal.signal(signal.SIGWINCH, self._handle)
+            self.installed = True
+            return True
+
+    def uninstall(self):
+        with self._lock:
+            if self.installed and threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGWINCH, self._previous if self._previous is not None else signal.SIG_DFL)
+                self.installed = False
+
+    def _handle(self, signum, frame):
+        # Runs between two bytecodes on the main thread, so nothing but the counter happens here
+        self.generation += 1
+        if callable(self._previous):
+            self._previous(signum, frame)
+
+
+_default_monitor: Optional[ResizeMonitor] = None
+_default_lock = threading.Lock()
+
+
+def get_resize_monitor() -> ResizeMonitor:
+    global _default_monitor
+    with _default_lock:
+        if _default_monitor is None:
+            _default_monitor = ResizeMonitor()
+        return _default_monitor
@@ -0,0 +1,110 @@
+from typing import Callable, List, Optional, Union
+import itertools
+import threading
+import heapq
+import time
+
+
+class Job:
+    def __init__(self, callback: Callable[[], None], interval: Union[int, float], due: float):
+        self.callback = callback
+        self.interval = interval
+        self.due = due
+        self.cancelled = False
+        self.lag = 0.0  # How late the last run started
+        self.missed = 0  # Runs that were skipped because the previous ones took too long
+
+
+class Scheduler:
+    """One thread that fires every job when it's due, instead of one sleeping thread per event"""
+    def __init__(self):
+        self._heap: List[tuple] = []  # (due, tie breaker, job)
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._live_jobs = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, callback: Callable[[], None], interval: Union[int, float],
+                 delay: Optional[Union[int, float]] = None) -> Job:
+        job = Job(callback, interval, time.monotonic() + (interval if delay is None else delay))
+        with self._condition:
+            heapq.heappush(self._heap, (job.due, next(self._counter), job))
+            self._live_jobs += 1
+            if self._thread is None:
+                # A daemon, animations that are still scheduled shouldn't keep the program from exiting
+                self._thread = threading.Thread(target=self._run, name="limmer-scheduler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def cancel(self, job: Job):
+        with self._condition:
+            if not job.cancelled:
+                job.cancelled = True  # Removed lazily once it reaches the top of the heap
+                self._live_jobs -= 1
+                self._condition.notify()
+
+    def join(self, timeout: Optional[float] = None):
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _due_jobs(self) -> Optional[List[Job]]:
+        # Blocks until at least one job is due, returns None once there is nothing left to run
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._live_jobs:
+                    self._thread = None
+                    return None
+
+                now = time.monotonic()
+                if self._heap[0][0] > now:
+                    self._condition.wait(self._heap[0][0] - now)  # Sleep exactly until the next deadline
+                    continue
+
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    job = heapq.heappop(self._heap)[2]
+                    if not job.cancelled:
+                        due.append(job)
+                return due
+
+    def _reschedule(self, job: Job):
+        with self._condition:
+            if job.cancelled:
+                return
+            # Don't try to catch up on missed ticks, that would only cause bursts
+            now = time.monotonic()
+            if job.due + job.interval < now and job.interval > 0:
+                job.missed += int((now - job.due) // job.interval)
+            job.due = max(job.due + job.interval, now)
+            heapq.heappush(self._heap, (job.due, next(self._counter), job))
+
+    def _run(self):
+        while True:
+            due = self._due_jobs()
+            if due is None:
+                break
+            for job in due:
+                job.lag = time.monotonic() - job.due
+                try:
+                    job.callback()
+                except Exception as e:
+                    print(f"An error has occurred: {e}")
+                    self.cancel(job)
+                    continue
+                self._reschedule(job)
+
+
+_default_scheduler: Optional[Scheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = Scheduler()
+        return _default_scheduler
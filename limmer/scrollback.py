@@ -0,0 +1,150 @@
+from typing import BinaryIO, Iterator, List, Optional, Union
+from array import array
+import threading
+import mmap
+import os
+
+
+_LINE_OVERHEAD = 41  # A bytes object plus its slot in the list, what a line costs on top of its length
+
+
+class Scrollback:
+    """Lines that scrolled off the screen, the newest in memory and the rest in an append-only file
+
+    The memory part is a ring of encoded lines within max_memory bytes, whatever gets pushed out of it is appended
+    to the spill file (a temporary one unless a path is given, which mustn't exist yet) and read back through
+    mmap. The offset index (8 bytes a line) is the only thing that still grows in memory, every line is reachable
+    in O(1) either way. With spill=False old lines are simply dropped. Index 0 is the oldest line that is still
+    around. After close() the spilled lines can't be read or added to anymore until clear().
+    """
+    def __init__(self, max_memory: int = 4 * 1024 * 1024, spill: bool = True,
+                 path: Optional[Union[str, os.PathLike]] = None):
+        self.max_memory = max_memory
+        self.spill = spill
+        self.path = path
+        self.lines: List[bytes] = []  # Ring, the live part starts at self.start
+        self.start = 0
+        self.memory = 0
+        self.dropped = 0  # Lines that are gone for good (spill=False)
+
+        self.file: Optional[BinaryIO] = None
+        self.offsets = array("Q", [0])  # Start of every spilled line plus the end of the last one
+        self.map: Optional[mmap.mmap] = None
+        self._mapped = 0  # Bytes of the file the current map covers
+        self._created = False  # Whether we made the file at path, only then may it be reused
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1 + len(self.lines) - self.start
+
+    @property
+    def spilled(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, line: str):
+        self.extend((line,))
+
+    def extend(self, lines):
+        with self._lock:
+            if self.spill:
+                self._check_open()
+            for line in lines:
+                encoded = line.encode("utf-8")
+                self.lines.append(encoded)
+                self.memory += len(encoded) + _LINE_OVERHEAD
+            if self.memory > self.max_memory:
+                self._evict()
+
+    def _evict(self):
+        # Push out the oldest lines until we're back under budget, spilled all in one write
+        end, memory = self.start, self.memory
+        while memory > self.max_memory and end < len(self.lines):
+            memory -= len(self.lines[end]) + _LINE_OVERHEAD
+            end += 1
+        evicted = self.lines[self.start:end]
+        if self.spill:
+            self._spill(evicted)  # If that fails nothing moved
+        else:
+            self.dropped += len(evicted)
+        self.memory = memory
+        for i in range(self.start, end):
+            self.lines[i] = b""
+        self.start = end
+        if self.start > len(self.lines) // 2:  # Compact once half of the list is dead, keeps it amortized O(1)
+            del self.lines[:self.start]
+            self.start = 0
+
+    def _check_open(self):
+        if self.file is None and self.spilled:
+            raise ValueError("the scrollback is closed")
+
+    def _spill(self, lines: List[bytes]):
+        if self.file is None:  # Nothing spilled yet, so nothing in the file we'd lose
+            if self.path is not None:
+                # Someone else's file isn't ours to overwrite, the one we made before clear() is
+                self.file = open(self.path, "w+b" if self._created else "x+b")
+                self._created = True
+            else:
+                import tempfile  # Only once something actually spills
+                self.file = tempfile.TemporaryFile()
+        offset = self.offsets[-1]
+        for line in lines:
+            offset += len(line)
+            self.offsets.append(offset)
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(b"".join(lines))
+
+    def _view(self, end: int) -> mmap.mmap:
+        self._check_open()
+        if end > self._mapped:  # The file grew past the map, map it again
+            self.file.flush()
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = len(self.map)
+        return self.map
+
+    def get_bytes(self, index: int) -> bytes:
+        with self._lock:
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("scrollback index out of range")
+            spilled = self.spilled
+            if index >= spilled:
+                return self.lines[self.start + index - spilled]
+            start, end = self.offsets[index], self.offsets[index + 1]
+            return self._view(end)[start:end] if end > start else b""
+
+    def __getitem__(self, index: int) -> str:
+        return self.get_bytes(index).decode("utf-8")
+
+    def tail(self, count: int) -> List[str]:
+        """The newest count lines, oldest first"""
+        with self._lock:
+            return [self[i] for i in range(max(len(self) - count, 0), len(self))]
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def clear(self):
+        with self._lock:
+            self.close()
+            self.lines, self.start, self.memory, self.dropped = [], 0, 0, 0
+            self.offsets = array("Q", [0])
+
+    def close(self):
+        with self._lock:
+            if self.map is not None:
+                self.map.close()
+                self.map, self._mapped = None, 0
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,122 @@
+from typing import Optional, TextIO
+import time
+import io
+import os
+
+if os.name != "nt":
+    import select
+
+
+class FdSink(io.TextIOBase):
+    """Writes encoded bytes straight to a file descriptor, no TextIOWrapper in between
+
+    Text is encoded once into a reused bytearray and flush() hands it to os.write until all of it is out,
+    partial writes just continue where they stopped. On a non-blocking fd flush waits (select) until the fd
+    is writable again, at most timeout seconds; whatever didn't make it stays buffered for the next flush.
+    That backlog is kept under max_backlog bytes, past it flush waits as long as it takes (dropping bytes could
+    cut an escape sequence in half).
+    stream is the text stream that shares the fd (usually sys.stdout), it gets flushed first so
+    nothing printed through it ends up after our output.
+    """
+    def __init__(self, fd: int, stream: Optional[TextIO] = None, encoding: str = "utf-8",
+                 timeout: Optional[float] = None, max_backlog: Optional[int] = 1 << 20):
+        self.fd = fd
+        self.stream = stream
+        self._encoding = encoding
+        self.timeout = timeout
+        self.max_backlog = max_backlog
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.blocked = 0  # How often the fd wasn't writable and flush had to wait
+
+    @classmethod
+    def for_stream(cls, stream: TextIO, **kwargs) -> Optional["FdSink"]:
+        """A sink on stream's fd, None if it has none (StringIO, captured output, ...)"""
+        try:
+            fd = stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+        return cls(fd, stream, getattr(stream, "encoding", None) or "utf-8", **kwargs)
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    @property
+    def backlog(self) -> int:
+        """Bytes still waiting for the fd"""
+        return len(self.buffer)
+
+    def writable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def isatty(self) -> bool:
+        return os.isatty(self.fd)
+
+    def write(self, text: str) -> int:
+        self.buffer += text.encode(self._encoding, "replace")
+        return len(text)
+
+    def send(self, text: str) -> int:
+        """write() and flush() in one, returns how many bytes actually got written (older queued ones included)"""
+        data = text.encode(self._encoding, "replace")
+        if self.buffer:
+            before = self.bytes_written
+            self.buffer += data
+            self.flush()
+            return self.bytes_written - before
+        # Nothing queued up, so try it without copying into the buffer first
+        if self.stream is not None:
+            self.stream.flush()
+        try:
+            sent = os.write(self.fd, data)
+        except BlockingIOError:
+            sent = 0
+        self.bytes_written += sent
+        if sent < len(data):
+            self.buffer += memoryview(data)[sent:]
+            before = self.bytes_written
+            self.flush()
+            sent += self.bytes_written - before
+        return sent
+
+    def write_bytes(self, data: bytes):
+        self.buffer += data
+
+    def flush(self) -> bool:
+        """True once everything is written, False if the timeout ran out first"""
+        if self.stream is not None:
+            self.stream.flush()
+        if not self.buffer:
+            return True
+        view = memoryview(self.buffer)
+        sent, deadline = 0, None
+        try:
+            while sent < len(view):
+                try:
+                    sent += os.write(self.fd, view[sent:])
+                except BlockingIOError:
+                    self.blocked += 1
+                    if deadline is None and self.timeout is not None:
+                        deadline = time.monotonic() + self.timeout
+                    over = self.max_backlog is not None and len(view) - sent > self.max_backlog
+                    if not self._wait_writable(None if over else deadline):
+                        return False
+        finally:
+            view.release()  # The bytearray can't be resized while a view is alive
+            del self.buffer[:sent]
+            self.bytes_written += sent
+        return True
+
+    def _wait_writable(self, deadline: Optional[float]) -> bool:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            return False
+        if os.name == "nt":  # select only takes sockets there
+            time.sleep(min(remaining, 0.001) if remaining is not None else 0.001)
+            return True
+        select.select([], [self.fd], [], remaining)
+        return True
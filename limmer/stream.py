@@ -0,0 +1,185 @@
+from collections import deque
+from typing import Any, AsyncIterable, Deque, Dict, Iterable, Optional, Union
+from .scheduler import Job, Scheduler, get_scheduler
+import threading
+import time
+
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class TextStream:
+    """Feeds lines into a Window, everything that arrives within one frame goes out as one write
+
+    The producer only ever appends to a bounded buffer, writing to the terminal happens on the scheduler thread.
+    Once max_pending lines are waiting, "block" makes the producer wait (so a pipe behind it fills up
+    and slows the other process down), "drop_oldest" throws away the oldest waiting lines and "drop_newest"
+    the new ones. Lines are written as they come, lines from files and pipes already end in a newline.
+    """
+    def __init__(self, window, max_pending: int = 10000, policy: str = "block", interval: Optional[float] = None,
+                 scheduler: Optional[Scheduler] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"policy has to be one of {', '.join(POLICIES)}, not {policy!r}")
+        self.window = window
+        self.max_pending = max_pending
+        self.policy = policy
+        self.interval = interval or (1 / window.max_fps if window.max_fps else 1 / 60)
+        self.scheduler = scheduler or window.scheduler or get_scheduler()
+
+        self.pending: Deque[str] = deque()
+        self.pending_since: Optional[float] = None  # When the oldest waiting line arrived
+        self._condition = threading.Condition()
+        self.closed = False  # No more input
+        self.done = threading.Event()  # Closed and everything written, or writing failed
+        self.job: Optional[Job] = None
+        self.pump = None  # The thread or task reading the source, if there is one
+        self.error: Optional[BaseException] = None
+
+        self.lines_in = 0
+        self.lines_written = 0
+        self.dropped = 0
+        self.writes = 0
+        self.last_lag = 0.0  # How long the oldest line of the last write had been waiting
+        self.max_lag = 0.0
+
+    # Producer side
+    def feed(self, line: Union[str, bytes]) -> bool:
+        """Queues a line, False if it got dropped. With "block" this waits while the buffer is full"""
+        if isinstance(line, (bytes, bytearray)):
+            line = line.decode("utf-8", errors="replace")
+        with self._condition:
+            if self.policy == "block":
+                while len(self.pending) >= self.max_pending and not self.closed:
+                    self._condition.wait()
+            if self.closed:
+                self.dropped += 1
+                return False
+            if len(self.pending) >= self.max_pending:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                self.pending.popleft()
+                self.dropped += 1
+            if not self.pending:
+                self.pending_since = time.monotonic()
+            self.pending.append(line)
+            self.lines_in += 1
+            return True
+
+    async def feed_async(self, line: Union[str, bytes]) -> bool:
+        # Same as feed, but blocking means waiting a frame at a time instead of holding up the loop
+        import asyncio
+        while self.policy == "block" and len(self.pending) >= self.max_pending and not self.closed:
+            await asyncio.sleep(self.interval)
+        return self.feed(line)
+
+    def close(self):
+        """No more input, what's still waiting gets written"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    # Writer side, runs on the scheduler
+    def start(self):
+        self.job = self.scheduler.schedule(self._flush, self.interval, delay=0)
+
+    def _flush(self):
+        with self._condition:
+            if self.pending:
+                lines = list(self.pending)
+                self.pending.clear()
+                lag = time.monotonic() - self.pending_since
+                self.pending_since = None
+                self._condition.notify_all()
+            else:
+                lines = None
+            finished = self.closed and lines is None
+        if lines:
+            try:
+                self.window.sendText("".join(lines))
+            except Exception as e:
+                self._fail(e, len(lines))
+                return
+            self.lines_written += len(lines)
+            self.writes += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+        if finished:
+            self.scheduler.cancel(self.job)
+            self.done.set()
+            with self._condition:
+                self._condition.notify_all()
+
+    def _fail(self, error: Exception, lost: int):
+        # Nothing more can be written, so the stream ends here instead of leaving join() and producers waiting
+        with self._condition:
+            self.error = error
+            self.closed = True
+            self.dropped += lost + len(self.pending)
+            self.pending.clear()
+            self.pending_since = None
+            self._condition.notify_all()
+        self.scheduler.cancel(self.job)
+        self.done.set()
+
+    # Pumps, one per source kind
+    def _pump(self, source: Iterable[Any]):
+        try:
+            for line in source:
+                if not self.feed(line) and self.closed:
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.close()
+
+    async def _pump_async(self, source: AsyncIterable[Any]):
+        try:
+            async for line in source:
+                if not await self.feed_async(line) and self.closed:
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            self.close()
+
+    def stop(self):
+        """Stops writing, whatever is still waiting gets thrown away"""
+        with self._condition:
+            self.closed = True
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            self._condition.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """True once everything is written or writing failed, error has the exception then"""
+        return self.done.wait(timeout)
+
+    def __await__(self):
+        return self._wait().__await__()
+
+    async def _wait(self):
+        import asyncio
+        if self.pump is not None and not isinstance(self.pump, threading.Thread):
+            await self.pump
+        while not self.done.is_set():
+            await asyncio.sleep(self.interval)
+        return self
+
+    @property
+    def lag(self) -> float:
+        """How long the oldest waiting line has been waiting right now"""
+        since = self.pending_since
+        return time.monotonic() - since if since is not None else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "lines_in": self.lines_in,
+            "lines_written": self.lines_written,
+            "pending": len(self.pending),
+            "dropped": self.dropped,
+            "writes": self.writes,
+            "lag": self.lag,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
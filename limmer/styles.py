@@ -1,21 +1,186 @@
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+import threading
+
+__all__ = ["StyleState", "DEFAULT_COLOR", "BASIC", "INDEXED", "TRUECOLOR", "DEFAULT", "RESET", "pack", "unpack", "rgb",
+           "sgr_params", "apply_sgr", "sgr_transition", "InLineStyleAttr", "InlineStyle", "Color", "Formatting",
+           "Background"]
+
+
+# A style is one int: fg in bits 0-25, bg in 26-51 and the SGR attributes 1-9 as flags from bit 52 on.
+# A colour is its kind in the top 2 of its 26 bits and the value below, so truecolor fits without any objects.
+StyleState = int
+COLOR_BITS = 26
+COLOR_MASK = (1 << COLOR_BITS) - 1
+FG_SHIFT = 0
+BG_SHIFT = COLOR_BITS
+ATTR_SHIFT = 2 * COLOR_BITS
+ATTR_MASK = 0x1FF << ATTR_SHIFT
+
+DEFAULT_COLOR = 0  # 39/49, whatever the terminal uses
+BASIC = 1 << 24  # Value is the fg SGR code (30-37, 90-97)
+INDEXED = 2 << 24  # Value is a 256 colour palette index
+TRUECOLOR = 3 << 24  # Value is 0xRRGGBB
+_KIND_MASK = 3 << 24
+_VALUE_MASK = (1 << 24) - 1
+
+_ATTR_OFF = {1: 22, 2: 22, 3: 23, 4: 24, 5: 25, 6: 25, 7: 27, 8: 28, 9: 29}
+
+
+def pack(fg: int = DEFAULT_COLOR, bg: int = DEFAULT_COLOR, attributes: int = 0) -> StyleState:
+    """attributes are flags, bit n - 1 for SGR attribute n"""
+    return fg << FG_SHIFT | bg << BG_SHIFT | attributes << ATTR_SHIFT
+
+
+def unpack(style: StyleState) -> Tuple[int, int, int]:
+    return style >> FG_SHIFT & COLOR_MASK, style >> BG_SHIFT & COLOR_MASK, style >> ATTR_SHIFT & 0x1FF
+
+
+def rgb(r: Union[str, int], g: Union[str, int], b: Union[str, int]) -> int:
+    return TRUECOLOR | int(r) << 16 | int(g) << 8 | int(b)
+
+
+DEFAULT: StyleState = pack(BASIC | 37, BASIC | 30)  # White on black, basic bg colours are kept as their fg code
+RESET: StyleState = 0  # What the terminal shows after \x1b[0m
+
+
+def _color_params(color: int, background: bool) -> str:
+    kind, value = color & _KIND_MASK, color & _VALUE_MASK
+    if kind == BASIC:  # Stored as the fg code, bg codes are 10 higher
+        return str(value + 10) if background else str(value)
+    if kind == INDEXED:
+        return f"{48 if background else 38};5;{value}"
+    if kind == TRUECOLOR:
+        return f"{48 if background else 38};2;{value >> 16};{value >> 8 & 0xFF};{value & 0xFF}"
+    return "49" if background else "39"
+
+
+def sgr_params(style: StyleState) -> List[str]:
+    """What \x1b[0;...m needs to get from a reset terminal to style"""
+    fg, bg, attributes = unpack(style)
+    params = [str(n) for n in range(1, 10) if attributes >> (n - 1) & 1]
+    if fg:
+        params.append(_color_params(fg, False))
+    if bg:
+        params.append(_color_params(bg, True))
+    return params
+
+
+def apply_sgr(style: StyleState, params: List[str]) -> StyleState:
+    """What style becomes after the terminal got \x1b[<params>m, unknown parameters are ignored"""
+    fg, bg, attributes = unpack(style)
+    i = 0
+    while i < len(params):
+        code = int(params[i]) if params[i].isdigit() else -1
+        if code in (38, 48):  # 5;n or 2;r;g;b
+            mode = params[i + 1] if i + 1 < len(params) else ""
+            if mode == "5" and i + 2 < len(params) and params[i + 2].isdigit():
+                color, i = INDEXED | int(params[i + 2]) & 0xFF, i + 3
+            elif mode == "2" and i + 4 < len(params) and all(part.isdigit() for part in params[i + 2:i + 5]):
+                color, i = rgb(*(int(part) & 0xFF for part in params[i + 2:i + 5])), i + 5
+            else:
+                break  # Can't tell where it ends
+            if code == 38:
+                fg = color
+            else:
+                bg = color
+            continue
+        if code == 0 or params[i] == "":
+            fg, bg, attributes = DEFAULT_COLOR, DEFAULT_COLOR, 0
+        elif 1 <= code <= 9:
+            attributes |= 1 << (code - 1)
+        elif code == 22:
+            attributes &= ~0b11
+        elif code in (23, 24, 25, 27, 28, 29):
+            attributes &= ~(1 << (code - 21))
+            if code == 25:
+                attributes &= ~(1 << 5)
+        elif 30 <= code <= 37 or 90 <= code <= 97:
+            fg = BASIC | code
+        elif code == 39:
+            fg = DEFAULT_COLOR
+        elif 40 <= code <= 47 or 100 <= code <= 107:
+            bg = BASIC | code - 10
+        elif code == 49:
+            bg = DEFAULT_COLOR
+        i += 1
+    return pack(fg, bg, attributes)
 
 
 class InLineStyleAttr:
-    def __init__(self, value: str):
-        self.value: str = value
+    """An "attr;fg;bg" style change, empty slots keep whatever was set before
+
+    Applying it is one and/or on the packed style: state & ~mask | bits.
+    """
+    __slots__ = ("value", "mask", "bits", "sequence")
+    _interned: Dict[str, "InLineStyleAttr"] = {}
+    _intern_lock = threading.Lock()
+
+    def __new__(cls, value: str):
+        # Every value only ever gets parsed once, equal values share one object
+        style = cls._interned.get(value)
+        if style is None:
+            with cls._intern_lock:
+                style = cls._interned.get(value)
+                if style is None:
+                    style = super().__new__(cls)
+                    style.value = value
+                    style.mask, style.bits = cls._parse(value)
+                    style.sequence = f"\x1b[{';'.join(['0'] + sgr_params(style.apply(DEFAULT)))}m"
+                    cls._interned[value] = style
+        return style
+
+    @staticmethod
+    def _parse(value: str) -> Tuple[int, int]:
+        mask = bits = 0
+        slots = (value.split(";", 2) + ["", ""])[:3]
+        attribute, fg, bg = (slot.replace(":", ";") for slot in slots)
+        if attribute == "0":
+            mask |= ATTR_MASK
+        elif attribute.isdigit() and 1 <= int(attribute) <= 9:  # Attributes add up, "0" clears them again
+            mask |= 1 << (int(attribute) - 1 + ATTR_SHIFT)
+            bits |= 1 << (int(attribute) - 1 + ATTR_SHIFT)
+        for slot, shift, background in ((fg, FG_SHIFT, False), (bg, BG_SHIFT, True)):
+            if not slot.replace(";", "").isdigit():
+                continue  # Empty (or something we can't parse), keep what was there
+            mask |= COLOR_MASK << shift
+            if slot != "0":  # A 0 here has always meant back to the terminal's colour
+                fg_color, bg_color, _ = unpack(apply_sgr(RESET, slot.split(";")))
+                bits |= (bg_color or fg_color if background else fg_color or bg_color) << shift
+        return mask, bits
+
+    def apply(self, state: StyleState) -> StyleState:
+        return state & ~self.mask | self.bits
 
     def __repr__(self):
-        last_style = [0, 37, 40]
-        for i, part in enumerate([x for x in self.value.split(";")]):
-            if part.isnumeric() or part.replace(":", "").isnumeric():
-                part = part.replace(":", ";")
-                if not part == 0:
-                    last_style[i] = part
-                else:
-                    last_style[i] = [0, 37, 40][i]
-        style_str = ';'.join([str(y) for y in last_style])
-        return f"\x1b[0m\x1b[{style_str}m"
+        return self.sequence
+
+
+@lru_cache(maxsize=4096)
+def sgr_transition(previous: Optional[StyleState], new: StyleState) -> str:
+    """The shortest SGR sequence that gets the terminal from previous (None if unknown) to new"""
+    if previous == new:
+        return ""
+    full = f"\x1b[{';'.join(['0'] + sgr_params(new))}m"
+    if new == RESET or previous is None:
+        return full
+    old_fg, old_bg, old_attributes = unpack(previous)
+    fg, bg, attributes = unpack(new)
+    params = []
+    off = old_attributes & ~attributes
+    attributes_on = attributes & ~old_attributes
+    if off:
+        params.extend(sorted({str(_ATTR_OFF[n]) for n in range(1, 10) if off >> (n - 1) & 1}))
+        for pair in (0b11, 0b110000):  # 22 and 25 switch off two attributes at once, the one that stays comes back
+            if off & pair:
+                attributes_on |= attributes & pair
+    params.extend(str(n) for n in range(1, 10) if attributes_on >> (n - 1) & 1)
+    if fg != old_fg:
+        params.append(_color_params(fg, False))
+    if bg != old_bg:
+        params.append(_color_params(bg, True))
+    delta = f"\x1b[{';'.join(params)}m"
+    return delta if len(delta) < len(full) else full
 
 
 class InlineStyle:
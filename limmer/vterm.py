@@ -0,0 +1,254 @@
+from .buffer import CellBuffer, BLANK, WIDE_TAIL
+from .styles import StyleState, RESET, apply_sgr
+from .width import char_width
+from typing import List, Optional, Tuple
+import io
+import re
+
+
+class VirtualTerminal(io.TextIOBase):
+    """An in-memory terminal, Window and Cursor can write into it instead of sys.stdout
+
+    It keeps a cell grid of what a real terminal would show, answers cursor position queries and counts
+    what it got, so rendering can be checked and measured without a console.
+    Cells hold (char, style) with the same packed styles the Window uses, so the two can be compared directly.
+    """
+    _TOKENS = re.compile(r"\x1b\[([0-9;?:]*)[ -/]*([@-~])|\x1b.|[\x00-\x1f\x7f]|[^\x00-\x1f\x7f\x1b]+")
+    _INCOMPLETE = re.compile(r"\x1b(\[[0-9;?:]*[ -/]*)?$")
+
+    def __init__(self, width: int = 80, height: int = 24, newline_returns: bool = True):
+        self.width = width
+        self.height = height
+        self.newline_returns = newline_returns  # \n also goes to the first column, like a cooked tty
+        self.screen = CellBuffer(width, height)
+        self.x, self.y = 1, 1
+        self.wrap_pending = False
+        self.saved: Optional[Tuple[int, int]] = None
+        self.sgr: StyleState = RESET
+        self.top, self.bottom = 1, height  # Scroll region
+        self.synchronized = False
+        self._pending = ""  # Start of an escape sequence that was cut off between two writes
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.writes = 0
+        self.flushes = 0
+        self.bytes_written = 0
+        self.sequences = 0
+        self.dsr_queries = 0
+        self.frames = 0  # Synchronized updates (DEC mode 2026) that were completed
+
+    # File-like side, this is what the Cursor writes into
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        self.bytes_written += len(text.encode("utf-8"))
+        data = self._pending + text
+        incomplete = self._INCOMPLETE.search(data)
+        if incomplete:
+            self._pending, data = data[incomplete.start():], data[:incomplete.start()]
+        else:
+            self._pending = ""
+        self.feed(data)
+        return len(text)
+
+    def flush(self):
+        self.flushes += 1
+
+    # What the Window asks instead of the real terminal
+    def query_cursor_position(self) -> Tuple[int, int]:
+        self.dsr_queries += 1
+        return self.y, self.x
+
+    def get_terminal_size(self) -> List[int]:
+        return [self.width, self.height]
+
+    def resize(self, width: int, height: int):
+        # Like xterm, content is cut off or padded but not re-wrapped
+        old = self.screen
+        self.screen = CellBuffer(width, height)
+        columns = min(width, old.width)
+        for y in range(min(height, old.height)):
+            self.screen.chars[y][:columns] = old.chars[y][:columns]
+            self.screen.styles[y][:columns] = old.styles[y][:columns]
+        self.width, self.height = width, height
+        self.top, self.bottom = 1, height
+        self.x, self.y = min(self.x, width), min(self.y, height)
+        self.wrap_pending = False
+
+    # Looking at the result
+    def line(self, y: int) -> str:
+        return self.screen.row_text(y).rstrip()
+
+    def lines(self) -> List[str]:
+        return [self.line(y) for y in range(1, self.height + 1)]
+
+    def cell(self, x: int, y: int) -> Tuple[str, StyleState]:
+        return self.screen.get(x, y)
+
+    # Parsing
+    def feed(self, data: str):
+        for match in self._TOKENS.finditer(data):
+            token = match.group()
+            if match.group(2) is not None:
+                self.sequences += 1
+                self._csi(match.group(1), match.group(2))
+            elif token[0] == "\x1b":
+                self.sequences += 1
+                self._escape(token[1:])
+            elif len(token) == 1 and token < " " or token == "\x7f":
+                self._control(token)
+            else:
+                self._print(token)
+
+    def _print(self, text: str):
+        for char in text:
+            columns = char_width(char)
+            if not columns:
+                # Belongs to the last printed cell, which is the current one while a wrap is pending
+                self.screen._combine(self.x + 1 if self.wrap_pending else self.x, self.y, char)
+                continue
+            if self.wrap_pending or self.x + columns - 1 > self.width:
+                self.x = 1
+                self._linefeed()
+            self.screen.put(self.x, self.y, char, self.sgr)
+            if columns == 2:
+                self.screen.put(self.x + 1, self.y, WIDE_TAIL, self.sgr)
+            self.x += columns
+            self.wrap_pending = self.x > self.width
+            if self.wrap_pending:
+                self.x = self.width
+
+    def _linefeed(self):
+        self.wrap_pending = False
+        if self.y == self.bottom:
+            self._scroll_up(1)
+        elif self.y < self.height:
+            self.y += 1
+
+    def _move_rows(self, remove_at: int, insert_at: int, n: int):
+        # Takes n rows out at remove_at and puts n blank ones in at insert_at (row numbers after the removal)
+        screen = self.screen
+        del screen.chars[remove_at - 1:remove_at - 1 + n], screen.styles[remove_at - 1:remove_at - 1 + n]
+        screen.chars[insert_at - 1:insert_at - 1] = [screen._blank_chars(self.width) for _ in range(n)]
+        screen.styles[insert_at - 1:insert_at - 1] = [screen._blank_styles(self.width) for _ in range(n)]
+        del screen.wrapped[remove_at - 1:remove_at - 1 + n]
+        screen.wrapped[insert_at - 1:insert_at - 1] = [False] * n
+
+    def _scroll_up(self, n: int):
+        n = min(n, self.bottom - self.top + 1)
+        self._move_rows(self.top, self.bottom - n + 1, n)
+
+    def _scroll_down(self, n: int):
+        n = min(n, self.bottom - self.top + 1)
+        self._move_rows(self.bottom - n + 1, self.top, n)
+
+    def _control(self, char: str):
+        if char == "\n":
+            self._linefeed()
+            if self.newline_returns:
+                self.x = 1
+        elif char == "\r":
+            self.x, self.wrap_pending = 1, False
+        elif char == "\b":
+            self.x, self.wrap_pending = max(self.x - 1, 1), False
+        elif char == "\t":
+            self.x, self.wrap_pending = min((self.x - 1) // 8 * 8 + 9, self.width), False
+
+    def _escape(self, rest: str):
+        if rest == "7":
+            self.saved = (self.x, self.y)
+        elif rest == "8" and self.saved:
+            self.x, self.y = self.saved
+        elif rest == "M":  # Reverse index
+            if self.y == self.top:
+                self._scroll_down(1)
+            elif self.y > 1:
+                self.y -= 1
+        elif rest == "D":
+            self._linefeed()
+
+    def _csi(self, params: str, final: str):
+        if params.startswith("?"):
+            if params == "?2026" and final == "h":
+                self.synchronized = True
+            elif params == "?2026" and final == "l" and self.synchronized:
+                self.synchronized = False
+                self.frames += 1
+            return
+        if final == "m":
+            self._sgr(params)
+            return
+        args = [int(part) if part.isdigit() else 0 for part in params.split(";")] if params else []
+        n = max(args[0], 1) if args else 1
+        moved = True
+        if final == "A":
+            self.y = max(self.y - n, 1)
+        elif final == "B":
+            self.y = min(self.y + n, self.height)
+        elif final == "C":
+            self.x = min(self.x + n, self.width)
+        elif final == "D":
+            self.x = max(self.x - n, 1)
+        elif final == "E":
+            self.x, self.y = 1, min(self.y + n, self.height)
+        elif final == "F":
+            self.x, self.y = 1, max(self.y - n, 1)
+        elif final == "G":
+            self.x = min(n, self.width)
+        elif final == "d":
+            self.y = min(n, self.height)
+        elif final in "Hf":
+            self.y = min(n, self.height)
+            self.x = min(max(args[1], 1), self.width) if len(args) > 1 else 1
+        elif final == "s":
+            self.saved = (self.x, self.y)
+        elif final == "u" and self.saved:
+            self.x, self.y = self.saved
+        elif final == "n" and args and args[0] == 6:
+            self.dsr_queries += 1  # The answer is what query_cursor_position returns
+        elif final == "J":
+            self._erase_display(args[0] if args else 0)
+        elif final == "K":
+            self._erase_line(args[0] if args else 0)
+        elif final == "r":
+            top = args[0] if args and args[0] else 1
+            bottom = args[1] if len(args) > 1 and args[1] else self.height
+            if top < bottom <= self.height:
+                self.top, self.bottom = top, bottom
+                self.x, self.y = 1, 1
+        elif final == "S":
+            self._scroll_up(n)
+        elif final == "T":
+            self._scroll_down(n)
+        elif final == "L" and self.top <= self.y <= self.bottom:
+            top, self.top = self.top, self.y
+            self._scroll_down(n)
+            self.top, self.x = top, 1
+        elif final == "M" and self.top <= self.y <= self.bottom:
+            top, self.top = self.top, self.y
+            self._scroll_up(n)
+            self.top, self.x = top, 1
+        else:
+            moved = False
+        if moved:
+            self.wrap_pending = False
+
+    def _erase_line(self, mode: int, y: Optional[int] = None):
+        start, end = {0: (self.x, self.width), 1: (1, self.x)}.get(mode, (1, self.width))
+        if y is not None:
+            start, end = 1, self.width
+        for x in range(start, end + 1):
+            self.screen.put(x, y or self.y, BLANK, self.sgr)  # Erasing fills with the current background
+
+    def _erase_display(self, mode: int):
+        self._erase_line(mode if mode < 2 else 2)
+        rows = range(self.y + 1, self.height + 1) if mode == 0 else range(1, self.y) if mode == 1 \
+            else range(1, self.height + 1)
+        for y in rows:
+            self._erase_line(2, y)
+
+    def _sgr(self, params: str):
+        self.sgr = apply_sgr(self.sgr, params.replace(":", ";").split(";") if params else ["0"])
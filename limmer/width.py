@@ -0,0 +1,76 @@
+from functools import lru_cache
+import unicodedata
+import threading
+
+
+# Widths are looked up per 256 code point page, a page gets built from the Unicode tables the first time
+# something in it is measured. 0 = zero width (combining, control), 1 = normal, 2 = wide (East Asian, emoji)
+_pages = {}
+_pages_lock = threading.Lock()
+
+_WIDE_RANGES = (  # Emoji presentation blocks that east_asian_width doesn't mark as wide on older Pythons
+    (0x1F300, 0x1F64F), (0x1F680, 0x1F6FF), (0x1F900, 0x1F9FF), (0x1FA70, 0x1FAFF),
+)
+
+
+def _compute(code: int) -> int:
+    char = chr(code)
+    if code == 0 or code < 32 or 0x7F <= code < 0xA0:
+        return 0
+    if code in (0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF) or 0xFE00 <= code <= 0xFE0F:
+        return 0  # Zero width spaces/joiners and variation selectors
+    category = unicodedata.category(char)
+    if category in ("Mn", "Me") or unicodedata.combining(char):
+        return 0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    for start, end in _WIDE_RANGES:
+        if start <= code <= end:
+            return 2
+    return 1
+
+
+def _page(number: int) -> bytes:
+    page = _pages.get(number)
+    if page is None:
+        with _pages_lock:
+            page = _pages.get(number)
+            if page is None:
+                start = number << 8
+                page = bytes(_compute(code) for code in range(start, start + 256))
+                _pages[number] = page
+    return page
+
+
+def char_width(char: str) -> int:
+    code = ord(char)
+    if 32 <= code < 127:
+        return 1
+    return _page(code >> 8)[code & 0xFF]
+
+
+@lru_cache(maxsize=4096)
+def _str_width(text: str) -> int:
+    return sum(_page(code >> 8)[code & 0xFF] for code in map(ord, text))
+
+
+def str_width(text: str) -> int:
+    """How many columns text takes up on the terminal, text shouldn't contain escape sequences"""
+    if text.isascii() and text.isprintable():
+        return len(text)
+    return _str_width(text)
+
+
+def fit(text: str, width: int) -> str:
+    """Cuts or pads text to exactly width columns, a wide character that would be split becomes a space"""
+    if text.isascii() and text.isprintable():
+        return text[:width].ljust(width)
+    columns, end = 0, 0
+    for end, char in enumerate(text):
+        char_columns = char_width(char)
+        if columns + char_columns > width:
+            break
+        columns += char_columns
+    else:
+        end = len(text)
+    return text[:end] + " " * (width - columns)
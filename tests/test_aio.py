@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from limmer.aio import AsyncEvent, AsyncWindow
+from limmer.events import Event
+from limmer.vterm import VirtualTerminal
+
+
+class Counter(Event):
+    """Steps through its own state, so something has to call step()"""
+    length = 2
+    interval = 0.01
+
+    def __init__(self):
+        super().__init__()
+        self.steps = 0
+
+    def step(self):
+        self.steps += 1
+        self.frame = str(min(self.steps, 99)).rjust(2)
+
+
+def test_async_events_and_stepped_events_render_from_the_loop():
+    terminal = VirtualTerminal(20, 4)
+    threads = threading.active_count()
+
+    async def frames():
+        for frame in ("a", "bb", "ccc"):
+            await asyncio.sleep(0.01)
+            yield frame
+
+    async def main():
+        async with AsyncWindow(terminal=terminal, interval=0.005) as window:
+            loading, counter = AsyncEvent(frames(), length=3), Counter()
+            await window.send_text("load ", loading, " n", counter)
+            await asyncio.sleep(0.15)
+            assert threading.active_count() == threads  # Timers and tasks on the loop, no threads
+            assert not window.event_tasks  # The generator ran out
+        assert not window.step_handles and window.render_task is None
+        return counter.steps
+
+    steps = asyncio.run(main())
+    assert steps >= 3
+    assert terminal.line(1) == f"load ccc n{min(steps, 99):>2}"
+
+
+def test_a_coroutine_sets_the_frame_itself():
+    terminal = VirtualTerminal(20, 2)
+
+    async def countdown(event):
+        for n in (3, 2, 1):
+            event.set_frame(f"{n}...")  # Longer than the event, gets cut
+            await asyncio.sleep(0.01)
+        event.set_frame("go")
+
+    async def main():
+        window = AsyncWindow(terminal=terminal, interval=0.005)
+        await window.start()
+        await window.send_text(AsyncEvent(countdown, length=3))
+        await asyncio.sleep(0.1)
+        await window.stop()
+        window.windowTick()
+
+    asyncio.run(main())
+    assert terminal.line(1) == "go"
@@ -0,0 +1,55 @@
+import pytest
+
+from limmer import animation
+from limmer.animation import Animation, get_animation
+from limmer.basics import Window
+from limmer.events import SpinningEvent, AnimatedEvent
+from limmer.vterm import VirtualTerminal
+
+
+@pytest.fixture
+def clock():
+    now = [0.0]
+    animation.set_clock(lambda: now[0])
+    yield now
+    animation.set_clock(__import__("time").monotonic)
+
+
+def test_frames_and_sequences_are_compiled_once():
+    spinner = Animation(["a", "bb", "日"], interval=0.5)
+    assert spinner.length == 2
+    assert spinner.frames == ("a ", "bb", "日")  # Padded to the widest, in columns
+    assert spinner.sequences == ("a \b\b", "bb\b\b", "日\b\b")  # Each one moves back over itself
+    assert Animation(["x" * 5]).sequences == ("xxxxx\x1b[5D",)  # Whichever move back is shorter
+    assert Animation(["long"], length=2).frames == ("lo",)
+    with pytest.raises(ValueError):
+        Animation([])
+    with pytest.raises(ValueError):
+        Animation(["a"], interval=0)
+
+
+def test_equal_animations_are_shared():
+    assert get_animation("ab", 0.2) is get_animation(["a", "b"], 0.2)
+    assert get_animation("ab", 0.2) is not get_animation("ab", 0.3)
+    assert SpinningEvent().animation is SpinningEvent().animation
+
+
+def test_the_frame_only_depends_on_the_clock(clock):
+    dots = get_animation([".", "..", "..."], interval=0.1)
+    assert [dots.index_at(t) for t in (0.0, 0.05, 0.15, 0.25, 0.35)] == [0, 0, 1, 2, 0]
+    clock[0] = 0.15
+    assert dots.frame_at() == ".. "
+    first, second = AnimatedEvent(animation=dots), AnimatedEvent(animation=dots)
+    first.step()
+    second.step()
+    assert first.frame == second.frame == ".. "  # No state of their own, they run in lockstep
+
+
+def test_a_window_tick_shows_every_event_at_the_same_moment(clock):
+    terminal = VirtualTerminal(20, 2)
+    window = Window(terminal=terminal)
+    window.sendText(SpinningEvent(), " ", SpinningEvent(), " ", SpinningEvent())
+    for now, frame in ((0.15, "|"), (0.25, "/"), (0.39, "-"), (0.45, "\\")):
+        clock[0] = now
+        window.windowTick()
+        assert terminal.line(1) == " ".join([frame] * 3)
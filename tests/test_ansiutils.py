@@ -0,0 +1,65 @@
+import os
+import threading
+
+import pytest
+
+from limmer import ANSIUtils
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs a pty")
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    master, slave = os.openpty()
+    backend = ANSIUtils._PosixBackend()
+    backend.fd = slave
+    monkeypatch.setattr(ANSIUtils, "_backend", backend)
+    ANSIUtils.invalidate_cache()
+    yield master
+    ANSIUtils.invalidate_cache()
+    os.close(master)
+    os.close(slave)
+
+
+def answer(terminal, reply: bytes):
+    """Writes reply once the query arrived, like the terminal. Anything already there gets drained first"""
+    def respond():
+        os.read(terminal, 1024)
+        os.write(terminal, reply)
+    threading.Thread(target=respond, daemon=True).start()
+
+
+def test_cursor_position_without_device_attributes(terminal):
+    answer(terminal, b"\x1b[5;7R")  # Answers the position but never the attributes
+    assert ANSIUtils.query_cursor_position(timeout=0.05) == (5, 7)
+
+
+def test_both_answers(terminal):
+    answer(terminal, b"\x1b[3;4R\x1b[?62;22c")
+    assert ANSIUtils.query_terminal("cursor", "attributes", timeout=1) == {"cursor": (3, 4), "attributes": (62, 22)}
+
+
+def test_no_answer_at_all(terminal):
+    with pytest.raises(TimeoutError):
+        ANSIUtils.query_cursor_position(timeout=0.05)
+
+
+def test_size_follows_a_resize(terminal):
+    answer(terminal, b"\x1b[8;24;80t\x1b[?62c")
+    assert ANSIUtils.query_terminal_size(timeout=1) == (24, 80)
+    answer(terminal, b"\x1b[8;30;100t\x1b[?62c")
+    assert ANSIUtils.query_terminal_size(timeout=1) == (30, 100)
+
+
+def test_late_answers_to_an_earlier_query_are_ignored(terminal):
+    with pytest.raises(TimeoutError):
+        ANSIUtils.query_cursor_position(timeout=0.05)
+    os.read(terminal, 1024)  # The request that timed out
+    os.write(terminal, b"\x1b[1;1R\x1b[?62c")  # Its answer, too late
+    answer(terminal, b"\x1b[5;7R\x1b[?62c")
+    assert ANSIUtils.query_cursor_position(timeout=1) == (5, 7)
+
+
+def test_the_last_answer_counts(terminal):
+    answer(terminal, b"\x1b[1;1R\x1b[5;7R\x1b[?62c")  # One still on its way from before, then ours
+    assert ANSIUtils.query_cursor_position(timeout=1) == (5, 7)
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from limmer.basics import Cursor
+from limmer.buffer import CellBuffer
+from limmer.styles import RESET, apply_sgr
+
+
+def make_cursor(x, y, **attributes):
+    cursor = Cursor([80, 24], [x, y], output=io.StringIO())
+    for name, value in attributes.items():
+        setattr(cursor, name, value)
+    return cursor
+
+
+@pytest.mark.parametrize("start, target, sequence", [
+    ((10, 5), (10, 5), ""),  # Already there
+    ((1, 1), (10, 1), "\x1b[9C"),
+    ((10, 5), (12, 5), "\x1b[2C"),
+    ((10, 5), (1, 5), "\r"),
+    ((10, 5), (8, 5), "\b\b"),
+    ((10, 5), (2, 5), "\x1b[8D"),
+    ((10, 5), (1, 6), "\n"),
+    ((10, 5), (3, 6), "\n\x1b[2C"),
+    ((10, 5), (10, 4), "\x1b[A"),
+    ((10, 5), (3, 20), "\x1b[20;3H"),  # Shorter than \x1b[15B\x1b[7D
+    ((10, 5), (1, 1), "\x1b[H"),
+])
+def test_go_to_takes_the_fewest_bytes(start, target, sequence):
+    cursor = make_cursor(*start)
+    cursor.go_to(*target)
+    assert cursor.current_command == sequence
+    assert cursor.position == list(target)
+
+
+def test_overprinting_known_cells():
+    screen = CellBuffer(80, 24)
+    screen.put_text(1, 1, "abcdef")
+    cursor = make_cursor(1, 1, screen=screen, style=RESET)
+    cursor.go_to(3, 1)
+    assert cursor.current_command == "ab"  # Two bytes instead of \x1b[2C
+
+    # Printing them would change their look, so that's out
+    cursor = make_cursor(1, 1, screen=screen, style=apply_sgr(RESET, ["1"]))
+    cursor.go_to(3, 1)
+    assert cursor.current_command == "\x1b[2C"
+
+    screen.put_text(1, 2, "a日b")
+    cursor = make_cursor(1, 2, screen=screen, style=RESET)
+    cursor.go_to(3, 2)  # Would stop in the middle of 日
+    assert cursor.current_command == "\x1b[2C"
+
+
+def test_a_pending_wrap_needs_a_real_move():
+    cursor = make_cursor(80, 1, wrap_pending=True)
+    cursor.go_to(80, 1)
+    assert cursor.current_command == "\r\x1b[79C"
+    assert not cursor.wrap_pending
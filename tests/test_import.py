@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code: str) -> subprocess.CompletedProcess:
+    # A fresh interpreter, in this one the other tests already imported everything
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+
+
+def test_importing_limmer_loads_only_the_styles_and_prints_nothing():
+    result = run("import sys, io\n"
+                 "stdout, sys.stdout = sys.stdout, io.StringIO()\n"
+                 "import limmer\n"
+                 "written, sys.stdout = sys.stdout.getvalue(), stdout\n"
+                 "import json\n"
+                 "print(json.dumps([written, sorted(m for m in sys.modules if m.split('.')[0] == 'limmer')]))")
+    assert result.returncode == 0 and result.stderr == ""
+    written, modules = json.loads(result.stdout)
+    assert written == ""
+    assert modules == ["limmer", "limmer.styles"]
+
+
+def test_names_load_their_module_on_first_use():
+    result = run("import sys, limmer\n"
+                 "assert 'limmer.vterm' not in sys.modules\n"
+                 "terminal = limmer.VirtualTerminal(4, 2)\n"
+                 "assert 'limmer.vterm' in sys.modules and 'limmer.basics' not in sys.modules\n"
+                 "assert limmer.vterm.VirtualTerminal is limmer.VirtualTerminal\n"
+                 "assert limmer.Color.RED is limmer.styles.Color.RED\n"
+                 "try:\n"
+                 "    limmer.nothing\n"
+                 "except AttributeError:\n"
+                 "    print('ok')\n")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "ok\n"
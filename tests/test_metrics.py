@@ -0,0 +1,74 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from limmer import animation, metrics
+from limmer.basics import Window
+from limmer.events import SpinningEvent
+from limmer.metrics import RenderMetrics
+from limmer.vterm import VirtualTerminal
+
+
+def run_frames(render_metrics, monkeypatch, durations, budget=None):
+    """Runs one frame per duration against a fake clock, the cursor writes 10 bytes in each"""
+    now = [0.0]
+    monkeypatch.setattr(metrics, "time", SimpleNamespace(perf_counter=lambda: now[0]))
+    cursor = SimpleNamespace(bytes_written=0, writes=0, sequences=0, dsr_queries=0)
+    for duration in durations:
+        with render_metrics.frame(cursor, budget=budget):
+            now[0] += duration
+            cursor.bytes_written += 10
+            cursor.writes += 1
+
+
+def test_recent_is_oldest_first_once_the_ring_wraps(monkeypatch):
+    render_metrics = RenderMetrics(history=3)
+    run_frames(render_metrics, monkeypatch, [1.0, 2.0])
+    assert render_metrics.recent() == [1.0, 2.0]
+    run_frames(render_metrics, monkeypatch, [3.0, 4.0, 5.0])
+    assert render_metrics.recent() == [3.0, 4.0, 5.0]
+    assert render_metrics.frames == 5
+    assert render_metrics.max_duration == 5.0
+    assert render_metrics.bytes_written == 50 and render_metrics.writes == 5
+
+
+def test_late_frames(monkeypatch):
+    render_metrics = RenderMetrics()
+    run_frames(render_metrics, monkeypatch, [0.01, 0.2, 0.05, 0.3], budget=0.1)
+    assert render_metrics.late_frames == 2
+    assert render_metrics.summary()["late_frames"] == 2
+
+
+def test_hooks_see_every_frame(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(animation, "clock", lambda: now[0])
+    window = Window(terminal=VirtualTerminal(20, 4))
+    window.sendText("busy ", SpinningEvent())
+    now[0] = 0.1  # The spinner has a new frame to draw
+    seen, entered = [], []
+
+    @contextmanager
+    def around_frame():
+        entered.append("enter")
+        yield
+        entered.append("exit")
+    window.metrics.add_hook(seen.append)
+    window.metrics.add_context_hook(around_frame)
+    window.windowTick()
+    assert len(seen) == 1 and entered == ["enter", "exit"]
+    assert seen[0].events == 1
+    assert seen[0].bytes_written > 0 and seen[0].writes == 1
+
+    window.metrics.remove_hook(seen.append)
+    window.metrics.remove_context_hook(around_frame)
+    window.windowTick()
+    assert len(seen) == 1 and len(entered) == 2
+    assert window.metrics.frames == 2
+
+
+def test_max_fps_skips_frames():
+    window = Window(terminal=VirtualTerminal(20, 4), max_fps=0.01)  # One frame every 100 seconds
+    window.windowTick()
+    window.windowTick()
+    window.windowTick()
+    assert window.metrics.frames == 1
+    assert window.metrics.skipped_frames == 2
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from limmer import positions
+from limmer.buffer import CellBuffer
+from limmer.positions import PositionStore
+
+
+def test_handles_survive_removals():
+    store = PositionStore()
+    handles = {name: store.add(name, i + 1, i + 1) for i, name in enumerate("abcde")}
+    store.remove(handles["b"])
+    store.remove(handles["a"])
+    assert len(store) == 3
+    assert sorted(owner for _, owner in store.items()) == ["c", "d", "e"]
+    for name in "cde":
+        assert store.get(handles[name]) == [ord(name) - 96, ord(name) - 96]
+    assert store.add("f", 9, 9) in (handles["a"], handles["b"])  # Freed handles get reused
+    assert len(store.xs) == len(store.owners) == 4  # Only live slots
+
+
+@pytest.mark.parametrize("vectorize_from", [1, 10 ** 9])
+def test_shift_rows(monkeypatch, vectorize_from):
+    if vectorize_from == 1 and positions.numpy is None:
+        pytest.skip("numpy isn't installed")
+    monkeypatch.setattr(positions, "_VECTORIZE_FROM", vectorize_from)
+    store = PositionStore()
+    handles = [store.add(y, 1, y) for y in range(1, 11)]
+    gone = store.shift_rows(3, 8, 2)
+    assert sorted(gone) == [3, 4]  # Leave the region at its top
+    assert [store.get(handle)[1] for handle in handles] == [1, 2, 3, 4, 3, 4, 5, 6, 9, 10]
+    assert store.shift_rows(1, 10, 0) == []
+
+
+def test_same_result_with_and_without_numpy(monkeypatch):
+    if positions.numpy is None:
+        pytest.skip("numpy isn't installed")
+    random.seed(4)
+    ys = [random.randint(1, 40) for _ in range(500)]
+    results = []
+    for vectorize_from in (1, 10 ** 9):
+        monkeypatch.setattr(positions, "_VECTORIZE_FROM", vectorize_from)
+        store = PositionStore()
+        for i, y in enumerate(ys):
+            store.add(i, 1, y)
+        gone = store.shift_rows(5, 30, 7, last=35)
+        results.append((sorted(gone), list(store.ys)))
+    assert results[0] == results[1]
+
+
+def test_remap_with_and_without_numpy(monkeypatch):
+    if positions.numpy is None:
+        pytest.skip("numpy isn't installed")
+    random.seed(8)
+    buffer = CellBuffer(30, 12)
+    buffer.put_text(1, 1, "".join(random.choice(["word ", "日本 ", "\n", "long" * 4]) for _ in range(60)))
+    points = [(random.randint(1, 31), random.randint(-2, 14)) for _ in range(400)]
+    _, reflow = buffer.resize(17, 8, keep=(5, 12))
+    results = []
+    for vectorize_from in (1, 10 ** 9):
+        monkeypatch.setattr(positions, "_VECTORIZE_FROM", vectorize_from)
+        store = PositionStore()
+        for i, (x, y) in enumerate(points):
+            store.add(i, x, y)
+        gone = store.remap(reflow)
+        results.append((sorted(gone), list(store.xs), list(store.ys)))
+    assert results[0] == results[1]
+    assert results[0][0]  # Some went off the top
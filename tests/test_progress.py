@@ -0,0 +1,112 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from limmer import progress
+from limmer.progress import SharedCounters, ProgressBar, CounterEvent, advance
+
+
+def run_threads(count: int, target, sequential: bool = False):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+        if sequential:
+            thread.join()
+    for thread in threads:
+        thread.join()
+
+
+def test_threads_get_their_own_slots():
+    counters = SharedCounters(slots=8, fields=2)
+    all_added = threading.Barrier(4)
+
+    def work():
+        for _ in range(1000):
+            counters.add()
+            counters.add(2, field=1)
+        all_added.wait()  # All running at once, a finished one would hand its slot to the next
+    run_threads(4, work)
+    assert counters.totals() == [4000, 8000]
+    assert counters.claimed.value == 5  # Slot 0 plus one per thread
+    assert counters.values[0:2] == [0, 0]  # Nobody needed the shared one
+
+
+def test_writers_past_the_last_slot_share_slot_zero():
+    counters = SharedCounters(slots=2)  # Slot 0 and exactly one of its own
+    all_added = threading.Barrier(3)
+
+    def work():
+        for _ in range(500):
+            counters.add()
+        all_added.wait()  # Nobody ends (and gives a slot back) before everyone has one
+    with pytest.warns(RuntimeWarning, match="slots"):
+        run_threads(3, work)
+    assert counters.value() == 1500
+    assert sorted(counters.values) == [500, 1000]  # One of them got slot 1
+
+
+def test_slots_of_finished_writers_get_reused():
+    counters = SharedCounters(slots=2)
+
+    def work():
+        for _ in range(500):
+            counters.add()
+    run_threads(3, work, sequential=True)  # Each one ends before the next starts
+    assert counters.value() == 1500
+    assert list(counters.values) == [0, 1500]
+
+    counters.add()
+    assert counters._slot() == 1
+    counters.release()
+    assert counters.free_count.value == 1
+    counters.add()  # Claims it again
+    assert counters.free_count.value == 0 and list(counters.values) == [0, 1502]
+
+
+def test_pool_processes_add_up():
+    counters = SharedCounters()
+    with ProcessPoolExecutor(max_workers=3, initializer=counters.install) as pool:
+        list(pool.map(advance, [10] * 100))
+    assert counters.value() == 1000
+    assert counters.claimed.value > 1
+
+
+def test_advance_needs_install(monkeypatch):
+    monkeypatch.setattr(progress, "_installed", None)
+    with pytest.raises(RuntimeError):
+        advance()
+    counters = SharedCounters()
+    counters.install()
+    advance(3)
+    assert counters.value() == 3
+
+
+def test_progress_bar_text_and_eta():
+    counters = SharedCounters()
+    bar = ProgressBar(counters, total=1000)
+    bar.step(0.0)
+    assert bar.frame == "[>                 ]   0% 0/s -:--      "  # No rate yet, no ETA
+    counters.add(250)
+    bar.step(1.0)
+    assert bar.eta == 3.0
+    assert bar.frame == "[====>             ]  25% 250/s 0:03    "
+    counters.add(750)
+    bar.step(2.0)
+    assert bar.finished
+    assert bar.frame == "[==================] 100% 500/s         "
+
+
+def test_counter_rate_over_the_window():
+    counters = SharedCounters()
+    event = CounterEvent(counters, rate_window=5.0)
+    counters.add(1500)
+    event.step(0.0)
+    assert event.frame == "1.5k 0/s        "
+    counters.add(2000)
+    event.step(2.0)
+    assert event.frame == "3.5k 1.0k/s     "
+    counters.add(800)
+    event.step(10.0)  # The sample at 0 is older than the window now
+    assert event.frame == "4.3k 100/s      "
+    assert event.eta is None  # No total
@@ -0,0 +1,418 @@
+"""Renders through Window(terminal=VirtualTerminal) and checks the buffers and the simulated cursor against it"""
+import pytest
+
+from limmer import animation
+from limmer.basics import Window
+from limmer.buffer import CellBuffer
+from limmer.events import SpinningEvent, PointingsEvent
+from limmer.scrollback import Scrollback
+from limmer.styles import Color, InlineStyle, Formatting, RESET, apply_sgr
+from limmer.vterm import VirtualTerminal
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock():
+    now = [0.0]
+    animation.set_clock(lambda: now[0])
+    yield now
+    animation.set_clock(__import__("time").monotonic)
+
+
+def make_window(width=20, height=6, **kwargs):
+    terminal = VirtualTerminal(width, height)
+    return Window(terminal=terminal, **kwargs), terminal
+
+
+def assert_in_sync(window, terminal):
+    for buffer in (window.front_buffer, window.back_buffer):
+        for y in range(1, terminal.height + 1):
+            for x in range(1, terminal.width + 1):
+                assert buffer.get(x, y) == terminal.cell(x, y), (x, y, buffer.row_text(y), terminal.line(y))
+    assert window.cursor.position == [terminal.x, terminal.y]
+    assert window.cursor.wrap_pending == terminal.wrap_pending
+    assert not window.cursor.drifted
+
+
+def test_plain_text_and_newlines():
+    window, terminal = make_window()
+    terminal.reset_counters()
+    window.sendText("hello\n", "world")
+    assert terminal.lines()[:2] == ["hello", "world"]
+    assert_in_sync(window, terminal)
+    assert terminal.dsr_queries == 0  # The cursor is simulated, no need to ask the terminal
+
+
+def test_styles_inside_the_text_are_not_stored_as_cells():
+    window, terminal = make_window(30)
+    window.sendText(f"{Color.RED}error{Color.CLEAR} ok\n", "\x1b[1mbold\x1b[0m plain\n")
+    assert terminal.lines()[:2] == ["error ok", "bold plain"]
+    assert_in_sync(window, terminal)
+    window.redraw_interface()  # Repaints everything from the back buffer
+    assert terminal.lines()[:2] == ["error ok", "bold plain"]
+    assert terminal.cell(1, 1)[1] != RESET and terminal.cell(1, 2)[1] != RESET
+    assert terminal.cell(7, 1)[1] == apply_sgr(RESET, ["0", "40"])  # Color.CLEAR keeps a black background
+    assert terminal.cell(6, 2)[1] == RESET
+    assert_in_sync(window, terminal)
+
+
+def test_moves_and_erasing_inside_the_text():
+    window, terminal = make_window()
+    window.sendText("abcdef\x1b[3Dxy\n", "gone\x1b[2K\rnew\tT\n", "q\x1b[1;10HZ\x1b[4;1H")
+    assert terminal.lines()[:3] == ["abcxyf   Z", "new     T", "q"]
+    assert_in_sync(window, terminal)
+
+
+def test_styled_stacking_with_attrs():
+    window, terminal = make_window()
+    window.sendText(Color.RED, "red ", Formatting.BOLD, "bold", InlineStyle.CLEAR, " plain\n")
+    assert_in_sync(window, terminal)
+
+
+def test_pending_wrap_on_the_last_row_scrolls():
+    window, terminal = make_window(10, 3)
+    window.sendText("1\n2\n")
+    window.sendText("x" * 10)
+    window.sendText("abc")
+    assert terminal.lines() == ["2", "x" * 10, "abc"]
+    assert_in_sync(window, terminal)
+
+
+def test_backspace_with_a_pending_wrap():
+    window, terminal = make_window(10, 4)
+    window.sendText("x" * 10, "\bY")
+    assert terminal.line(1) == "xxxxxxxxYx"
+    assert_in_sync(window, terminal)
+
+
+def test_pending_wrap_survives_a_frame():
+    window, terminal = make_window(10, 3)
+    window.sendText(SpinningEvent(), "\n", "y" * 10)
+    window.windowTick()
+    window.sendText("Q")
+    assert terminal.lines() == ["\\", "y" * 10, "Q"]
+    assert_in_sync(window, terminal)
+
+
+def test_event_added_while_a_wrap_is_pending_on_the_last_row(frozen_clock):
+    window, terminal = make_window(10, 3)
+    event = SpinningEvent()
+    window.sendText("1\n2\n", "x" * 10, event, " z")
+    assert event.position == [1, 3]
+    frozen_clock[0] = 0.15
+    window.windowTick()
+    assert terminal.line(3) == "| z"
+    assert_in_sync(window, terminal)
+
+
+def test_events_scroll_with_the_text(frozen_clock):
+    window, terminal = make_window(20, 4)
+    first, second = SpinningEvent(), PointingsEvent()
+    window.sendText("a ", first, "\n", "b ", second, "\n", "c\n")
+    window.sendText("d\n")  # The first row scrolls off
+    assert first.store is None
+    assert second.position == [3, 1]
+    for tick in range(1, 4):
+        frozen_clock[0] = tick * 0.1
+        window.windowTick()
+        assert_in_sync(window, terminal)
+    assert terminal.lines()[:3] == ["b ...", "c", "d"]
+
+
+def test_scrollback_gets_the_rows_that_scroll_off():
+    scrollback = Scrollback()
+    window, terminal = make_window(20, 3, scrollback=scrollback)
+    window.sendText(Color.RED, "red", InlineStyle.CLEAR, "\n", "two\nthree\nfour\n")
+    assert len(scrollback) == 2
+    assert scrollback[0].startswith("\x1b[") and "red" in scrollback[0] and "[0;" not in scrollback[0][3:]
+    assert scrollback[1] == "two"
+
+
+def test_scrollback_gets_the_rows_scroll_region_and_resize_push_off():
+    scrollback = Scrollback()
+    window, terminal = make_window(20, 6, scrollback=scrollback)
+    window.sendText("1\n2\n3\n4\n5")
+    window.scroll_region(1, 6, 2)
+    window.scroll_region(1, 2, 5)  # Cleared instead of scrolled, still gone from the screen
+    window.scroll_region(2, 6, 1)  # Not the top of the screen, nothing leaves it
+    assert list(scrollback) == ["1", "2", "3", "4"]
+    window.cursor.go_to(1, 6)
+    window.sendText("6")
+    terminal.resize(20, 4)
+    window.windowTick()
+    assert list(scrollback) == ["1", "2", "3", "4", "", "5"]
+    assert terminal.lines() == ["", "", "", "6"]
+    assert_in_sync(window, terminal)
+
+
+def test_height_shrink_moves_events(frozen_clock):
+    window, terminal = make_window(20, 6)
+    events = [SpinningEvent(), SpinningEvent()]
+    window.sendText("one ", events[0], "\n", "two\n", "three ", events[1], "\n", "four\n", "five\n", "last")
+    terminal.resize(20, 4)
+    window.windowTick()
+    assert events[0].store is None  # Rows "one" and "two" are gone
+    assert events[1].position == [7, 1]
+    assert terminal.lines() == ["three \\", "four", "five", "last"]
+    assert_in_sync(window, terminal)
+
+
+def test_height_shrink_drops_blank_rows_first():
+    window, terminal = make_window(20, 6)
+    window.sendText("one\n", "two")
+    terminal.resize(20, 3)
+    window.windowTick()
+    assert terminal.lines() == ["one", "two", ""]
+    window.sendText("!")
+    assert terminal.line(2) == "two!"
+    assert_in_sync(window, terminal)
+
+
+def test_width_change_rewraps_each_line(frozen_clock):
+    window, terminal = make_window(20, 6)
+    event = SpinningEvent()
+    window.sendText("status ", event, "\n", "second line\n", "third")
+    terminal.resize(12, 6)
+    window.windowTick()
+    assert terminal.lines()[:3] == ["status \\", "second line", "third"]
+    assert_in_sync(window, terminal)
+    terminal.resize(30, 6)
+    window.windowTick()
+    assert terminal.lines()[:3] == ["status \\", "second line", "third"]
+    window.sendText(" more")
+    assert terminal.line(3) == "third more"
+    assert event.position == [8, 1]
+    assert_in_sync(window, terminal)
+
+
+def test_wrapped_lines_rewrap(frozen_clock):
+    window, terminal = make_window(20, 6)
+    event = SpinningEvent()
+    window.sendText("a line that wraps around ", event, " the edge\n", "short")
+    assert terminal.lines()[:3] == ["a line that wraps ar", "ound \\ the edge", "short"]
+    terminal.resize(12, 6)
+    window.windowTick()
+    assert terminal.lines()[:4] == ["a line that", "wraps around", " \\ the edge", "short"]
+    assert event.position == [2, 3]
+    frozen_clock[0] = 0.1
+    window.windowTick()
+    assert_in_sync(window, terminal)
+    terminal.resize(40, 6)
+    window.windowTick()
+    assert terminal.lines()[:2] == ["a line that wraps around | the edge", "short"]
+    assert event.position == [26, 1]
+    assert_in_sync(window, terminal)
+
+
+def test_pending_wrap_continues_after_a_resize():
+    window, terminal = make_window(10, 4)
+    window.sendText("x" * 10)
+    terminal.resize(20, 4)
+    window.windowTick()
+    window.sendText("Y")
+    assert terminal.line(1) == "x" * 10 + "Y"
+    assert_in_sync(window, terminal)
+
+
+def test_wide_characters_rewrap():
+    window, terminal = make_window(20, 4)
+    window.sendText("日本語テキスト日本語テキ", "xyz")
+    terminal.resize(9, 4)
+    window.windowTick()
+    assert terminal.lines() == ["日本語テ", "キスト日", "本語テキx", "yz"]
+    assert_in_sync(window, terminal)
+    terminal.resize(30, 4)
+    window.windowTick()
+    assert terminal.line(1) == "日本語テキスト日本語テキxyz"
+    assert_in_sync(window, terminal)
+
+
+def test_log_pane_scrolls_only_its_rows():
+    window, terminal = make_window(30, 10)
+    window.sendText("status: ", SpinningEvent(), "\n")
+    pane = window.add_pane(3, 6)
+    window.cursor.go_to(1, 9)
+    window.sendText("footer")
+    for i in range(10):
+        terminal.reset_counters()
+        pane.write(f"log {i}")
+        assert_in_sync(window, terminal)
+    assert terminal.bytes_written < 40  # A scroll and one row, no repaint
+    assert terminal.lines()[:6] == ["status: \\", "", "log 6", "log 7", "log 8", "log 9"]
+    assert terminal.line(9) == "footer"
+
+
+def test_a_pane_follows_its_rows_when_the_window_shrinks():
+    window, terminal = make_window(20, 6)
+    pane = window.add_pane(4, 6)
+    pane.write("one")
+    pane.write("two")
+    terminal.resize(20, 3)  # The rows above the pane go off the top
+    window.windowTick()
+    assert (pane.top, pane.next_row) == (2, 4)
+    pane.write("three")
+    assert terminal.lines() == ["", "two", "three"]
+    assert_in_sync(window, terminal)
+
+
+def test_a_full_pane_keeps_its_text_when_its_top_goes_off_the_screen():
+    window, terminal = make_window(20, 6)
+    pane = window.add_pane(2, 6)
+    for line in "abcde":
+        pane.write(line)
+    terminal.resize(20, 4)
+    window.windowTick()
+    assert terminal.lines() == ["b", "c", "d", "e"]
+    pane.write("f")
+    assert terminal.lines() == ["c", "d", "e", "f"]
+    assert_in_sync(window, terminal)
+
+
+def test_a_pane_that_goes_off_the_screen_is_detached():
+    window, terminal = make_window(20, 6)
+    pane = window.add_pane(2, 3)
+    pane.write("a")
+    window.cursor.go_to(1, 6)
+    window.sendText("bottom")
+    terminal.resize(20, 2)
+    window.windowTick()
+    assert pane.detached and pane not in window.panes
+    with pytest.raises(RuntimeError):
+        pane.write("b")
+
+
+def test_scroll_region_down_and_whole_screen():
+    window, terminal = make_window(20, 6)
+    window.sendText("1\n2\n3\n4\n5")
+    window.scroll_region(2, 4, -1)
+    assert_in_sync(window, terminal)
+    window.scroll_region(1, 6, 2)
+    assert_in_sync(window, terminal)
+    assert terminal.lines()[:4] == ["2", "3", "5", ""]
+
+
+def test_scrolling_a_whole_region_away_shows_at_once():
+    window, terminal = make_window(20, 6)
+    window.sendText("1\n2\n3\n4\n5")
+    window.scroll_region(2, 3, 5)  # More than the region holds, it's cleared instead of scrolled
+    assert terminal.lines()[:5] == ["1", "", "", "4", "5"]
+    window.scroll_region(4, 4, -1)  # A single row as well
+    assert terminal.lines()[:5] == ["1", "", "", "", "5"]
+    assert_in_sync(window, terminal)
+
+
+def test_wide_characters():
+    window, terminal = make_window(10, 3)
+    window.sendText("日本語テキスト\n", "ab👍c")
+    assert_in_sync(window, terminal)
+
+
+def test_overwriting_half_a_wide_character_blanks_the_other_half():
+    buffer = CellBuffer(6, 2)
+    buffer.put_text(1, 1, "語語")
+    buffer.put_text(2, 1, "x")  # Right half of the first one
+    assert buffer.row_text(1) == " x語  "
+    buffer.put_text(3, 1, "yz")  # Left half of the second one, through the ASCII path
+    assert buffer.row_text(1) == " xyz  "
+
+    buffer.put_text(1, 2, "a語b")
+    buffer.put_line(1, 2, "日")  # Takes the 'a' and the left half of 語
+    assert buffer.row_text(2) == "日 b  "  # The right half of 日 reads as ""
+    buffer.put_text(2, 2, "本")  # Right half of 日, left half of what's blank now
+    assert buffer.row_text(2) == " 本b  "
+    buffer.put_text(3, 2, "\x1b[K")  # Erasing from the right half
+    assert buffer.row_text(2) == "      "
+
+
+def test_overwriting_wide_characters_stays_in_sync():
+    window, terminal = make_window(6, 3)
+    window.sendText("語語\n", "日本日")
+    window.cursor.go_to(2, 1)
+    window.sendText("x")
+    window.cursor.go_to(3, 2)
+    window.sendText("👍")
+    assert terminal.lines() == [" x語", "日👍日", ""]
+    assert_in_sync(window, terminal)
+    terminal.resize(4, 3)
+    window.windowTick()
+    assert_in_sync(window, terminal)
+
+
+def test_synchronized_frames():
+    window, terminal = make_window(synchronized_output=True)
+    window.sendText(SpinningEvent())
+    window.redraw_interface()
+    window.windowTick()
+    assert not terminal.synchronized
+    assert_in_sync(window, terminal)
+
+
+def test_event_ending_in_the_last_column(frozen_clock):
+    window, terminal = make_window(10, 3)
+    window.sendText("abcdefg", PointingsEvent())
+    for tick in range(1, 5):
+        frozen_clock[0] = tick * 0.1
+        window.windowTick()
+        assert_in_sync(window, terminal)
+    window.sendText("Z")
+    assert terminal.lines()[:2] == ["abcdefg", "Z"]
+    assert_in_sync(window, terminal)
+
+
+class SilentTerminal(VirtualTerminal):
+    def query_cursor_position(self):
+        self.dsr_queries += 1
+        raise TimeoutError("The terminal didn't answer")
+
+
+def test_unanswered_queries_are_not_repeated_on_every_write():
+    terminal = SilentTerminal(20, 6)
+    window = Window(terminal=terminal, position=[1, 1])
+    terminal.reset_counters()
+    for i in range(10):
+        window.sendText(f"\x1b]0;title {i}\x07", "x")  # OSC, the cursor can't follow it
+    assert terminal.dsr_queries == 1
+    assert window.cursor.drifted
+    window.cursor.resync()  # Asking explicitly still does
+    assert terminal.dsr_queries == 2
+    terminal.resize(10, 6)
+    window.windowTick()  # So does a resize
+    assert terminal.dsr_queries == 3
+
+
+def test_a_pane_takes_over_the_events_in_its_rows(frozen_clock):
+    window, terminal = make_window(20, 6)
+    inside, outside = SpinningEvent(), SpinningEvent()
+    window.sendText("top ", outside, "\n", inside, "\n")
+    pane = window.add_pane(2, 4)
+    assert inside.store is None
+    pane.write("log 0")
+    frozen_clock[0] = 0.1
+    window.windowTick()
+    assert terminal.lines()[:2] == ["top |", "log 0"]
+    assert_in_sync(window, terminal)
+
+
+def test_an_explicit_output_doesnt_ask_the_tty(monkeypatch):
+    import io
+    from limmer import basics
+
+    def no_tty():
+        raise AssertionError("asked the tty")
+    monkeypatch.setattr(basics, "query_cursor_position", no_tty)
+    output = io.StringIO()
+    window = Window(output=output, size=(20, 5))
+    assert window.cursor.position == [1, 1] and window.cursor.drifted
+    window.sendText("hello\n", "\x1b]0;title\x07", "world")  # Not even after something it can't follow
+    assert "hello" in output.getvalue() and "world" in output.getvalue()
+
+
+def test_a_terminal_reporting_0x0(monkeypatch):
+    import io
+
+    monkeypatch.setattr(Window, "get_terminal_size", staticmethod(lambda: [0, 0]))  # Fresh ptys do that
+    output = io.StringIO()
+    window = Window(output=output)
+    assert window.max_position == [1, 1]
+    window.sendText("hello\n", SpinningEvent())
+    window.windowTick()
+    assert "hello" in output.getvalue()
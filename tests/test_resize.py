@@ -0,0 +1,79 @@
+import io
+import os
+import signal
+import threading
+
+import pytest
+
+from limmer import basics
+from limmer.basics import Window
+from limmer.resize import ResizeMonitor
+
+needs_sigwinch = pytest.mark.skipif(not hasattr(signal, "SIGWINCH"), reason="needs SIGWINCH")
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monitor = ResizeMonitor()
+    monkeypatch.setattr(basics, "get_resize_monitor", lambda: monitor)
+    yield monitor
+    monitor.uninstall()
+
+
+@pytest.fixture
+def size(monkeypatch):
+    size = [40, 10]
+    monkeypatch.setattr(Window, "get_terminal_size", staticmethod(lambda: list(size)))
+
+    def no_answer():
+        raise TimeoutError  # A resize resyncs the cursor, that mustn't go to whatever tty runs the tests
+    monkeypatch.setattr(basics, "query_cursor_position", no_answer)
+    return size
+
+
+@needs_sigwinch
+def test_sigwinch_is_counted_and_passed_on(monitor):
+    seen = []
+    previous = signal.signal(signal.SIGWINCH, lambda signum, frame: seen.append(signum))
+    try:
+        assert monitor.install() and monitor.install()  # Twice is fine
+        os.kill(os.getpid(), signal.SIGWINCH)
+        os.kill(os.getpid(), signal.SIGWINCH)
+        assert monitor.generation == 2
+        assert seen == [signal.SIGWINCH] * 2  # The handler that was there before still runs
+        monitor.uninstall()
+        os.kill(os.getpid(), signal.SIGWINCH)
+        assert monitor.generation == 2 and len(seen) == 3
+    finally:
+        signal.signal(signal.SIGWINCH, previous)
+
+
+def test_no_handler_from_other_threads(monitor):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(monitor.install()))
+    thread.start()
+    thread.join()
+    assert results == [False] and not monitor.installed
+
+
+@needs_sigwinch
+def test_window_only_asks_for_the_size_after_a_sigwinch(monitor, size):
+    window = Window(output=io.StringIO(), position=[1, 1])
+    assert monitor.installed
+    size[:] = [30, 10]
+    window.windowTick()
+    assert window.max_position == [40, 10]  # Nothing told us, so nothing asked
+    os.kill(os.getpid(), signal.SIGWINCH)
+    window.windowTick()
+    assert window.max_position == [30, 10]
+
+
+def test_window_polls_without_sigwinch(monitor, size, monkeypatch):
+    monkeypatch.setattr(monitor, "install", lambda: False)  # Like on Windows
+    window = Window(output=io.StringIO(), position=[1, 1], resize_poll_interval=60)
+    size[:] = [30, 10]
+    window.windowTick()
+    assert window.max_position == [40, 10]  # Polled too recently
+    window.last_resize_poll -= 60
+    window.windowTick()
+    assert window.max_position == [30, 10]
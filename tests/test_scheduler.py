@@ -0,0 +1,38 @@
+import pathlib
+import subprocess
+import sys
+import threading
+
+from limmer.basics import Window
+from limmer.events import SpinningEvent, PointingsEvent
+from limmer.scheduler import Scheduler
+from limmer.vterm import VirtualTerminal
+
+
+def test_jobs_run_when_due():
+    scheduler = Scheduler()
+    ran = threading.Event()
+    job = scheduler.schedule(ran.set, 0.01)
+    assert ran.wait(5)
+    scheduler.cancel(job)
+    scheduler.join(5)
+    assert scheduler._thread is None  # Gone once nothing is scheduled
+
+
+def test_a_running_event_loop_doesnt_keep_the_process_alive():
+    code = "from limmer.events import SpinningEvent; SpinningEvent().startEventLoop()"
+    subprocess.run([sys.executable, "-c", code], timeout=10, check=True, cwd=pathlib.Path(__file__).parents[1])
+
+
+def test_stopping_the_window_stops_its_events():
+    window = Window(terminal=VirtualTerminal(20, 4))
+    scheduler = Scheduler()
+    events = [SpinningEvent(), PointingsEvent()]
+    window.startEventLoop(0.01, scheduler)
+    for event in events:
+        event.startEventLoop(scheduler)
+    window.sendText(events[0], " ", events[1])
+    window.stopEventLoop()
+    assert all(event.loop_job is None and not event.loop_running for event in events)
+    scheduler.join(5)
+    assert scheduler._thread is None
@@ -0,0 +1,69 @@
+import pytest
+
+from limmer.scrollback import Scrollback, _LINE_OVERHEAD
+
+LINES = [f"line {i:02}" for i in range(10)]
+FOUR_LINES = 4 * (len(LINES[0]) + _LINE_OVERHEAD)  # All lines are the same length
+
+
+def test_old_lines_spill_to_the_file_and_read_back():
+    with Scrollback(max_memory=FOUR_LINES) as scrollback:
+        scrollback.extend(LINES[:4])
+        assert scrollback.spilled == 0 and scrollback.file is None  # No file until something spills
+        scrollback.extend(LINES[4:])
+        assert scrollback.spilled == 6 and scrollback.memory <= FOUR_LINES
+        assert len(scrollback) == 10
+        assert scrollback[0] == "line 00" and scrollback[5] == "line 05"  # Out of the file, through the map
+        assert scrollback[6] == "line 06" and scrollback[-1] == "line 09"  # Still in memory
+        assert scrollback.tail(6) == LINES[4:]  # Across both
+        assert list(scrollback) == LINES
+        scrollback.append("")
+        scrollback.append("日本")
+        assert scrollback.spilled == 8 and scrollback.tail(2) == ["", "日本"]
+        assert scrollback[7] == "line 07"  # The file grew past the map, it gets mapped again
+        with pytest.raises(IndexError):
+            scrollback[12]
+
+
+def test_without_spilling_old_lines_are_dropped():
+    scrollback = Scrollback(max_memory=FOUR_LINES, spill=False)
+    scrollback.extend(LINES)
+    assert scrollback.dropped == 6 and scrollback.file is None
+    assert list(scrollback) == LINES[6:]
+
+
+def test_closed_scrollback_refuses_spilled_lines():
+    scrollback = Scrollback(max_memory=FOUR_LINES)
+    scrollback.extend(LINES)
+    scrollback.close()
+    assert scrollback[-1] == "line 09"  # Memory is still there
+    for read in (lambda: scrollback[0], lambda: scrollback.get_bytes(0), lambda: scrollback.tail(10),
+                 lambda: list(scrollback), lambda: scrollback.append("more")):
+        with pytest.raises(ValueError, match="closed"):
+            read()
+    scrollback.clear()
+    scrollback.extend(LINES)
+    assert list(scrollback) == LINES
+    scrollback.close()
+
+
+def test_an_existing_file_is_never_overwritten(tmp_path):
+    path = tmp_path / "scrollback"
+    path.write_bytes(b"keep me")
+    scrollback = Scrollback(max_memory=FOUR_LINES, path=path)
+    with pytest.raises(FileExistsError):
+        scrollback.extend(LINES)
+    assert path.read_bytes() == b"keep me"
+
+
+def test_the_spill_file_is_reused_after_clear(tmp_path):
+    path = tmp_path / "scrollback"
+    with Scrollback(max_memory=FOUR_LINES, path=path) as scrollback:
+        scrollback.extend(LINES)
+        assert list(scrollback) == LINES  # Reading flushes the file
+        assert path.read_bytes() == "".join(LINES[:6]).encode()
+        scrollback.clear()
+        assert len(scrollback) == 0
+        scrollback.extend(LINES[::-1])
+        assert list(scrollback) == LINES[::-1]
+        assert path.read_bytes() == "".join(LINES[:3:-1]).encode()  # Started over along with the index
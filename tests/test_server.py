@@ -0,0 +1,139 @@
+import gc
+import io
+import socket
+import threading
+import time
+
+import pytest
+
+from limmer.basics import _CmdWindow
+from limmer._server import RendererServer
+from limmer._ipc import ATTACH, MSG_ATTACH, MSG_TEXT, encode_frame
+from limmer.styles import RESET, apply_sgr
+
+
+def test_clients_attach_to_a_running_renderer():
+    output = io.StringIO()
+    server = RendererServer("127.0.0.1", 0, output=output)
+    port = server.listener.getsockname()[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    first = _CmdWindow("127.0.0.1", port)
+    second = _CmdWindow("127.0.0.1", port)
+    assert first.process is None and second.process is None  # Nothing got spawned
+    first.write("\x1b[1mone\x1b[0m\n")
+    first.flush()
+    second.write("two\n")
+    second.flush()
+    first.shutdown()
+    second.shutdown()
+    thread.join(5)
+
+    assert not thread.is_alive()  # Stops once the last client is gone
+    assert sorted(output.getvalue().splitlines()) == ["\x1b[1mone\x1b[0m", "two"]
+
+
+@pytest.mark.filterwarnings("error::pytest.PytestUnraisableExceptionWarning")
+def test_unknown_transport_fails_cleanly():
+    with pytest.raises(ValueError):
+        _CmdWindow(transport="bogus")
+    gc.collect()  # __del__ runs shutdown() on what was built so far
+
+
+def test_put_line_needs_the_shm_transport():
+    server = RendererServer("127.0.0.1", 0, output=io.StringIO())
+    window = _CmdWindow("127.0.0.1", server.listener.getsockname()[1])
+    try:
+        with pytest.raises(RuntimeError, match="shm"):
+            window.put_line(1, 1, "text")
+        with pytest.raises(RuntimeError, match="shm"):
+            window.commit()
+    finally:
+        window.shutdown()
+        server.close()
+
+
+def test_shm_lines_get_rendered():
+    output = io.StringIO()
+    server = RendererServer("127.0.0.1", 0, output=output)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    window = _CmdWindow("127.0.0.1", server.listener.getsockname()[1], transport="shm", size=(20, 4))
+    window.put_line(3, 2, "bold", apply_sgr(RESET, ["1"]))  # A new style goes out as MSG_STYLE first
+    window.put_line(3, 3, "plain")
+    window.commit()  # MSG_DIRTY for rows 2..3, columns 3..7
+    deadline = time.monotonic() + 5
+    while "plain" not in output.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.01)  # The framebuffer has to outlive the render, shutdown() unlinks it
+    window.shutdown()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert output.getvalue() == "\x1b[2;3H\x1b[0;1mbold\x1b[0m \x1b[3;3Hplain\x1b[0m"
+
+
+def test_a_misbehaving_client_only_drops_itself():
+    output = io.StringIO()
+    server = RendererServer("127.0.0.1", 0, output=output)
+    port = server.listener.getsockname()[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    healthy = _CmdWindow("127.0.0.1", port)
+    broken = socket.create_connection(("127.0.0.1", port))
+    broken.sendall(encode_frame(MSG_TEXT, b"\xff\xfe"))  # Not UTF-8, decoding it raises in the handler
+    assert broken.recv(1) == b""  # The server hung up on it
+    broken.close()
+
+    healthy.write("still here\n")
+    healthy.flush()
+    healthy.shutdown()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert output.getvalue() == "still here\n"
+
+
+def test_shutdown_right_after_commit_keeps_the_renderer_up():
+    output = io.StringIO()
+    server = RendererServer("127.0.0.1", 0, output=output)
+    port = server.listener.getsockname()[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    other = _CmdWindow("127.0.0.1", port)
+    window = _CmdWindow("127.0.0.1", port, transport="shm", size=(20, 4))
+    window.put_line(1, 1, "gone")
+    window.commit()
+    window.shutdown()  # Waits for the renderer to attach before the segment is unlinked
+    assert window.attached
+
+    later = _CmdWindow("127.0.0.1", port)
+    assert later.process is None  # Still the same renderer
+    later.shutdown()
+    other.shutdown()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert "gone" in output.getvalue()
+
+
+def test_attaching_a_missing_segment_only_drops_that_client():
+    output = io.StringIO()
+    server = RendererServer("127.0.0.1", 0, output=output)
+    port = server.listener.getsockname()[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    healthy = _CmdWindow("127.0.0.1", port)
+    broken = socket.create_connection(("127.0.0.1", port))
+    broken.sendall(encode_frame(MSG_ATTACH, ATTACH.pack(20, 4) + b"limmer_no_such_segment"))
+    assert broken.recv(1) == b""
+    broken.close()
+
+    healthy.write("still here\n")
+    healthy.shutdown()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert output.getvalue() == "still here\n"
@@ -0,0 +1,61 @@
+import os
+import threading
+
+import pytest
+
+from limmer.sink import FdSink
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs a non-blocking pipe")
+
+
+@pytest.fixture
+def pipe():
+    read, write = os.pipe()
+    os.set_blocking(write, False)
+    yield read, write
+    os.close(read)
+    os.close(write)
+
+
+def fill(fd: int) -> int:
+    filled = 0
+    try:
+        while True:
+            filled += os.write(fd, b"x" * 65536)
+    except BlockingIOError:
+        return filled
+
+
+def test_send_counts_what_was_written(pipe):
+    read, write = pipe
+    sink = FdSink(write)
+    assert sink.send("héllo") == 6
+    assert os.read(read, 16) == "héllo".encode()
+
+
+def test_send_on_a_full_pipe_keeps_the_rest(pipe):
+    read, write = pipe
+    sink = FdSink(write, timeout=0.01)
+    fill(write)
+    assert sink.send("abc") == 0
+    assert sink.backlog == 3
+    assert sink.bytes_written == 0
+
+
+def test_backlog_stays_under_max_backlog(pipe):
+    read, write = pipe
+    sink = FdSink(write, timeout=0.01, max_backlog=1000)
+    filled = fill(write)
+
+    def drain():
+        total = filled + 5000
+        while total > 0:
+            total -= len(os.read(read, 4096))
+    reader = threading.Thread(target=drain, daemon=True)
+    threading.Timer(0.05, reader.start).start()
+    sink.send("y" * 5000)  # Waits past the timeout, the pipe is full and this is more than max_backlog
+    assert sink.backlog <= 1000
+    sink.timeout = None
+    assert sink.flush()  # Whatever is still queued, the reader waits for all of it
+    reader.join(5)
+    assert not reader.is_alive()
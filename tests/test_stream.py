@@ -0,0 +1,31 @@
+import threading
+
+from limmer.basics import Window
+from limmer.vterm import VirtualTerminal
+
+
+def test_lines_arrive_in_order():
+    terminal = VirtualTerminal(20, 6)
+    window = Window(terminal=terminal)
+    stream = window.stream(f"line {i}\n" for i in range(4))
+    assert stream.join(5)
+    assert stream.error is None
+    assert terminal.lines()[:4] == ["line 0", "line 1", "line 2", "line 3"]
+
+
+def test_a_failing_window_ends_the_stream():
+    window = Window(terminal=VirtualTerminal(20, 6))
+
+    def broken(*text):
+        raise OSError("terminal is gone")
+    window.sendText = broken
+    stream = window.stream(max_pending=1)
+    fed = []
+    producer = threading.Thread(target=lambda: fed.extend(stream.feed(f"{i}\n") for i in range(5)), daemon=True)
+    producer.start()
+
+    assert stream.join(5)
+    producer.join(5)
+    assert not producer.is_alive()  # Blocked producers get released
+    assert isinstance(stream.error, OSError)
+    assert fed[-1] is False
@@ -0,0 +1,49 @@
+import random
+
+from limmer.styles import (InLineStyleAttr, Color, Formatting, Background, RESET, DEFAULT, BASIC, INDEXED, pack,
+                           apply_sgr, rgb, sgr_transition)
+
+
+def test_equal_values_share_one_object():
+    assert InLineStyleAttr("1;;") is Formatting.BOLD
+    assert InLineStyleAttr(";38:2:1:2:3;") is Color.RGB(1, 2, 3)
+    assert InLineStyleAttr(";31;") is not InLineStyleAttr(";32;")
+
+
+def test_sequences_are_precompiled_from_the_default_style():
+    assert repr(Color.RED) == "\x1b[0;31;40m"
+    assert repr(Formatting.BOLD) == "\x1b[0;1;37;40m"
+    assert repr(Background.RGB(1, 2, 3)) == "\x1b[0;37;48;2;1;2;3m"
+
+
+def test_empty_slots_keep_what_was_set():
+    bold_red = Color.RED.apply(Formatting.BOLD.apply(RESET))
+    assert bold_red == apply_sgr(RESET, ["1", "31"])
+    assert Background.BLUE.apply(bold_red) == apply_sgr(bold_red, ["44"])
+    assert Formatting.CLEAR.apply(bold_red) == apply_sgr(RESET, ["31"])  # Only the attributes go
+    assert Color.CLEAR.apply(bold_red) == apply_sgr(RESET, ["1"])  # 0 in a colour slot is the terminal's colour
+
+
+def test_transitions_only_send_the_difference():
+    bold = apply_sgr(RESET, ["1"])
+    bold_red = apply_sgr(bold, ["31"])
+    assert sgr_transition(bold, bold) == ""
+    assert sgr_transition(None, bold) == "\x1b[0;1m"  # Unknown terminal state, has to start from a reset
+    assert sgr_transition(bold, bold_red) == "\x1b[31m"
+    assert sgr_transition(bold_red, bold) == "\x1b[39m"
+    assert sgr_transition(bold_red, RESET) == "\x1b[0m"
+    # 22 turns off bold and dim together, dim has to come back
+    assert sgr_transition(apply_sgr(RESET, ["1", "2", "4"]), apply_sgr(RESET, ["2", "4"])) == "\x1b[22;2m"
+
+
+def test_transitions_reach_the_new_style():
+    random.seed(2)
+    colors = [0, BASIC | 31, BASIC | 94, INDEXED | 200, rgb(1, 2, 3)]
+    styles = [pack(random.choice(colors), random.choice(colors), random.getrandbits(9)) for _ in range(60)]
+    styles += [RESET, DEFAULT]
+    for previous in styles:
+        for new in styles:
+            sequence = sgr_transition(previous, new)
+            assert len(sequence) <= len(sgr_transition(None, new))  # Never longer than starting over
+            params = sequence[2:-1].split(";") if sequence else []
+            assert apply_sgr(previous, params) == new, (previous, new, sequence)
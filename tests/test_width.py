@@ -0,0 +1,33 @@
+import pytest
+
+from limmer.width import char_width, str_width, fit
+
+
+@pytest.mark.parametrize("char, width", [
+    ("a", 1), ("é", 1),
+    ("日", 2), ("한", 2), ("ｱ", 1),  # Half width katakana stays narrow
+    ("👍", 2), ("🚀", 2),
+    ("\u0301", 0),  # Combining acute accent
+    ("\u200d", 0), ("\u200b", 0), ("\ufe0f", 0),  # Joiner, zero width space, variation selector
+    ("\t", 0), ("\x7f", 0), ("\x1b", 0),
+])
+def test_char_width(char, width):
+    assert char_width(char) == width
+
+
+def test_str_width():
+    assert str_width("hello") == 5
+    assert str_width("日本語abc") == 9
+    assert str_width("e\u0301") == 1  # The mark sits on the e
+    assert str_width("👍\ufe0f") == 2
+    # Joined emoji count as their parts, like on terminals that draw them side by side
+    assert str_width("👨\u200d👩\u200d👧") == 6
+    assert str_width("") == 0
+
+
+def test_fit_never_splits_a_wide_character():
+    assert fit("ab", 4) == "ab  "
+    assert fit("abcdef", 3) == "abc"
+    assert fit("日本語", 5) == "日本 "
+    assert fit("👍x", 1) == " "
+    assert str_width(fit("a日本", 4)) == 4